@@ -1,156 +1,68 @@
 # app_usage_gui.py — GUI that builds final timeline from EVENTS dump + packages (CSV or XML)
 # Requires: pandas (pip install pandas)
+# pandas and the pipeline (timeline.py) are imported in the background once the window is up.
 
-import os, re
-import pandas as pd
+import os, queue, threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from datetime import datetime
-from xml.etree import ElementTree as ET
 
-# ----------------- EVENTS PARSER (works with your device) -----------------
+import profiling
 
-TS_RE = re.compile(r'time="(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})"')
-EV_RE = re.compile(r'type=([A-Z_]+)\s+package=([A-Za-z0-9._]+)')
+# ----------------- EVENTS PARSER (works with your device) -----------------
 
-def parse_events_dump(path: str) -> pd.DataFrame:
+def parse_events_dump(path: str, use_cache: bool = True, workers: int = None, progress=None):
     """
     Parse 'dumpsys usagestats' EVENTS-style text and compute:
       - App Launch Count (RESUMED count)
       - Last Time Used (latest event per package)
       - Total Time Used (sum RESUMED -> PAUSED/STOPPED)
-    Returns DataFrame with: Package | Last Time Used | Total Time Used | App Launch Count
+    Returns DataFrame with: Package | User | Last Time Used | Last Time Visible | Total Time Used | App Launch Count
+    (one row per Android user of a package: sessions are paired within a user's section of the dump)
+    (datetime64/timedelta64 columns; see timeline.format_timeline for the CSV text).
+    The tokenized events are cached next to the dump (see event_cache.py); large dumps
+    are parsed on all cores unless workers is given. progress: see parallel_events.usage_stats.
     """
-    results = {}
-    open_sessions = {}
-
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            ts_m = TS_RE.search(line)
-            ev_m = EV_RE.search(line)
-            if not ts_m or not ev_m:
-                continue
-
-            t = datetime.strptime(ts_m.group(1), "%Y-%m-%d %H:%M:%S")
-            ev = ev_m.group(1)
-            pkg = ev_m.group(2)
-
-            row = results.setdefault(pkg, {
-                "Package": pkg,
-                "Last Time Used": None,
-                "Total Time Used (s)": 0,
-                "App Launch Count": 0
-            })
-
-            # Update last time (keep latest)
-            if (row["Last Time Used"] is None) or (t > datetime.strptime(row["Last Time Used"], "%Y-%m-%d %H:%M:%S")):
-                row["Last Time Used"] = t.strftime("%Y-%m-%d %H:%M:%S")
-
-            if ev == "ACTIVITY_RESUMED":
-                row["App Launch Count"] += 1
-                open_sessions[pkg] = t
-
-            if ev in ("ACTIVITY_PAUSED", "ACTIVITY_STOPPED") and pkg in open_sessions:
-                start = open_sessions.pop(pkg)
-                if t > start:
-                    row["Total Time Used (s)"] += (t - start).total_seconds()
-
-    # Format total time
-    for pkg, row in results.items():
-        secs = int(row["Total Time Used (s)"])
-        h, m, s = secs//3600, (secs%3600)//60, secs%60
-        row["Total Time Used"] = f"{h:02d}:{m:02d}:{s:02d}" if secs > 0 else None
-        del row["Total Time Used (s)"]
-
-    df = pd.DataFrame(results.values())
-    if not df.empty:
-        df = df.sort_values("Last Time Used", ascending=False)
-    # Add a placeholder column expected by the merge layout
-    df["Last Time Visible"] = None
-    return df[["Package","Last Time Used","Last Time Visible","Total Time Used","App Launch Count"]]
+    import timeline
+    return timeline.read_usage(path, use_cache, workers, progress)
 
 # ----------------- PACKAGES PARSER (CSV or XML) -----------------
 
-def _from_ms_or_hex(val):
-    if val is None: return None
-    s = str(val).strip()
-    # int milliseconds (or seconds)
-    try:
-        n = int(s, 10)
-        if n < 10_000_000_000:  # seconds → ms
-            n *= 1000
-        return datetime.utcfromtimestamp(n/1000).strftime("%Y-%m-%d %H:%M:%S")
-    except:
-        pass
-    # hex milliseconds
-    try:
-        n = int(s, 16)
-        return datetime.utcfromtimestamp(n/1000).strftime("%Y-%m-%d %H:%M:%S")
-    except:
-        return None
-
-def parse_packages_input(path: str) -> pd.DataFrame:
+def parse_packages_input(path: str):
     """
-    Accepts CSV (packages_output.csv-like) OR XML (packages.xml)
+    Accepts CSV (packages_output.csv-like) OR XML (packages.xml, streamed, times in UTC)
     Returns: Package | First Installed | Last Updated | Installer (where available)
     """
-    ext = os.path.splitext(path)[1].lower()
-    if ext == ".csv":
-        df = pd.read_csv(path)
-        # normalise names
-        rename = {}
-        for c in list(df.columns):
-            lc = c.lower().strip()
-            if lc in ("package","package name"): rename[c] = "Package"
-            elif lc in ("first installed","firstinstalled","first_install_time","first_install"): rename[c] = "First Installed"
-            elif lc in ("last updated","lastupdated","last_update_time","last_update"): rename[c] = "Last Updated"
-            elif lc in ("installer","installer package","installerpackage"): rename[c] = "Installer"
-        df = df.rename(columns=rename)
-        keep = [x for x in ["Package","First Installed","Last Updated","Installer"] if x in df.columns]
-        if "Package" not in keep:
-            raise ValueError("Packages CSV must contain a 'Package' (or 'Package Name') column.")
-        return df[keep]
-
-    # XML
-    tree = ET.parse(path)
-    root = tree.getroot()
-    rows = []
-    for pkg in root.findall(".//package"):
-        name = pkg.attrib.get("name")
-        if not name: continue
-        ft = pkg.attrib.get("ft") or pkg.attrib.get("firstInstallTime") or pkg.attrib.get("first-install-time")
-        ut = pkg.attrib.get("ut") or pkg.attrib.get("lastUpdateTime") or pkg.attrib.get("last-update-time")
-        installer = pkg.attrib.get("installer") or pkg.attrib.get("installerPackageName") or pkg.attrib.get("installer-package-name")
-        rows.append({
-            "Package": name,
-            "First Installed": _from_ms_or_hex(ft),
-            "Last Updated": _from_ms_or_hex(ut),
-            "Installer": installer
-        })
-    return pd.DataFrame(rows)
+    import timeline
+    return timeline.read_packages_input(path)
 
 # ----------------- MERGE -----------------
 
-def build_final_timeline(usage_df: pd.DataFrame, packages_df: pd.DataFrame) -> pd.DataFrame:
-    merged = pd.merge(packages_df, usage_df, on="Package", how="outer")
-    # normalise date columns to string
-    for col in ["First Installed","Last Updated","Last Time Used","Last Time Visible"]:
-        if col in merged.columns:
-            merged[col] = pd.to_datetime(merged[col], errors="coerce").dt.strftime("%Y-%m-%d %H:%M:%S")
-    # desired order
-    order = [c for c in [
-        "Package","First Installed","Last Updated","Installer",
-        "Last Time Used","Last Time Visible","Total Time Used","App Launch Count"
-    ] if c in merged.columns]
-    merged = merged[order]
-    # sort by Last Time Used desc if present
-    if "Last Time Used" in merged.columns:
-        tmp = pd.to_datetime(merged["Last Time Used"], errors="coerce")
-        merged = merged.loc[tmp.sort_values(ascending=False, na_position="last").index]
-    return merged
+def build_final_timeline(usage_df, packages_df):
+    import timeline
+    return timeline.build_final_timeline(usage_df, packages_df)
+
+def generate_timeline(usage_path: str, packages_path: str, out: str, progress=None):
+    """The whole Generate job, without Tk; see timeline.generate_timeline."""
+    import timeline
+    return timeline.generate_timeline(usage_path, packages_path, out, progress)
+
+def profile_path(out: str) -> str:
+    """Where the GUI writes the profile report for an output CSV."""
+    return os.path.splitext(out)[0] + "_profile.json"
+
+def _preload():
+    # worker thread, no Tk: pay for pandas/NumPy while the user is still picking files
+    import timeline, virtual_grid
 
 # ----------------- GUI -----------------
 
+class Cancelled(Exception):
+    """Raised inside the worker when Cancel was pressed."""
+
+POLL_MS = 100
+STAGE_LABELS = {"hash": "Checking cache", "parse": "Parsing events", "sessions": "Pairing sessions",
+                "packages": "Reading packages", "merge": "Merging", "write": "Writing CSV"}
+
 class App(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -178,11 +90,37 @@ class App(tk.Tk):
 
         btns = ttk.Frame(self, padding=(12,0))
         btns.pack(fill="x")
-        ttk.Button(btns, text="Generate Timeline", command=self.generate).pack(side="left")
-        ttk.Button(btns, text="Quit", command=self.destroy).pack(side="right")
-
-        self.tree = ttk.Treeview(self, show="headings")
-        self.tree.pack(fill="both", expand=True, padx=12, pady=12)
+        self.generate_btn = ttk.Button(btns, text="Generate Timeline", command=self.generate)
+        self.generate_btn.pack(side="left")
+        self.cancel_btn = ttk.Button(btns, text="Cancel", command=self.cancel, state="disabled")
+        self.cancel_btn.pack(side="left", padx=(6,0))
+        ttk.Button(btns, text="Quit", command=self.quit_app).pack(side="right")
+        self.progress = ttk.Progressbar(btns, length=220, maximum=100)
+        self.progress.pack(side="left", padx=12)
+        self.status = tk.StringVar(value="Ready")
+        ttk.Label(btns, textvariable=self.status).pack(side="left")
+        self.write_profile = tk.BooleanVar(value=False)
+        ttk.Checkbutton(btns, text="Profile report", variable=self.write_profile).pack(side="right", padx=6)
+
+        # the worker thread only talks to Tk through this queue (drained by _poll)
+        self.jobs = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.worker = None
+
+        bar = ttk.Frame(self, padding=(12,8,12,0))
+        bar.pack(fill="x")
+        ttk.Label(bar, text="Filter:").pack(side="left")
+        self.filter_text = tk.StringVar()
+        self.filter_text.trace_add("write", lambda *args: self._schedule_filter())
+        ttk.Entry(bar, textvariable=self.filter_text, width=40).pack(side="left", padx=6)
+        self.row_count = tk.StringVar()
+        ttk.Label(bar, textvariable=self.row_count).pack(side="left")
+        self._filter_job = None
+
+        # every row of the result, scrolled/sorted/filtered in memory (virtual_grid.py);
+        # built with the first result so the window does not wait for pandas
+        self.grid_view = None
+        threading.Thread(target=_preload, daemon=True).start()
 
     def browse_usage(self):
         path = filedialog.askopenfilename(title="Select usage dump (TXT)", filetypes=[("All files","*.*")])
@@ -198,44 +136,130 @@ class App(tk.Tk):
         if path: self.output_path.set(path)
 
     def generate(self):
+        if self.worker is not None:
+            return
+        if not self.usage_path.get():
+            messagebox.showerror("Error", "Please select the events usage dump (usagestats_dump.txt).")
+            return
+        if not self.packages_path.get():
+            messagebox.showerror("Error", "Please select packages.xml or packages_output.csv.")
+            return
+
+        out = self.output_path.get() or "AppUsage_Timeline_Final.csv"
+        self.cancel_event.clear()
+        self.generate_btn.config(state="disabled")
+        self.cancel_btn.config(state="normal")
+        self.progress["value"] = 0
+        self.status.set("Starting...")
+        self.worker = threading.Thread(target=self._work, daemon=True,
+                                       args=(self.usage_path.get(), self.packages_path.get(), out,
+                                             self.write_profile.get()))
+        self.worker.start()
+        self.after(POLL_MS, self._poll)
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.status.set("Cancelling...")
+
+    def quit_app(self):
+        self.cancel_event.set()
+        self.destroy()
+
+    # --- worker thread: no Tk calls here ---
+
+    def _report(self, stage, done, total, events):
+        if self.cancel_event.is_set():
+            raise Cancelled()
+        self.jobs.put(("progress", stage, done, total, events))
+
+    def _work(self, usage_path, packages_path, out, write_profile=False):
         try:
-            if not self.usage_path.get():
-                messagebox.showerror("Error", "Please select the events usage dump (usagestats_dump.txt).")
-                return
-            if not self.packages_path.get():
-                messagebox.showerror("Error", "Please select packages.xml or packages_output.csv.")
+            with profiling.activate(profiling.Profile("app_usage_gui", usage_path)) as prof:
+                final_df, final_text, no_events = generate_timeline(usage_path, packages_path, out, self._report)
+            if write_profile:
+                prof.write(profile_path(out))
+            self.jobs.put(("done", final_df, final_text, no_events, out))
+        except Cancelled:
+            self.jobs.put(("cancelled",))
+        except Exception as e:
+            self.jobs.put(("error", str(e)))
+
+    # --- main thread ---
+
+    def _poll(self):
+        while True:
+            try:
+                msg = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if msg[0] == "progress":
+                self._show_progress(*msg[1:])
+            else:
+                self._finish(msg)
                 return
-
-            usage_df = parse_events_dump(self.usage_path.get())
-            if usage_df.empty:
+        self.after(POLL_MS, self._poll)
+
+    def _show_progress(self, stage, done, total, events):
+        text = STAGE_LABELS.get(stage, stage)
+        if total:
+            self.progress["value"] = 100.0 * done / total
+            text += f": {done / 2**20:,.1f} / {total / 2**20:,.1f} MB"
+        if events:
+            text += f", {events:,} events"
+        self.status.set(text)
+
+    def _finish(self, msg):
+        self.worker = None
+        self.generate_btn.config(state="normal")
+        self.cancel_btn.config(state="disabled")
+        kind = msg[0]
+        if kind == "cancelled":
+            self.progress["value"] = 0
+            self.status.set("Cancelled")
+        elif kind == "error":
+            self.status.set("Failed")
+            messagebox.showerror("Error", msg[1])
+        else:
+            _, final_df, final_text, no_events, out = msg
+            self.progress["value"] = 100
+            self.status.set(f"Done: {len(final_df):,} rows")
+            if no_events:
                 messagebox.showwarning("No Events Parsed",
                     "Could not extract any events. Make sure your dump contains lines like:\n"
                     'time="YYYY-MM-DD HH:MM:SS" type=ACTIVITY_RESUMED package=com.example')
-            packages_df = parse_packages_input(self.packages_path.get())
-
-            final_df = build_final_timeline(usage_df, packages_df)
-
-            out = self.output_path.get() or "AppUsage_Timeline_Final.csv"
-            final_df.to_csv(out, index=False, encoding="utf-8")
+            self.preview(final_text, final_df)
             messagebox.showinfo("Success", f"Timeline saved to:\n{out}")
-            self.preview(final_df)
-
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
-
-    def preview(self, df: pd.DataFrame):
-        # clear
-        for c in self.tree.get_children():
-            self.tree.delete(c)
-        cols = list(df.columns)
-        self.tree["columns"] = cols
-        for col in cols:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=160, anchor="w")
-        for _, row in df.head(60).iterrows():
-            self.tree.insert("", "end", values=[row.get(c, "") for c in cols])
 
-if __name__ == "__main__":
+    def preview(self, df, keys=None):
+        """Show the whole result (DataFrame); keys are the typed columns used when sorting by a header."""
+        if self.grid_view is None:
+            from virtual_grid import VirtualGrid
+            self.grid_view = VirtualGrid(self)
+            self.grid_view.pack(fill="both", expand=True, padx=12, pady=(6,12))
+        self.grid_view.set_frame(df, keys)
+        self.grid_view.set_filter(self.filter_text.get())
+        self._update_row_count()
+
+    def _schedule_filter(self):
+        # wait for a pause in typing instead of filtering on every key
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(200, self._apply_filter)
+
+    def _apply_filter(self):
+        self._filter_job = None
+        if self.grid_view is None:
+            return
+        self.grid_view.set_filter(self.filter_text.get())
+        self._update_row_count()
+
+    def _update_row_count(self):
+        if self.grid_view is None:
+            return
+        model = self.grid_view.model
+        self.row_count.set(f"{len(model):,} of {model.total:,} rows" if model.total else "")
+
+def main():
     # DPI tweak for some Windows screens
     try:
         from ctypes import windll
@@ -244,3 +268,6 @@ if __name__ == "__main__":
         pass
     app = App()
     app.mainloop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_merge.py
+# Final-timeline merge at scale: the old string pipeline (format at parse, parse again at merge,
+# parse again to sort) against timeline.py's typed pipeline (format once at export).
+# Each "extraction" is one device's usage stats + package list drawn from a shared pool of names.
+# Usage:
+#   python benchmarks/bench_merge.py --packages 10000 50000 --extractions 20
+# Output:
+#   seconds per pipeline for every size, and a check that both produce the same CSV
+
+import os, sys, time, argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import timeline
+from events_tokenizer import format_ts
+
+def make_extraction(rng, pool, n_packages):
+    """(usage_stats dict, packages frame) for one synthetic device."""
+    names = rng.choice(pool, size=n_packages, replace=False)
+    t0 = 1_700_000_000
+    used = names[: n_packages // 3]
+    stats = {(0, p): [int(t0 + rng.integers(0, 90 * 86400)), int(rng.integers(0, 20000)), int(rng.integers(0, 50))]
+             for p in used}
+    ms = (t0 - rng.integers(0, 3 * 365 * 86400, size=(2, n_packages))) * 1000
+    packages = pd.DataFrame({
+        "Package": names,
+        "First Installed": pd.to_datetime(ms[0], unit="ms"),
+        "Last Updated": pd.to_datetime(np.maximum(ms[0], ms[1]), unit="ms"),
+        "Installer": rng.choice(["com.android.vending", None], size=n_packages),
+    })
+    return stats, packages
+
+def legacy_pipeline(stats, packages):
+    """The pre-timeline.py GUI path, kept here only for comparison."""
+    rows = []
+    for (user, pkg), (last, total, launches) in stats.items():
+        h, m, s = total // 3600, (total % 3600) // 60, total % 60
+        rows.append({"Package": pkg, "User": user, "Last Time Used": format_ts(last),
+                     "Total Time Used": f"{h:02d}:{m:02d}:{s:02d}" if total > 0 else None, "App Launch Count": launches})
+    usage = pd.DataFrame(rows, columns=["Package", "User", "Last Time Used", "Total Time Used", "App Launch Count"])
+    usage = usage.sort_values("Last Time Used", ascending=False)
+    usage["User"] = usage["User"].astype("Int32")
+    usage["Last Time Visible"] = None
+    usage = usage[["Package", "User", "Last Time Used", "Last Time Visible", "Total Time Used", "App Launch Count"]]
+    packages = packages.assign(**{c: packages[c].dt.strftime("%Y-%m-%d %H:%M:%S") for c in ("First Installed", "Last Updated")})
+
+    merged = pd.merge(packages, usage, on="Package", how="outer")
+    for col in timeline.DATE_COLUMNS:
+        merged[col] = pd.to_datetime(merged[col], errors="coerce").dt.strftime("%Y-%m-%d %H:%M:%S")
+    merged = merged[timeline.TIMELINE_COLUMNS]
+    tmp = pd.to_datetime(merged["Last Time Used"], errors="coerce")
+    return merged.loc[tmp.sort_values(ascending=False, na_position="last").index]
+
+def typed_pipeline(stats, packages):
+    return timeline.format_timeline(timeline.build_final_timeline(timeline.usage_frame(stats), packages))
+
+def run(fn, extractions):
+    t = time.perf_counter()
+    out = [fn(stats, packages) for stats, packages in extractions]
+    return time.perf_counter() - t, out
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Benchmark the final-timeline merge")
+    ap.add_argument("--packages", type=int, nargs="+", default=[10000, 50000], help="Packages per extraction")
+    ap.add_argument("--extractions", type=int, default=10, help="Device extractions per size")
+    ap.add_argument("--seed", type=int, default=0)
+    return ap.parse_args()
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    print(f"{'packages':>10} {'extractions':>12} {'legacy s':>10} {'typed s':>10} {'speedup':>8}  same")
+    for n in args.packages:
+        pool = np.array([f"com.vendor{i % 997}.app{i}" for i in range(2 * n)])
+        extractions = [make_extraction(rng, pool, n) for _ in range(args.extractions)]
+        t_old, old = run(legacy_pipeline, extractions)
+        t_new, new = run(typed_pipeline, extractions)
+        same = all(a.to_csv(index=False) == b.to_csv(index=False) for a, b in zip(old, new))
+        print(f"{n:>10} {args.extractions:>12} {t_old:>10.2f} {t_new:>10.2f} {t_old / t_new:>7.1f}x  {same}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_startup.py
+# Start-up time of the command-line entry points and the GUI module (fresh interpreter
+# per run, min/median of N), plus a check that heavy libraries stay unimported where
+# they are not needed (from `python -X importtime`).
+# Every case has a budget in ms; the script exits 1 when one is exceeded or a forbidden
+# module shows up, so it can guard against an eager `import pandas` creeping back in.
+# Usage:
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --runs 20 --out startup.json --no-check
+# Output:
+#   a table on stdout (+ JSON with --out)
+
+import os, sys, json, argparse, platform, statistics, subprocess, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+CLI = os.path.join(ROOT, "usage_timeline.py")
+HEAVY = ("pandas", "matplotlib", "numpy")
+
+# name -> (argv after the interpreter, budget in ms, modules that must not be imported)
+CASES = {
+    "python (bare)":           (["-c", "pass"], 100, HEAVY),
+    "usage_timeline --help":   ([CLI, "--help"], 150, HEAVY),
+    "launchstats --help":      ([CLI, "launchstats", "--help"], 150, HEAVY),
+    "import app_usage_gui":    (["-c", "import app_usage_gui"], 250, HEAVY),
+    "import events_tokenizer": (["-c", "import events_tokenizer"], 300, ("pandas", "matplotlib")),
+    "parse --help":            ([CLI, "parse", "--help"], 1500, ("matplotlib",)),
+    "heatmap --help":          ([CLI, "heatmap", "--help"], 1500, ("matplotlib",)),
+    "top --help":              ([CLI, "top", "--help"], 1500, ("matplotlib",)),
+    "serve --help":            ([CLI, "serve", "--help"], 1500, ("matplotlib",)),
+}
+
+def _env():
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    env.pop("PYTHONPATH", None)
+    return env
+
+def time_case(argv, runs: int):
+    """Wall seconds of `python <argv>` for each run (after one warm-up for the OS file cache)."""
+    cmd = [sys.executable] + argv
+    times = []
+    for i in range(runs + 1):
+        t = time.perf_counter()
+        subprocess.run(cmd, cwd=ROOT, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        if i:
+            times.append(time.perf_counter() - t)
+    return times
+
+def imported_modules(argv):
+    """Top-level package names imported by `python <argv>`."""
+    res = subprocess.run([sys.executable, "-X", "importtime"] + argv, cwd=ROOT, env=_env(),
+                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    mods = set()
+    for line in res.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            if name != "imported package":
+                mods.add(name.split(".")[0])
+    return mods
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Start-up time of the entry points")
+    ap.add_argument("--runs", type=int, default=10, help="Timed runs per case (default 10)")
+    ap.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES), metavar="CASE")
+    ap.add_argument("--out", help="Also save the results as JSON")
+    ap.add_argument("--no-check", action="store_true", help="Report only; never exit 1 on a budget")
+    return ap.parse_args()
+
+def main():
+    args = parse_args()
+    records, failed = [], []
+    print(f"{'case':<26}{'min ms':>9}{'median ms':>11}{'budget':>8}  notes")
+    for name in args.cases:
+        argv, budget, forbid = CASES[name]
+        times = time_case(argv, args.runs)
+        loaded = sorted(m for m in forbid if m in imported_modules(argv))
+        rec = {"case": name, "min_ms": round(min(times) * 1000, 1),
+               "median_ms": round(statistics.median(times) * 1000, 1),
+               "budget_ms": budget, "forbidden_imported": loaded}
+        notes = []
+        if rec["median_ms"] > budget:
+            notes.append("OVER BUDGET")
+        if loaded:
+            notes.append("imports " + ", ".join(loaded))
+        if notes:
+            failed.append(name)
+        records.append(rec)
+        print(f"{name:<26}{rec['min_ms']:>9.1f}{rec['median_ms']:>11.1f}{budget:>8}  {'; '.join(notes)}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "platform": platform.platform(),
+                       "runs": args.runs, "results": records}, f, indent=2)
+        print(f"✅ Saved startup results to {args.out}")
+    if failed and not args.no_check:
+        print(f"❌ {len(failed)} case(s) failed: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
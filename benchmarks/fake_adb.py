@@ -0,0 +1,51 @@
+# benchmarks/fake_adb.py
+# Stand-in for adb when testing live_ingest.py without a device: answers the two
+# commands live_ingest runs by writing local files to stdout, at a chosen rate so that
+# a slow USB transfer can be imitated.
+#   shell dumpsys usagestats --history        -> --dump file
+#   exec-out cat /data/system/packages.xml    -> --packages file
+# Usage:
+#   python live_ingest.py --outdir live_test \
+#       --adb "python benchmarks/fake_adb.py --dump usagestats_dump.txt --packages packages.xml --rate 20"
+# Output:
+#   the file's bytes on stdout (exit 1 with a message on stderr for anything else)
+
+import sys, time, argparse
+
+BLOCK = 1 << 16
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="adb stand-in that replays local files")
+    ap.add_argument("--dump", help="Events dump to replay for 'shell dumpsys usagestats'")
+    ap.add_argument("--packages", help="packages.xml to replay for 'exec-out cat'")
+    ap.add_argument("--rate", type=float, default=0, help="MB/s to send at (default 0 = as fast as possible)")
+    ap.add_argument("-s", dest="serial", help="Ignored, as a real device serial would be")
+    ap.add_argument("command", nargs=argparse.REMAINDER)
+    return ap.parse_args()
+
+def replay(path: str, rate_mb_s: float):
+    out = sys.stdout.buffer
+    start, sent = time.perf_counter(), 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK), b""):
+            out.write(block)
+            out.flush()
+            sent += len(block)
+            if rate_mb_s > 0:
+                ahead = sent / (rate_mb_s * 2**20) - (time.perf_counter() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+def main():
+    args = parse_args()
+    cmd = args.command
+    if cmd[:3] == ["shell", "dumpsys", "usagestats"] and args.dump:
+        replay(args.dump, args.rate)
+    elif cmd[:1] == ["exec-out"] and cmd[-1].endswith("packages.xml") and args.packages:
+        replay(args.packages, args.rate)
+    else:
+        print(f"fake_adb: nothing to answer {' '.join(cmd)!r} with", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
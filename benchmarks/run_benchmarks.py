@@ -0,0 +1,175 @@
+# benchmarks/run_benchmarks.py
+# Wall time, throughput and peak RSS of every entry point on synthetic data (synthetic_data.py).
+# Each stage runs in a fresh child process so peak RSS belongs to that stage alone; parsing is
+# always cold (no .evcache) except for the *_cached stage.
+# Usage:
+#   python benchmarks/run_benchmarks.py --sizes 1e4 1e5 1e6 --workers 4
+#   python benchmarks/run_benchmarks.py --compare results/old.json results/new.json
+# Output:
+#   benchmarks/results/bench-<commit>-<time>.json  (one record per stage x size) + a table
+#   (build_final_timeline times the merge + formatting only; its inputs are parsed untimed)
+
+import os, sys, json, time, runpy, argparse, platform, tempfile, subprocess
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+STAGES = ["parse_events_dump", "parse_events_dump_cached", "parse_packages_input",
+          "build_final_timeline", "heatmap", "gantt"]
+SCHEMA = 1
+
+# ----------------- CHILD: one stage, one process -----------------
+
+def _peak_rss_mb():
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10  # bytes on macOS, KB elsewhere
+
+def _run_script(name, argv):
+    sys.argv = [name] + argv
+    runpy.run_path(os.path.join(ROOT, name), run_name="__main__")
+
+def run_stage(stage, dump, packages, workers, tmp):
+    """Run one stage in this process; returns seconds spent in the timed part."""
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    import app_usage_gui as gui
+    import timeline
+
+    if stage == "build_final_timeline":
+        usage = gui.parse_events_dump(dump, use_cache=False, workers=workers)
+        pk = gui.parse_packages_input(packages)
+        t = time.perf_counter()
+        timeline.format_timeline(gui.build_final_timeline(usage, pk))
+        return time.perf_counter() - t
+
+    t = time.perf_counter()
+    if stage == "parse_events_dump":
+        gui.parse_events_dump(dump, use_cache=False, workers=workers)
+    elif stage == "parse_events_dump_cached":
+        gui.parse_events_dump(dump, use_cache=True, workers=workers)
+    elif stage == "parse_packages_input":
+        gui.parse_packages_input(packages)
+    elif stage == "heatmap":
+        _run_script("events_to_daily_heatmap.py", [dump, "--no-cache", "--workers", str(workers),
+                    "--out", os.path.join(tmp, "heatmap.csv"), "--fig", os.path.join(tmp, "heatmap.png")])
+    elif stage == "gantt":
+        _run_script("events_to_gantt.py", [dump, "--no-cache", "--workers", str(workers),
+                    "--out", os.path.join(tmp, "gantt.csv"), "--fig", os.path.join(tmp, "gantt.png")])
+    else:
+        raise ValueError(f"unknown stage {stage}")
+    return time.perf_counter() - t
+
+def child_main(args):
+    # stage scripts print their own progress; keep stdout for the JSON line only
+    real_stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        wall = run_stage(args.child, args.dump, args.packages_xml, args.workers, args.tmp)
+    finally:
+        sys.stdout = real_stdout
+    print(json.dumps({"wall_s": wall, "peak_rss_mb": _peak_rss_mb()}))
+
+# ----------------- PARENT -----------------
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def _spawn(stage, dump, packages, workers, tmp):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", stage, "--dump", dump,
+           "--packages-xml", packages, "--workers", str(workers), "--tmp", tmp]
+    out = subprocess.run(cmd, capture_output=True, text=True, env=dict(os.environ, MPLBACKEND="Agg"))
+    if out.returncode != 0:
+        raise RuntimeError(f"{stage} failed:\n{out.stderr.strip()}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def run_suite(sizes, stages, workers, repeat, workdir, n_packages, seed):
+    from synthetic_data import make_case
+    records = []
+    for size in sizes:
+        case = os.path.join(workdir, f"events_{size}_pkgs_{n_packages}_seed_{seed}")
+        dump, xml = os.path.join(case, "usagestats_dump.txt"), os.path.join(case, "packages.xml")
+        if not (os.path.exists(dump) and os.path.exists(xml)):
+            print(f"Generating {size:,} events in {case} ...")
+            make_case(case, size, n_packages, seed)
+        n_events = sum(1 for line in open(dump, encoding="utf-8") if 'time="' in line)
+        n_packages_xml = sum(1 for line in open(xml, encoding="utf-8") if line.startswith("    <package "))
+        dump_mb, xml_mb = os.path.getsize(dump) / 2**20, os.path.getsize(xml) / 2**20
+
+        for stage in stages:
+            if stage == "parse_events_dump_cached":
+                _spawn("parse_events_dump_cached", dump, xml, workers, case)  # warm the cache first
+            runs = [_spawn(stage, dump, xml, workers, case) for _ in range(repeat)]
+            wall = min(r["wall_s"] for r in runs)
+            # throughput is per input record: packages for packages.xml, events for everything else
+            items, mb = (n_packages_xml, xml_mb) if stage == "parse_packages_input" else (n_events, dump_mb)
+            rec = {"stage": stage, "events": n_events, "items": items, "input_mb": round(mb, 3), "workers": workers,
+                   "wall_s": round(wall, 4), "peak_rss_mb": round(max(r["peak_rss_mb"] for r in runs), 1),
+                   "items_per_s": round(items / wall) if wall else None,
+                   "mb_per_s": round(mb / wall, 2) if wall else None}
+            records.append(rec)
+            print(f"{stage:>26} {n_events:>10,} ev {rec['wall_s']:>9.3f} s {rec['peak_rss_mb']:>8.1f} MB "
+                  f"{rec['items_per_s'] or 0:>12,} items/s {rec['mb_per_s'] or 0:>8.1f} MB/s")
+    return records
+
+def compare(old_path, new_path):
+    """Print new/old wall-time and RSS ratios for every (stage, events) present in both files."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    base = {(r["stage"], r["events"]): r for r in old["results"]}
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    print(f"{'stage':>26} {'events':>10} {'old s':>9} {'new s':>9} {'speedup':>8} {'RSS new/old':>12}")
+    for r in new["results"]:
+        o = base.get((r["stage"], r["events"]))
+        if o:
+            print(f"{r['stage']:>26} {r['events']:>10,} {o['wall_s']:>9.3f} {r['wall_s']:>9.3f} "
+                  f"{o['wall_s'] / r['wall_s']:>7.2f}x {r['peak_rss_mb'] / o['peak_rss_mb']:>11.2f}x")
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Benchmark every entry point on synthetic dumps")
+    ap.add_argument("--sizes", type=float, nargs="+", default=[1e4, 1e5], help="Events per synthetic dump (1e3 .. 1e7)")
+    ap.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    ap.add_argument("--workers", type=int, default=1, help="Parse workers passed to every stage (default 1)")
+    ap.add_argument("--repeat", type=int, default=1, help="Runs per stage; the fastest is kept")
+    ap.add_argument("--packages", type=int, default=300, help="User apps in the synthetic packages.xml")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "usage_timeline_bench"),
+                    help="Where generated inputs are kept between runs")
+    ap.add_argument("--out", help="JSON results file (default benchmarks/results/bench-<commit>-<time>.json)")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files and exit")
+    # internal: run a single stage in this process
+    ap.add_argument("--child", choices=STAGES, help=argparse.SUPPRESS)
+    ap.add_argument("--dump", help=argparse.SUPPRESS)
+    ap.add_argument("--packages-xml", help=argparse.SUPPRESS)
+    ap.add_argument("--tmp", help=argparse.SUPPRESS)
+    return ap.parse_args()
+
+def main():
+    args = parse_args()
+    if args.child:
+        return child_main(args)
+    if args.compare:
+        return compare(*args.compare)
+
+    sizes = [int(s) for s in args.sizes]
+    records = run_suite(sizes, args.stages, args.workers, args.repeat, args.workdir, args.packages, args.seed)
+
+    commit = _git_commit()
+    doc = {"schema": SCHEMA, "created": datetime.now().isoformat(timespec="seconds"), "commit": commit,
+           "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+           "results": records}
+    out = args.out or os.path.join(HERE, "results", f"bench-{commit}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+    print(f"✅ Saved {len(records)} results to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# benchmarks/synthetic_data.py
+# Synthetic `dumpsys usagestats --history` text and packages.xml at any size (1e3 .. 1e7 events),
+# shaped like data-samples/: screen-on bursts of ACTIVITY_RESUMED/PAUSED/STOPPED sessions,
+# STANDBY_BUCKET_CHANGED storms, notifications, shortcuts, foreground services and the
+# SCREEN_*/KEYGUARD_* pairs around them, followed by the in-memory daily/weekly/monthly/yearly
+# stats sections. The same seed always gives the same files.
+# --users writes one 'user=N' section per user (work profile, secondary users), each
+# covering the same period, as a multi-user device dumps them.
+# Usage:
+#   python benchmarks/synthetic_data.py --events 1e6 --packages 400 --out synthetic_1e6
+#   python benchmarks/synthetic_data.py --events 1e6 --users 0 10 11 --out synthetic_3users
+# Output:
+#   <out>/usagestats_dump.txt + <out>/packages.xml
+
+import os, random, argparse, itertools
+from datetime import datetime, timedelta
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+START = datetime(2025, 1, 1, 7, 0, 0)
+
+SYSTEM_PACKAGES = ["android", "com.android.systemui", "com.android.phone", "com.android.settings",
+                   "com.google.android.gms", "com.google.android.gsf", "com.android.providers.media",
+                   "com.google.android.as", "com.android.vending", "com.google.android.ext.services"]
+VENDORS = ["whatsapp", "instagram", "telegram", "google", "facebook", "spotify", "netflix", "zhiliaoapp",
+           "snapchat", "twitter", "microsoft", "amazon", "discord", "signal", "samsung", "motorola"]
+PERMISSIONS = ["INTERNET", "CAMERA", "RECORD_AUDIO", "READ_CONTACTS", "ACCESS_FINE_LOCATION",
+               "READ_EXTERNAL_STORAGE", "POST_NOTIFICATIONS", "WAKE_LOCK", "VIBRATE", "READ_PHONE_STATE"]
+
+def package_names(n: int, seed: int = 0):
+    """n user-app package names (plus the fixed system ones first)."""
+    rng = random.Random(seed)
+    names = list(SYSTEM_PACKAGES)
+    seen = set(names)
+    while len(names) < n + len(SYSTEM_PACKAGES):
+        name = f"com.{rng.choice(VENDORS)}.{rng.choice(['android', 'app', 'lite', 'messenger', 'mobile'])}{len(names)}"
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+def _hms(secs: int) -> str:
+    h, m, s = secs // 3600, secs % 3600 // 60, secs % 60
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+class _DumpWriter:
+    """Chronological event writer; also keeps the per-package totals for the stats sections."""
+
+    def __init__(self, f):
+        self.f = f
+        self.n = 0
+        self._last_t, self._last_s = None, None
+        self.stats = {}  # pkg -> [first ts, last ts, total secs, launches]
+
+    def event(self, t: datetime, ev: str, pkg: str, extra: str = ""):
+        if t != self._last_t:
+            self._last_t, self._last_s = t, t.strftime(TS_FORMAT)
+        self.f.write(f'    time="{self._last_s}" type={ev} package={pkg} {extra}flags=0x0 \n')
+        self.n += 1
+
+    def session(self, t: datetime, pkg: str, secs: int, instance: int):
+        cls = f"{pkg}.MainActivity"
+        extra = f"class={cls} instanceId={instance} taskRootPackage={pkg} taskRootClass={cls} "
+        self.event(t, "ACTIVITY_RESUMED", pkg, extra)
+        end = t + timedelta(seconds=secs)
+        self.event(end, "ACTIVITY_PAUSED", pkg, extra)
+        self.event(end + timedelta(seconds=1), "ACTIVITY_STOPPED", pkg, extra)
+        st = self.stats.setdefault(pkg, [t, t, 0, 0])
+        st[1] = end + timedelta(seconds=1)
+        st[2] += secs
+        st[3] += 1
+        return end + timedelta(seconds=1)
+
+def write_dump(path: str, n_events: int, packages, seed: int = 0, users=(0,)):
+    """
+    Write about n_events events (always whole bursts) plus stats sections, split evenly
+    over one section per user; returns the event count.
+    """
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        return sum(_write_user(f, user, -(-n_events // len(users)), packages, rng) for user in users)
+
+def _write_user(f, user: int, n_events: int, packages, rng) -> int:
+    """One 'user=N' section: its events, then its in-memory stats; returns the event count."""
+    apps = packages[len(SYSTEM_PACKAGES):] or packages
+    cum = list(itertools.accumulate(1.0 / (i + 1) for i in range(len(apps))))  # a few apps get most of the use
+    t = START
+    w = _DumpWriter(f)
+    f.write(f"user={user} \n")
+    f.write(f'  Last 24 hour events (timeRange="{START:%m/%d/%Y}, 7:00 AM – synthetic" )\n')
+    while w.n < n_events:
+        t += timedelta(seconds=rng.randint(300, 3 * 3600))
+        w.event(t, "SCREEN_INTERACTIVE", "android")
+        w.event(t, "KEYGUARD_HIDDEN", "android")
+        for _ in range(rng.randint(1, 6)):
+            t = w.session(t + timedelta(seconds=rng.randint(0, 20)),
+                          rng.choices(apps, cum_weights=cum)[0],
+                          rng.randint(1, 600), rng.randint(1, 1 << 28))
+            if rng.random() < 0.2:
+                pkg = rng.choice(apps)
+                w.event(t, "NOTIFICATION_INTERRUPTION", pkg, f"channelId={rng.randint(1, 99)} ")
+            if rng.random() < 0.05:
+                w.event(t, "SHORTCUT_INVOCATION", rng.choice(apps), "shortcutId=synthetic ")
+            if rng.random() < 0.05:
+                w.event(t, "NOTIFICATION_SEEN", rng.choice(apps))
+        if rng.random() < 0.1:
+            pkg = rng.choice(packages)
+            w.event(t, "FOREGROUND_SERVICE_START", pkg, f"class={pkg}.SyncService ")
+            w.event(t + timedelta(seconds=rng.randint(1, 120)), "FOREGROUND_SERVICE_STOP", pkg, f"class={pkg}.SyncService ")
+            t += timedelta(seconds=121)
+        w.event(t, "KEYGUARD_SHOWN", "android")
+        w.event(t, "SCREEN_NON_INTERACTIVE", "android")
+        # standby bucket storms dominate real dumps (about half of the sample's events)
+        t += timedelta(seconds=rng.randint(60, 1800))
+        for pkg in rng.sample(packages, min(len(packages), rng.randint(0, 20))):
+            w.event(t, "STANDBY_BUCKET_CHANGED", pkg, f"standbyBucket={rng.choice([10, 20, 30, 40])} reason=t ")
+
+    end = t
+    for interval, days in (("daily", 1), ("weekly", 7), ("monthly", 30), ("yearly", 365)):
+        lo = max(START, end - timedelta(days=days))
+        f.write(f"  In-memory {interval} stats\n")
+        f.write(f'  timeRange="{lo:%m/%d/%Y, %I:%M %p} – {end:%m/%d/%Y, %I:%M %p}" \n')
+        f.write("    packages\n")
+        for pkg in packages:
+            first, last, secs, launches = w.stats.get(pkg, (None, None, 0, 0))
+            if last is None or last < lo:
+                last_s, secs, launches = "1970-01-01 01:00:00", 0, 0
+            else:
+                last_s = last.strftime(TS_FORMAT)
+            f.write(f'      package={pkg} totalTimeUsed="{_hms(secs)}" lastTimeUsed="{last_s}" '
+                    f'totalTimeVisible="{_hms(secs)}" lastTimeVisible="{last_s}" '
+                    f'totalTimeFS="00:00" lastTimeFS="1970-01-01 01:00:00" appLaunchCount={launches} \n')
+        f.write("    \n")
+    return w.n
+
+def write_packages_xml(path: str, packages, seed: int = 0):
+    """packages.xml in the AOSP text format, with the cert/perm/keyset noise real files carry."""
+    rng = random.Random(seed + 1)
+    start_ms = int((START - datetime(1970, 1, 1)).total_seconds() * 1000)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<?xml version='1.0' encoding='utf-8' standalone='yes' ?>\n<packages>\n")
+        f.write('    <version sdkVersion="30" databaseVersion="3" fingerprint="synthetic/benchmark:11/user" />\n')
+        f.write("    <permissions>\n")
+        for p in PERMISSIONS:
+            f.write(f'        <item name="android.permission.{p}" package="android" protection="1" />\n')
+        f.write("    </permissions>\n")
+        for i, pkg in enumerate(packages):
+            system = i < len(SYSTEM_PACKAGES)
+            ft = 0 if system else start_ms - rng.randint(0, 400 * 86400) * 1000
+            ut = 0 if system else ft + rng.randint(0, 60 * 86400) * 1000
+            owner = 'sharedUserId="1000"' if system else f'userId="{10000 + i}" installer="com.android.vending"'
+            f.write(f'    <package name="{pkg}" codePath="/data/app/{pkg}-1" nativeLibraryPath="/data/app/{pkg}-1/lib" '
+                    f'publicFlags="940097092" privateFlags="0" ft="{ft:x}" it="{ft:x}" ut="{ut:x}" '
+                    f'version="{rng.randint(1, 10**9)}" {owner}>\n')
+            f.write(f'        <sigs count="1" schemeVersion="3">\n            <cert index="{i}" key="{rng.getrandbits(2048):0512x}" />\n        </sigs>\n')
+            f.write("        <perms>\n")
+            for p in rng.sample(PERMISSIONS, rng.randint(2, len(PERMISSIONS))):
+                f.write(f'            <item name="android.permission.{p}" granted="true" flags="0" />\n')
+            f.write("        </perms>\n")
+            f.write(f'        <proper-signing-keyset identifier="{i + 1}" />\n')
+            f.write(f'        <domain-verification packageName="{pkg}" status="0">\n'
+                    f'            <domain name="{pkg.split(".")[-1]}.example.com" />\n        </domain-verification>\n')
+            f.write("    </package>\n")
+            if not system and rng.random() < 0.1:
+                f.write(f'    <updated-package name="{pkg}" codePath="/system/app/{pkg}" ft="{ft:x}" it="{ft:x}" '
+                        f'ut="{ft:x}" version="1" userId="{10000 + i}" />\n')
+        f.write('    <shared-user name="android.uid.system" userId="1000">\n'
+                '        <sigs count="1" schemeVersion="3"><cert index="0" /></sigs>\n    </shared-user>\n')
+        f.write("</packages>\n")
+
+def make_case(out_dir: str, n_events: int, n_packages: int, seed: int = 0, users=(0,)):
+    """Write both files into out_dir; returns (dump path, packages path, events written)."""
+    os.makedirs(out_dir, exist_ok=True)
+    names = package_names(n_packages, seed)
+    dump, xml = os.path.join(out_dir, "usagestats_dump.txt"), os.path.join(out_dir, "packages.xml")
+    n = write_dump(dump, n_events, names, seed, users)
+    write_packages_xml(xml, names, seed)
+    return dump, xml, n
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Generate a synthetic usagestats dump + packages.xml")
+    ap.add_argument("--events", type=float, default=1e5, help="Approximate number of events (1e3 .. 1e7)")
+    ap.add_argument("--packages", type=int, default=300, help="Installed user apps (system apps are added)")
+    ap.add_argument("--users", type=int, nargs="+", default=[0], help="Android user ids, one section each (default 0)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="synthetic", help="Output folder")
+    return ap.parse_args()
+
+def main():
+    args = parse_args()
+    dump, xml, n = make_case(args.out, int(args.events), args.packages, args.seed, args.users)
+    print(f"✅ Wrote {n:,} events to {dump} ({os.path.getsize(dump) / 2**20:,.1f} MB) and {xml}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# case_batch.py
+# Run the timeline pipeline (see timeline.py) for every device of a case in a process pool.
+# Case layout: one subfolder per device holding its usage dump and packages file, e.g.
+#   case_0412/PIXEL7-01/usagestats_dump.txt + packages.xml
+#   case_0412/MOTO-G-02/usagestats_dump.txt + packages_output.csv
+# The dump is usagestats_dump.txt, else *usagestats*.txt, else the folder's only .txt file
+# (a notes.txt next to an oddly named dump is never guessed at); the summary names the
+# files each device was built from.
+# Files may be compressed as they were collected (usagestats_dump.txt.gz, packages.xml.xz, ...).
+# A device that fails (missing/corrupt input) is reported in the summary; the rest carry on.
+# Usage:
+#   python case_batch.py case_0412 --out case_0412_timelines --workers 8
+# Output:
+#   <out>/<device>/AppUsage_Timeline_Final.csv, <out>/case_timeline.csv (Device column added),
+#   <out>/batch_summary.csv
+
+import os, sys, glob, time, argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import timeline
+
+def _with_compressed(names):
+    return tuple(n + ext for n in names for ext in ("", ".gz", ".bz2", ".xz"))
+
+DUMP_NAMES = _with_compressed(("usagestats_dump.txt", "*usagestats*.txt"))
+PACKAGES_NAMES = _with_compressed(("packages.xml", "packages_output.csv", "*packages*.xml", "*packages*.csv"))
+
+SUMMARY_COLUMNS = ["Device", "Status", "Dump", "Packages", "Rows", "Seconds", "Error"]
+
+def _first_match(folder, patterns):
+    for pattern in patterns:
+        hits = sorted(glob.glob(os.path.join(folder, pattern)))
+        if hits:
+            return hits[0]
+    return None
+
+def _only_text_file(folder):
+    """The folder's single .txt (possibly compressed) file, or None when there are none or several."""
+    hits = [p for pattern in _with_compressed(("*.txt",)) for p in glob.glob(os.path.join(folder, pattern))]
+    return hits[0] if len(hits) == 1 else None
+
+def find_devices(case_dir: str):
+    """[(device, dump path or None, packages path or None)] for every subfolder, by name."""
+    devices = []
+    for name in sorted(os.listdir(case_dir)):
+        folder = os.path.join(case_dir, name)
+        if os.path.isdir(folder) and not name.startswith((".", "_")):
+            dump = _first_match(folder, DUMP_NAMES) or _only_text_file(folder)
+            devices.append((name, dump, _first_match(folder, PACKAGES_NAMES)))
+    return devices
+
+def _inputs(dump, packages) -> dict:
+    """The summary columns naming the files a device was built from."""
+    return {"Dump": os.path.basename(dump) if dump else "",
+            "Packages": os.path.basename(packages) if packages else ""}
+
+def process_device(job):
+    """Worker: one device's timeline. Never raises; returns (device, typed frame or None, summary row)."""
+    device, dump, packages, out_dir, use_cache = job
+    t0 = time.perf_counter()
+    inputs = _inputs(dump, packages)
+    try:
+        if dump is None:
+            raise FileNotFoundError("no usage dump in device folder (usagestats_dump.txt, "
+                                    "*usagestats*.txt, or a single .txt file)")
+        if packages is None:
+            raise FileNotFoundError("no packages.xml / packages_output.csv in device folder")
+        # one process per device already, so the dump itself is parsed serially
+        usage = timeline.read_usage(dump, use_cache, workers=1)
+        final = timeline.build_final_timeline(usage, timeline.read_packages_input(packages))
+
+        os.makedirs(os.path.join(out_dir, device), exist_ok=True)
+        out = os.path.join(out_dir, device, "AppUsage_Timeline_Final.csv")
+        timeline.format_timeline(final).to_csv(out, index=False, encoding="utf-8")
+        return device, final, {"Device": device, "Status": "ok", **inputs, "Rows": len(final),
+                               "Seconds": round(time.perf_counter() - t0, 2), "Error": ""}
+    except Exception as e:
+        return device, None, {"Device": device, "Status": "failed", **inputs, "Rows": 0,
+                              "Seconds": round(time.perf_counter() - t0, 2),
+                              "Error": f"{type(e).__name__}: {e}"}
+
+def combine(frames: dict) -> pd.DataFrame:
+    """Device-tagged union of the per-device timelines, most recently used first (NaT last)."""
+    if not frames:
+        return pd.DataFrame(columns=["Device"] + timeline.TIMELINE_COLUMNS)
+    devices = sorted(frames)
+    df = pd.concat([frames[d].assign(Package=frames[d]["Package"].astype(object)) for d in devices],
+                   keys=devices, names=["Device", None]).reset_index(level=0)
+    df["Device"] = pd.Categorical(df["Device"], categories=devices)
+    return df.sort_values("Last Time Used", ascending=False, na_position="last", kind="stable").reset_index(drop=True)
+
+def run_case(case_dir: str, out_dir: str, workers: int = 1, use_cache: bool = True):
+    """Process every device; returns (combined typed frame, summary DataFrame)."""
+    jobs = [(device, dump, packages, out_dir, use_cache) for device, dump, packages in find_devices(case_dir)]
+    frames, summary = {}, []
+
+    def collect(result):
+        device, final, row = result
+        if final is not None:
+            frames[device] = final
+        summary.append(row)
+        print(f"  {'✅' if final is not None else '❌'} {device}: {row['Rows']} rows in {row['Seconds']}s {row['Error']}")
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(process_device, job): job for job in jobs}
+            for fut in as_completed(futures):
+                try:
+                    collect(fut.result())
+                except Exception as e:  # the worker process itself died
+                    device, dump, packages = futures[fut][:3]
+                    collect((device, None, {"Device": device, "Status": "failed", **_inputs(dump, packages),
+                                            "Rows": 0, "Seconds": 0, "Error": f"{type(e).__name__}: {e}"}))
+    else:
+        for job in jobs:
+            collect(process_device(job))
+
+    summary = pd.DataFrame(summary, columns=SUMMARY_COLUMNS)
+    return combine(frames), summary.sort_values("Device").reset_index(drop=True)
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Build per-device and combined timelines for a whole case")
+    ap.add_argument("case_dir", help="Folder with one subfolder per device")
+    ap.add_argument("--out", help="Output folder (default <case_dir>_timelines)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Devices processed at once (default: all cores, 1 = serial)")
+    ap.add_argument("--no-cache", action="store_true", help="Re-parse dumps instead of using/writing their .evcache")
+    return ap.parse_args()
+
+def main():
+    args = parse_args()
+    out_dir = args.out or os.path.normpath(args.case_dir) + "_timelines"
+    os.makedirs(out_dir, exist_ok=True)
+
+    print(f"Processing case {args.case_dir} with {args.workers} worker(s)")
+    combined, summary = run_case(args.case_dir, out_dir, args.workers, not args.no_cache)
+    if summary.empty:
+        print("No device folders found.")
+        sys.exit(1)
+
+    # the summary first: it is what matters most when devices failed
+    summary_path = os.path.join(out_dir, "batch_summary.csv")
+    summary.to_csv(summary_path, index=False)
+    failed = summary[summary["Status"] != "ok"]
+    if len(failed) < len(summary):
+        combined_path = os.path.join(out_dir, "case_timeline.csv")
+        timeline.format_timeline(combined).to_csv(combined_path, index=False, encoding="utf-8")
+        print(f"✅ Saved combined timeline ({len(combined)} rows, {len(summary) - len(failed)} devices) to {combined_path}")
+    else:
+        print("⚠️ No device produced a timeline; no combined timeline written.")
+    print(f"✅ Saved batch summary to {summary_path}")
+    if len(failed):
+        print(f"❌ {len(failed)} device(s) failed:")
+        for _, row in failed.iterrows():
+            print(f"   {row['Device']}: {row['Error']}")
+        sys.exit(2)
+
+if __name__ == "__main__":
+    main()
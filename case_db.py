@@ -0,0 +1,313 @@
+# case_db.py
+# One SQLite file per device: events, sessions, installed packages and per-package usage,
+# indexed for time/package questions, so follow-ups do not mean re-loading CSVs.
+# Times are naive epoch seconds like everywhere else (events_tokenizer.py); the *_v views
+# show them as 'YYYY-MM-DD HH:MM:SS' for ad-hoc SQL.
+# An app is a package of one Android user (apps.user; NULL for installed packages no
+# user has events for), so a work-profile copy of an app has its own events and sessions.
+# Usage:
+#   python case_db.py export usagestats_dump.txt --packages packages.xml --db PIXEL7-01.sqlite
+#   python case_db.py apps PIXEL7-01.sqlite "2025-08-30 20:00:00" "2025-08-30 22:00:00"
+#   python case_db.py events PIXEL7-01.sqlite com.whatsapp --from "2025-08-30 00:00:00" --limit 50
+#   python case_db.py around PIXEL7-01.sqlite "2025-08-30 21:20:00" --minutes 5
+# Output:
+#   the .sqlite file (export), or the matching rows printed / written with --out CSV
+
+import os, sys, sqlite3, argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import profiling
+import evidence
+from events_tokenizer import EVENT_NAMES, parse_ts, parse_day, date_to_ts, format_ts
+from event_cache import load_events, package_users
+from sessions import build_sessions, session_spans
+from parallel_events import accumulate, stitch
+
+SCHEMA_VERSION = 2
+BATCH_ROWS = 100_000
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE apps (id INTEGER PRIMARY KEY, package TEXT NOT NULL, user INTEGER, UNIQUE (package, user));
+CREATE TABLE event_types (code INTEGER PRIMARY KEY, name TEXT NOT NULL);
+-- rowid keeps dump order for events in the same second
+CREATE TABLE events (ts INTEGER NOT NULL, type INTEGER NOT NULL, app INTEGER NOT NULL);
+-- open = 1: still running when the events end, cut at the next midnight (as in the Gantt)
+CREATE TABLE sessions (app INTEGER NOT NULL, start_ts INTEGER NOT NULL, end_ts INTEGER NOT NULL, open INTEGER NOT NULL);
+CREATE TABLE packages (app INTEGER PRIMARY KEY, first_installed INTEGER, last_updated INTEGER, installer TEXT);
+CREATE TABLE usage (app INTEGER PRIMARY KEY, last_used INTEGER, total_secs INTEGER, launches INTEGER);
+
+CREATE VIEW events_v AS
+  SELECT datetime(e.ts, 'unixepoch') AS time, t.name AS type, a.package, a.user
+  FROM events e JOIN apps a ON a.id = e.app LEFT JOIN event_types t ON t.code = e.type;
+CREATE VIEW sessions_v AS
+  SELECT a.package, a.user, datetime(s.start_ts, 'unixepoch') AS start, datetime(s.end_ts, 'unixepoch') AS end,
+         s.end_ts - s.start_ts AS duration_s, s.open
+  FROM sessions s JOIN apps a ON a.id = s.app;
+"""
+
+# built after the bulk load: one sort per index instead of a b-tree insert per row
+INDEXES = """
+CREATE INDEX events_app_ts ON events (app, ts);
+CREATE INDEX events_ts ON events (ts);
+CREATE INDEX sessions_app_start ON sessions (app, start_ts);
+CREATE INDEX sessions_start ON sessions (start_ts);
+"""
+
+# ----------------- EXPORT -----------------
+
+def _epoch_or_none(col: pd.Series):
+    secs = col.to_numpy(dtype="datetime64[s]").astype(np.int64).tolist()
+    return [s if ok else None for s, ok in zip(secs, col.notna().tolist())]
+
+def _insert(con, sql, columns):
+    """executemany over parallel columns, BATCH_ROWS at a time (the caller holds the transaction)."""
+    n = len(columns[0]) if columns else 0
+    for lo in range(0, n, BATCH_ROWS):
+        con.executemany(sql, zip(*(c[lo:lo + BATCH_ROWS] for c in columns)))
+    profiling.count("db_rows", n)
+
+def export(db_path: str, dump: str, packages_path: str = None, use_cache: bool = True, workers: int = 1):
+    """
+    Build db_path from a dump (+ optional packages.xml / packages_output.csv).
+    The file is written under a temporary name and only replaces db_path when complete.
+    Returns {table: rows}.
+    """
+    table = load_events(dump, use_cache, workers)
+    with profiling.stage("sessions"):
+        sessions = build_sessions(table)
+        pkg, start, end = session_spans(sessions)
+        n_closed = len(sessions.pkg)
+        usage = stitch([accumulate(table)])
+    # apps.id = the dump's package code (one per user and package); installed packages
+    # never seen in the dump follow, with no user
+    names = list(table.packages)
+    users = package_users(table).tolist()
+    codes = {key: i for i, key in enumerate(zip(users, names))}
+    ids = {}  # package -> its app ids
+    for i, p in enumerate(names):
+        ids.setdefault(p, []).append(i)
+    packages_df = None
+    if packages_path:
+        from timeline import read_packages_input
+        with profiling.stage("packages"):
+            packages_df = read_packages_input(packages_path)
+        for p in packages_df["Package"].astype(object):
+            if p not in ids:
+                ids[p] = [len(names)]
+                names.append(p)
+                users.append(None)
+
+    tmp = db_path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    con = sqlite3.connect(tmp)
+    try:
+        # a fresh file nobody else reads yet: no journal, no fsync until the end
+        con.execute("PRAGMA journal_mode = OFF")
+        con.execute("PRAGMA synchronous = OFF")
+        con.executescript(SCHEMA)
+        with profiling.stage("db_insert"), con:
+            _insert(con, "INSERT INTO apps VALUES (?, ?, ?)", [list(range(len(names))), names, users])
+            _insert(con, "INSERT INTO event_types VALUES (?, ?)", [list(EVENT_NAMES), list(EVENT_NAMES.values())])
+            _insert(con, "INSERT INTO events VALUES (?, ?, ?)",
+                    [np.asarray(table.ts).tolist(), np.asarray(table.type).tolist(), np.asarray(table.pkg).tolist()])
+            is_open = np.zeros(len(pkg), dtype=np.int64)
+            is_open[n_closed:] = 1
+            _insert(con, "INSERT INTO sessions VALUES (?, ?, ?, ?)",
+                    [pkg.tolist(), start.tolist(), end.tolist(), is_open.tolist()])
+            _insert(con, "INSERT INTO usage VALUES (?, ?, ?, ?)",
+                    [[codes[p] for p in usage], [v[0] for v in usage.values()],
+                     [int(v[1]) for v in usage.values()], [v[2] for v in usage.values()]])
+            if packages_df is not None:
+                # install details are per package: every user's app of it gets the same row
+                cols = packages_df.drop_duplicates("Package")
+                installer = cols["Installer"] if "Installer" in cols else pd.Series(None, index=cols.index)
+                per_pkg = list(zip(
+                    _epoch_or_none(cols["First Installed"]) if "First Installed" in cols else [None] * len(cols),
+                    _epoch_or_none(cols["Last Updated"]) if "Last Updated" in cols else [None] * len(cols),
+                    installer.astype(object).where(installer.notna(), None).tolist()))
+                rows = [(app, *row) for p, row in zip(cols["Package"].astype(object), per_pkg) for app in ids[p]]
+                _insert(con, "INSERT INTO packages VALUES (?, ?, ?, ?)", [list(c) for c in zip(*rows)] if rows else [])
+            meta = {"schema_version": SCHEMA_VERSION, "source": os.path.abspath(dump),
+                    "packages_source": os.path.abspath(packages_path) if packages_path else "",
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    # longest session: bounds the start_ts range a window query has to look at
+                    "max_session_s": int((end - start).max()) if len(start) else 0}
+            con.executemany("INSERT INTO meta VALUES (?, ?)", [(k, str(v)) for k, v in meta.items()])
+        with profiling.stage("db_index"):
+            con.executescript(INDEXES)
+            con.execute("ANALYZE")
+        counts = {t: con.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                  for t in ("apps", "events", "sessions", "packages", "usage")}
+    finally:
+        con.close()
+    os.replace(tmp, db_path)
+    return counts
+
+# ----------------- QUERIES -----------------
+
+class CaseDB:
+    """Read-only queries over an exported case database; times in and out are naive epoch seconds / datetime64."""
+
+    def __init__(self, db_path: str):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(db_path)
+        self.con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        meta = dict(self.con.execute("SELECT key, value FROM meta"))
+        if int(meta.get("schema_version", 0)) != SCHEMA_VERSION:
+            raise ValueError(f"{db_path}: schema version {meta.get('schema_version')}, expected {SCHEMA_VERSION}")
+        self.meta = meta
+        self.max_session_s = int(meta["max_session_s"])
+
+    def close(self):
+        self.con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _frame(self, sql, params, time_cols):
+        df = pd.read_sql_query(sql, self.con, params=params)
+        for col in time_cols:
+            df[col] = pd.to_datetime(df[col], unit="s")
+        return df
+
+    def apps_in_window(self, t1: int, t2: int) -> pd.DataFrame:
+        """Apps with a session overlapping [t1, t2) (as session_index.py: zero-length ones never do), most used first."""
+        return self._frame("""
+            SELECT a.package AS Package, a.user AS User, COUNT(*) AS Sessions,
+                   SUM(MIN(s.end_ts, :t2) - MAX(s.start_ts, :t1)) AS Seconds,
+                   MIN(s.start_ts) AS "First Start", MAX(s.end_ts) AS "Last End"
+            FROM sessions s JOIN apps a ON a.id = s.app
+            WHERE s.start_ts >= :lo AND s.start_ts < :t2 AND s.end_ts > :t1 AND s.end_ts > s.start_ts
+            GROUP BY s.app ORDER BY Seconds DESC, Package""",
+            {"t1": t1, "t2": t2, "lo": t1 - self.max_session_s}, ["First Start", "Last End"])
+
+    def foreground_at(self, t: int) -> pd.DataFrame:
+        """Sessions running at instant t (start <= t < end)."""
+        return self._frame("""
+            SELECT a.package AS Package, a.user AS User, s.start_ts AS Start, s.end_ts AS End, s.open AS Open
+            FROM sessions s JOIN apps a ON a.id = s.app
+            WHERE s.start_ts >= :lo AND s.start_ts <= :t AND s.end_ts > :t
+            ORDER BY s.start_ts""", {"t": t, "lo": t - self.max_session_s}, ["Start", "End"])
+
+    def events_for_package(self, package: str, t1: int = None, t2: int = None, limit: int = None,
+                           user: int = None) -> pd.DataFrame:
+        """A package's events in [t1, t2) (either end open), of every user or just user, in dump order."""
+        return self._frame("""
+            SELECT e.ts AS Time, COALESCE(t.name, e.type) AS Type, a.user AS User
+            FROM apps a JOIN events e ON e.app = a.id LEFT JOIN event_types t ON t.code = e.type
+            WHERE a.package = :package AND (:user IS NULL OR a.user = :user) AND e.ts >= :t1 AND e.ts < :t2
+            ORDER BY e.ts, e.rowid LIMIT :limit""",
+            {"package": package, "user": user, "t1": -2**63 if t1 is None else t1,
+             "t2": 2**63 - 1 if t2 is None else t2, "limit": -1 if limit is None else limit}, ["Time"])
+
+    def timeline_around(self, t: int, seconds: int = 300) -> pd.DataFrame:
+        """Every event within +-seconds of instant t, in dump order."""
+        return self._frame("""
+            SELECT e.ts AS Time, COALESCE(t.name, e.type) AS Type, a.package AS Package, a.user AS User
+            FROM events e JOIN apps a ON a.id = e.app LEFT JOIN event_types t ON t.code = e.type
+            WHERE e.ts >= :lo AND e.ts <= :hi
+            ORDER BY e.ts, e.rowid""", {"lo": t - seconds, "hi": t + seconds}, ["Time"])
+
+# ----------------- CLI -----------------
+
+def parse_time(s: str) -> int:
+    """'YYYY-MM-DD HH:MM:SS' or 'YYYY-MM-DD' (midnight) -> naive epoch seconds."""
+    if len(s) == 10:
+        return date_to_ts(parse_day(s))
+    return parse_ts(s)
+
+def default_db_path(dump: str) -> str:
+    """<dump>.sqlite next to the dump; for archive!member, next to the archive, named after the member."""
+    return os.path.splitext(evidence.cache_base(dump))[0] + ".sqlite"
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Export a dump to an indexed SQLite case database, and query it")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    ex = sub.add_parser("export", help="Build the database from a dump (+ packages file)")
+    ex.add_argument("dump", help="usagestats events dump (TXT)")
+    ex.add_argument("--packages", help="packages.xml or packages_output.csv (optional)")
+    ex.add_argument("--db", help="Database file (default <dump>.sqlite, next to the archive for archive!member)")
+    ex.add_argument("--no-cache", action="store_true", help="Re-parse the dump instead of using/writing the .evcache")
+    ex.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Processes for parsing large dumps (default: all cores, 1 = serial)")
+    profiling.add_profile_argument(ex, "case_db_profile.json")
+
+    apps = sub.add_parser("apps", help="Apps used in a time window")
+    apps.add_argument("db")
+    apps.add_argument("start", help='"YYYY-MM-DD HH:MM:SS" (or a date)')
+    apps.add_argument("end", help="exclusive")
+
+    ev = sub.add_parser("events", help="Events of one package")
+    ev.add_argument("db")
+    ev.add_argument("package")
+    ev.add_argument("--from", dest="start", help="First time (inclusive)")
+    ev.add_argument("--to", dest="end", help="Last time (exclusive)")
+    ev.add_argument("--limit", type=int)
+    ev.add_argument("--user", type=int, help="Only this Android user's events (default: every user)")
+
+    ar = sub.add_parser("around", help="All events near an instant, and what was in the foreground")
+    ar.add_argument("db")
+    ar.add_argument("time", help='"YYYY-MM-DD HH:MM:SS"')
+    ar.add_argument("--minutes", type=float, default=5, help="Window on each side (default 5)")
+
+    for p in (apps, ev, ar):
+        p.add_argument("--out", help="Write the rows to this CSV instead of printing them")
+    return ap.parse_args()
+
+def show(df: pd.DataFrame, out: str = None, title: str = None):
+    if out:
+        df.to_csv(out, index=False)
+        print(f"✅ Saved {len(df)} rows to {out}")
+        return
+    if title:
+        print(title)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(df.to_string(index=False) if len(df) else "  (none)")
+
+def main():
+    args = parse_args()
+    if args.command == "export":
+        db = args.db or default_db_path(args.dump)
+        with profiling.activate(profiling.Profile("case_db", args.dump)) as prof:
+            counts = export(db, args.dump, args.packages, not args.no_cache, args.workers)
+        print(f"✅ Saved {db}: " + ", ".join(f"{n:,} {t}" for t, n in counts.items()))
+        if args.profile:
+            prof.write(args.profile)
+            print(f"✅ Saved profile report to {args.profile}")
+        return
+
+    try:
+        times = {name: parse_time(getattr(args, name)) for name in ("start", "end", "time")
+                 if getattr(args, name, None)}
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    with CaseDB(args.db) as db:
+        if args.command == "apps":
+            t1, t2 = times["start"], times["end"]
+            show(db.apps_in_window(t1, t2), args.out, f"Apps used {format_ts(t1)} - {format_ts(t2)}:")
+        elif args.command == "events":
+            t1, t2 = times.get("start"), times.get("end")
+            show(db.events_for_package(args.package, t1, t2, args.limit, args.user), args.out,
+                 f"Events of {args.package}:")
+        else:
+            t = times["time"]
+            seconds = int(args.minutes * 60)
+            events = db.timeline_around(t, seconds)
+            if args.out:
+                show(events, args.out)
+            else:
+                show(db.foreground_at(t), title=f"In the foreground at {format_ts(t)}:")
+                show(events, title=f"\nEvents within {args.minutes:g} min:")
+
+if __name__ == "__main__":
+    main()
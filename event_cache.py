@@ -0,0 +1,356 @@
+# event_cache.py
+# Columnar on-disk cache of a usagestats EVENT dump.
+# The first run tokenizes the dump into NumPy columns and stores them next to it:
+#   usagestats_dump.txt.evcache/
+#     meta.json      source SHA-256 + format version (written last)
+#     ts.npy         int64  naive epoch seconds
+#     type.npy       uint8  android event-type code
+#     pkg.npy        int32  index into packages.txt
+#     packages.txt   one package name per line
+#     users.npy      int32  Android user of each package code (one code per user and package)
+#     payload.npy    int32  index into the payload records (one per distinct key=value text)
+#     payload_<key>.npy     one column per payload key over the records: the number for
+#                           PAYLOAD_INTS keys (standbyBucket int16, instanceId, flags), else
+#                           int32 codes into payload_strings.txt (class, reason, channelId, ...)
+#     payload_strings.txt   one payload value per line
+# Later runs re-hash the dump and, if it matches, memory-map the columns instead of re-parsing.
+# The first run needs no separate hash: the SHA-256 is taken in the tokenizer's own read.
+# Compressed dumps and archive members work too (evidence.py); their cache folder is
+# <archive>.<member>.evcache and the hash is that of the archive file.
+
+import os, json
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+import profiling
+import evidence
+from events_tokenizer import iter_evidence, parse_payload, PAYLOAD_INTS
+
+CACHE_VERSION = 3
+CACHE_SUFFIX = ".evcache"
+
+# ts/type/pkg are parallel arrays in dump order; packages maps pkg codes back to names.
+# payload (parallel too) picks each event's record in payloads; both are None for tables
+# built from (ts, type, package) tuples only.
+# users gives the Android user of every package code: a package used by two users has a
+# code for each, so everything keyed by code (sessions, totals) stays within one user.
+EventTable = namedtuple("EventTable", ["ts", "type", "pkg", "packages", "payload", "payloads", "users"],
+                        defaults=(None, None, None))
+# fields: key -> column over the payload records; strings: what the string codes point to
+Payloads = namedtuple("Payloads", ["fields", "strings"])
+
+def file_sha256(path: str, bufsize: int = 1 << 20, progress=None) -> str:
+    with profiling.stage("hash"):
+        return evidence.file_sha256(path, bufsize, progress)
+
+# ----------------- PAYLOADS -----------------
+
+def _payload_dtype(key: str):
+    return PAYLOAD_INTS[key][0] if key in PAYLOAD_INTS else "int32"
+
+def payload_missing(key: str) -> int:
+    """Stored where a record lacks the key: -1 for string codes, the dtype minimum for numbers."""
+    return int(np.iinfo(PAYLOAD_INTS[key][0]).min) if key in PAYLOAD_INTS else -1
+
+def payload_columns(records) -> Payloads:
+    """Distinct payload texts (record order) -> one typed column per key seen in any of them."""
+    parsed = [parse_payload(r) for r in records]
+    keys = dict.fromkeys(k for p in parsed for k in p)
+    strings, fields = {}, {}
+    for key in keys:
+        vals = [p.get(key) for p in parsed]
+        if key in PAYLOAD_INTS:
+            dtype, base = PAYLOAD_INTS[key]
+            missing, hi = payload_missing(key), int(np.iinfo(dtype).max)
+            nums = []
+            for v in vals:
+                try:
+                    n = missing if v is None else int(v, base)
+                except ValueError:
+                    n = None
+                if n is None or not missing <= n <= hi or (n == missing and v is not None):
+                    profiling.count("bad_payload_values")
+                    n = missing
+                nums.append(n)
+            col = np.array(nums, dtype=dtype)
+        else:
+            col = np.array([-1 if v is None else strings.setdefault(v, len(strings)) for v in vals], dtype=np.int32)
+        fields[key] = col
+    return Payloads(fields, list(strings))
+
+def concat_payloads(tables):
+    """Stack the tables' payload records over one shared string list; returns (payload, Payloads)."""
+    keys = dict.fromkeys(k for table in tables for k in table.payloads.fields)
+    strings = {}
+    codes, fields = [], {k: [] for k in keys}
+    offset = 0
+    for table in tables:
+        n_rec = int(table.payload.max()) + 1 if len(table.payload) else 0
+        # the trailing -1 keeps missing values (code -1) missing
+        remap = np.array([strings.setdefault(s, len(strings)) for s in table.payloads.strings] + [-1], dtype=np.int32)
+        for key in keys:
+            col = table.payloads.fields.get(key)
+            if col is None:
+                col = np.full(n_rec, payload_missing(key), dtype=_payload_dtype(key))
+            elif key not in PAYLOAD_INTS:
+                col = remap[col]
+            fields[key].append(col)
+        codes.append(table.payload + np.int32(offset))
+        offset += n_rec
+    payload = np.concatenate(codes) if codes else np.array([], dtype=np.int32)
+    return payload, Payloads({k: np.concatenate(v) for k, v in fields.items()}, list(strings))
+
+def payload_column(table: EventTable, key: str):
+    """
+    One payload key for every event: (values, strings). String keys give int32 codes into
+    strings (-1 where the event has no such key); PAYLOAD_INTS keys give the numbers
+    (payload_missing(key) where absent) and strings None.
+    """
+    if table.payloads is None:
+        raise ValueError("this EventTable was built without payloads")
+    col = table.payloads.fields.get(key)
+    if col is None:
+        values = np.full(len(table.ts), payload_missing(key), dtype=_payload_dtype(key))
+    else:
+        values = np.asarray(col)[table.payload]
+    return values, (None if key in PAYLOAD_INTS else table.payloads.strings)
+
+# ----------------- USERS -----------------
+
+def package_users(table: EventTable) -> np.ndarray:
+    """The user id of every package code (all 0 for a table built without users)."""
+    if table.users is None:
+        return np.zeros(len(table.packages), dtype=np.int32)
+    return np.asarray(table.users)
+
+def event_users(table: EventTable) -> np.ndarray:
+    """The user id of every event."""
+    return package_users(table)[np.asarray(table.pkg)]
+
+def split_users(table: EventTable, sections, user: int = 0) -> EventTable:
+    """
+    Re-code a table so that each user section has its own package codes (in order of
+    first appearance). sections: (first event, user id) pairs as collected by
+    events_tokenizer.tokenize_lines; events before the first one belong to user.
+    """
+    owner = np.full(len(table.ts), user, dtype=np.int64)
+    for first, u in sections:
+        owner[first:] = u
+    if not len(owner) or (owner == owner[0]).all():
+        u = int(owner[0]) if len(owner) else (sections[-1][1] if sections else user)
+        return table._replace(users=np.full(len(table.packages), u, dtype=np.int32))
+    n_pkg = len(table.packages)
+    keys, first, inverse = np.unique(owner * n_pkg + table.pkg, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind="stable")
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+    keys = keys[order]
+    return table._replace(pkg=rank[inverse.ravel()],
+                          packages=[table.packages[k] for k in (keys % n_pkg).tolist()],
+                          users=(keys // n_pkg).astype(np.int32))
+
+def user_ids(table: EventTable) -> list:
+    """The users that have events in the table, ascending."""
+    return np.unique(package_users(table)).tolist()
+
+def user_label(package: str, user: int) -> str:
+    """How charts name a package: as is for user 0 (the device owner), else 'package (user N)'."""
+    return package if user == 0 else f"{package} (user {user})"
+
+def package_labels(table: EventTable) -> list:
+    """user_label() of every package code."""
+    return [user_label(p, u) for p, u in zip(table.packages, package_users(table).tolist())]
+
+def select_rows(table: EventTable, keep) -> EventTable:
+    """The events where keep (a bool mask) is True; package codes and lists unchanged."""
+    return table._replace(ts=np.asarray(table.ts)[keep], type=np.asarray(table.type)[keep],
+                          pkg=np.asarray(table.pkg)[keep],
+                          payload=None if table.payload is None else np.asarray(table.payload)[keep])
+
+def select_user(table: EventTable, user: int) -> EventTable:
+    """The events of one user."""
+    return select_rows(table, event_users(table) == user)
+
+# ----------------- TABLES -----------------
+
+def table_from_events(events, payload: bool = False, user: int = 0) -> EventTable:
+    """
+    Pack (ts, type_code, package) tuples into columns (no per-event Python objects kept).
+    With payload=True the tuples carry the payload text as well (tokenize_lines(..., payload=True));
+    each distinct text becomes one record, parsed once. All events are taken to be user's
+    (see split_users for a dump with several user sections).
+    """
+    ts, types, pkgs = array("q"), array("B"), array("i")
+    codes = {}
+    if not payload:
+        for t, ev, pkg in events:
+            code = codes.get(pkg)
+            if code is None:
+                code = codes[pkg] = len(codes)
+            ts.append(t)
+            types.append(ev)
+            pkgs.append(code)
+        payload_codes, payloads = None, None
+    else:
+        recs, rec_codes = {}, array("i")
+        for t, ev, pkg, rest in events:
+            code = codes.get(pkg)
+            if code is None:
+                code = codes[pkg] = len(codes)
+            rec = recs.get(rest)
+            if rec is None:
+                rec = recs[rest] = len(recs)
+            ts.append(t)
+            types.append(ev)
+            pkgs.append(code)
+            rec_codes.append(rec)
+        payload_codes, payloads = np.frombuffer(rec_codes, dtype=np.int32), payload_columns(list(recs))
+    return EventTable(
+        np.frombuffer(ts, dtype=np.int64),
+        np.frombuffer(types, dtype=np.uint8),
+        np.frombuffer(pkgs, dtype=np.int32),
+        list(codes),
+        payload_codes,
+        payloads,
+        np.full(len(codes), user, dtype=np.int32),
+    )
+
+def concat_tables(tables) -> EventTable:
+    """Concatenate tables in order, re-coding (user, package) pairs (and payload values) against shared lists."""
+    codes = {}
+    ts, types, pkgs = [], [], []
+    for table in tables:
+        remap = np.array([codes.setdefault(key, len(codes)) for key in
+                          zip(package_users(table).tolist(), table.packages)], dtype=np.int32)
+        ts.append(table.ts)
+        types.append(table.type)
+        pkgs.append(remap[table.pkg])
+    if not ts:
+        return table_from_events((), payload=True)
+    payload, payloads = None, None
+    if all(table.payloads is not None for table in tables):
+        payload, payloads = concat_payloads(tables)
+    return EventTable(np.concatenate(ts), np.concatenate(types), np.concatenate(pkgs), [p for _, p in codes],
+                      payload, payloads, np.array([u for u, _ in codes], dtype=np.int32))
+
+def tokenize_to_table(path: str, workers: int = 1, progress=None) -> EventTable:
+    """Tokenize a dump into columns; big dumps are split across processes when workers > 1."""
+    return tokenize_hashed(path, workers, progress)[1]
+
+def tokenize_hashed(path: str, workers: int = 1, progress=None):
+    """
+    (SHA-256 of the evidence, EventTable) from a single read of it. The digest is None when
+    the dump was split across processes (memory-mapped chunks; store_table hashes it then).
+    """
+    if workers > 1:
+        from parallel_events import use_parallel, scan_parallel
+        if use_parallel(path, workers):
+            return None, scan_parallel(path, workers, progress)[0]
+    sections = []
+    with profiling.stage("tokenize"), evidence.open_evidence(path) as ev:
+        table = table_from_events(iter_evidence(ev, progress, payload=True, sections=sections), payload=True)
+    return ev.sha256, split_users(table, sections)
+
+def _cache_dir(path: str) -> str:
+    return evidence.cache_base(path) + CACHE_SUFFIX
+
+def _load_cache(cache_dir: str, digest: str):
+    try:
+        with open(os.path.join(cache_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != CACHE_VERSION or meta.get("sha256") != digest:
+            return None
+        with open(os.path.join(cache_dir, "packages.txt"), "r", encoding="utf-8") as f:
+            packages = f.read().split("\n")[:meta["packages"]]
+        cols = [np.load(os.path.join(cache_dir, name + ".npy"), mmap_mode="r") for name in ("ts", "type", "pkg")]
+        users = np.load(os.path.join(cache_dir, "users.npy"))
+        payload = payloads = None
+        if meta["payload_fields"] is not None:
+            with open(os.path.join(cache_dir, "payload_strings.txt"), "r", encoding="utf-8") as f:
+                strings = f.read().split("\n")[:meta["payload_strings"]]
+            payload = np.load(os.path.join(cache_dir, "payload.npy"), mmap_mode="r")
+            payloads = Payloads({key: np.load(os.path.join(cache_dir, f"payload_{key}.npy"), mmap_mode="r")
+                                 for key in meta["payload_fields"]}, strings)
+    except (OSError, ValueError, KeyError):
+        return None
+    return EventTable(*cols, packages, payload, payloads, users)
+
+def _save_cache(cache_dir: str, digest: str, table: EventTable):
+    os.makedirs(cache_dir, exist_ok=True)
+    meta_path = os.path.join(cache_dir, "meta.json")
+    # drop the old marker first so a half-written cache is never picked up
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    for name in ("ts", "type", "pkg"):
+        np.save(os.path.join(cache_dir, name + ".npy"), getattr(table, name))
+    with open(os.path.join(cache_dir, "packages.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(table.packages))
+    np.save(os.path.join(cache_dir, "users.npy"), package_users(table))
+    fields = None
+    if table.payloads is not None:
+        fields = list(table.payloads.fields)
+        np.save(os.path.join(cache_dir, "payload.npy"), table.payload)
+        for key, col in table.payloads.fields.items():
+            np.save(os.path.join(cache_dir, f"payload_{key}.npy"), col)
+        with open(os.path.join(cache_dir, "payload_strings.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(table.payloads.strings))
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "sha256": digest,
+                   "events": len(table.ts), "packages": len(table.packages),
+                   "payload_fields": fields,
+                   "payload_strings": len(table.payloads.strings) if fields is not None else 0}, f)
+
+def cached_table(path: str, progress=None):
+    """
+    Return (sha256 of the dump, cached EventTable or None when missing/stale).
+    Without any cache there is nothing to compare against: (None, None), and the dump is
+    hashed while it is tokenized instead (tokenize_hashed).
+    """
+    if not os.path.exists(os.path.join(_cache_dir(path), "meta.json")):
+        profiling.count("cache_misses")
+        return None, None
+    digest = file_sha256(path, progress=progress)
+    with profiling.stage("cache_load"):
+        table = _load_cache(_cache_dir(path), digest)
+    profiling.count("cache_hits" if table is not None else "cache_misses")
+    return digest, table
+
+def store_table(path: str, digest: str, table: EventTable):
+    """Write the cache for a dump (digest None: hash it first); silently skipped if the folder is read-only."""
+    try:
+        if digest is None:
+            digest = file_sha256(path)
+        with profiling.stage("cache_write"):
+            _save_cache(_cache_dir(path), digest, table)
+    except OSError:
+        pass
+
+def count_table(table: EventTable):
+    """Profile counters for the events a job ends up working on (see profiling.py)."""
+    profiling.count("events", len(table.ts))
+    profiling.count("packages_seen", len(table.packages))
+    profiling.count("users_seen", len(user_ids(table)))
+    profiling.count_events(table.type)
+
+def load_events(path: str, use_cache: bool = True, workers: int = 1) -> EventTable:
+    """
+    Return the dump's events as an EventTable.
+    With use_cache the columns are reused when the dump's SHA-256 matches, and
+    written after a fresh parse.
+    """
+    if not use_cache:
+        table = tokenize_to_table(path, workers)
+    else:
+        digest, table = cached_table(path)
+        if table is None:
+            fresh, table = tokenize_hashed(path, workers)
+            store_table(path, fresh or digest, table)
+    count_table(table)
+    return table
+
+def iter_rows(table: EventTable):
+    """Yield (ts, type_code, package) like events_tokenizer.iter_events, from a table."""
+    names = table.packages
+    return zip(table.ts.tolist(), table.type.tolist(), [names[i] for i in table.pkg.tolist()])
@@ -1,59 +1,58 @@
 # events_parser.py
-import re
+import os, argparse
 import pandas as pd
-from datetime import datetime
 
-TS_RE = re.compile(r'time="(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})"')
-EV_RE = re.compile(r'type=([A-Z_]+)\s+package=([A-Za-z0-9._]+)')
+import profiling
+import evidence
+from events_tokenizer import format_ts
+from parallel_events import usage_stats
 
-def parse_events(path):
+def stats_frame(stats):
+    """(user, pkg) -> [last ts, total seconds, launch count] as the usage_from_events.csv table."""
     results = {}
-    open_sessions = {}
-
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            ts_m = TS_RE.search(line)
-            ev_m = EV_RE.search(line)
-            if not ts_m or not ev_m:
-                continue
-
-            t = datetime.strptime(ts_m.group(1), "%Y-%m-%d %H:%M:%S")
-            ev = ev_m.group(1)
-            pkg = ev_m.group(2)
-
-            row = results.setdefault(pkg, {
-                "Package": pkg,
-                "Last Time Used": None,
-                "Total Time Used (s)": 0,
-                "App Launch Count": 0
-            })
-
-            # Update last time
-            if row["Last Time Used"] is None or t > datetime.strptime(row["Last Time Used"], "%Y-%m-%d %H:%M:%S"):
-                row["Last Time Used"] = t.strftime("%Y-%m-%d %H:%M:%S")
-
-            if ev == "ACTIVITY_RESUMED":
-                row["App Launch Count"] += 1
-                open_sessions[pkg] = t
-
-            if ev in ("ACTIVITY_PAUSED", "ACTIVITY_STOPPED") and pkg in open_sessions:
-                start = open_sessions.pop(pkg)
-                if t > start:
-                    row["Total Time Used (s)"] += (t - start).total_seconds()
 
     # Format total time used
-    for pkg, row in results.items():
-        secs = int(row["Total Time Used (s)"])
+    for (user, pkg), (last, total, launches) in stats.items():
+        secs = int(total)
         h, m, s = secs//3600, (secs%3600)//60, secs%60
-        row["Total Time Used"] = f"{h:02d}:{m:02d}:{s:02d}"
-        del row["Total Time Used (s)"]
-
-    df = pd.DataFrame(results.values())
+        results[user, pkg] = {
+            "Package": pkg,
+            "User": user,
+            "Last Time Used": format_ts(last),
+            "App Launch Count": launches,
+            "Total Time Used": f"{h:02d}:{m:02d}:{s:02d}"
+        }
+
+    df = pd.DataFrame(results.values(), columns=["Package","User","Last Time Used","App Launch Count","Total Time Used"])
     df = df.sort_values("Last Time Used", ascending=False)
     return df
 
+def parse_events(path, use_cache=True, workers=1):
+    return stats_frame(usage_stats(path, use_cache, workers))
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Per-app usage totals from a usagestats events dump")
+    ap.add_argument("dump", nargs="?", default="usagestats_dump.txt", help="usagestats events dump (TXT)")
+    ap.add_argument("--out", default="usage_from_events.csv", help="CSV output (default usage_from_events.csv)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Processes for parsing large dumps (default: all cores, 1 = serial)")
+    ap.add_argument("--no-cache", action="store_true", help="Re-parse the dump instead of using/writing the .evcache")
+    profiling.add_profile_argument(ap, "events_parser_profile.json")
+    return ap.parse_args()
+
+def main():
+    args = parse_args()
+    with profiling.activate(profiling.Profile("events_parser", args.dump)) as prof:
+        df = parse_events(args.dump, not args.no_cache, args.workers)
+        print(df.head(20))
+        with profiling.stage("write_csv"):
+            df.to_csv(args.out, index=False)
+        profiling.count("rows_written", len(df))
+    print(f"✅ Saved {args.out}")
+    evidence.print_digests()
+    if args.profile:
+        prof.write(args.profile)
+        print(f"✅ Saved profile report to {args.profile}")
+
 if __name__ == "__main__":
-    df = parse_events("usagestats_dump.txt")
-    print(df.head(20))
-    df.to_csv("usage_from_events.csv", index=False)
-    print("✅ Saved usage_from_events.csv")
+    main()
@@ -1,90 +1,207 @@
 # events_to_daily_heatmap.py
-# Build a launches-per-day heatmap from usagestats EVENT dump
+# Heatmaps of app activity from usagestats EVENT dumps, binned with integer arithmetic and
+# one np.bincount over the event/session arrays (no per-event Python loop).
+#   --bins day       dates x top-N apps (default)
+#   --bins slot15    15-minute slot of the day x top-N apps, summed over all days
+#   --bins hour-dow  day of week x hour of day, summed over all apps (or --package ...)
+#   --metric launches (ACTIVITY_RESUMED) | seconds (foreground time, sessions cut at bin edges)
+#            | notifications (NOTIFICATION_INTERRUPTION)
+# Several dumps (e.g. one per device) are added together; sessions are paired per dump.
+# Each Android user's use of an app is its own column ("pkg (user 10)" for users other
+# than 0); --user keeps one user's events only.
 # Usage:
 #   python events_to_daily_heatmap.py usagestats_dump.txt --top 12
+#   python events_to_daily_heatmap.py dev1.txt dev2.txt --bins hour-dow --metric seconds
 # Output:
-#   daily_launch_counts.csv + a PNG figure
+#   daily_launch_counts.csv + launch_heatmap.png (default), else heatmap_<metric>_<bins>.csv/.png
 
-import re, sys, argparse
-from datetime import datetime
-from collections import defaultdict, Counter
+import os, sys, argparse
 
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MaxNLocator
 
-TS_RE = re.compile(r'time="(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})"')
-EV_RE = re.compile(r'type=([A-Z_]+)\s+package=([A-Za-z0-9._]+)')
+import profiling
+from events_tokenizer import ts_to_datetime, EVENT_TYPES, ACTIVITY_RESUMED
+from event_cache import load_events, package_labels, select_user
+from sessions import build_sessions, session_spans, split_at
+
+BINS = {"day": 86400, "slot15": 900, "hour-dow": 3600}  # bin width in seconds
+METRICS = {"launches": "Launches", "seconds": "Foreground seconds", "notifications": "Notifications"}
+METRIC_EVENTS = {"launches": ACTIVITY_RESUMED, "notifications": EVENT_TYPES["NOTIFICATION_INTERRUPTION"]}
+DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
 
 def parse_args():
-    ap = argparse.ArgumentParser(description="Heatmap of app launches per day")
-    ap.add_argument("dump", help="usagestats events dump (TXT)")
-    ap.add_argument("--top", type=int, default=10, help="Top-N apps by launches to show (default 10)")
-    ap.add_argument("--out", default="daily_launch_counts.csv", help="CSV output filename")
-    ap.add_argument("--fig", default="launch_heatmap.png", help="PNG figure output")
+    ap = argparse.ArgumentParser(description="Heatmap of app activity per time bin")
+    ap.add_argument("dump", nargs="+", help="usagestats events dump(s) (TXT); several are added together")
+    ap.add_argument("--bins", choices=list(BINS), default="day", help="Time bins (default day)")
+    ap.add_argument("--metric", choices=list(METRICS), default="launches", help="What to count (default launches)")
+    ap.add_argument("--top", type=int, default=10, help="Top-N apps by the metric to show (default 10)")
+    ap.add_argument("--package", action="append", default=[],
+                    help="Only these apps (repeatable; 'pkg (user 10)' for another user's); for --bins hour-dow, the apps summed")
+    ap.add_argument("--user", type=int, help="Only this Android user's events (default: every user)")
+    ap.add_argument("--out", help="CSV output filename")
+    ap.add_argument("--fig", help="PNG figure output")
+    ap.add_argument("--show", action="store_true", help="Also open the figure in a window (needs a display)")
+    ap.add_argument("--no-cache", action="store_true", help="Re-parse the dump instead of using/writing the .evcache")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Processes for parsing large dumps (default: all cores, 1 = serial)")
+    profiling.add_profile_argument(ap, "heatmap_profile.json")
     return ap.parse_args()
 
+# ----------------- BINNING -----------------
+
+def bin_key(ts, bins: str):
+    """Raw bin of naive epoch seconds: day number, slot of the day (0..95) or dow * 24 + hour."""
+    if bins == "day":
+        return ts // 86400
+    if bins == "slot15":
+        return ts % 86400 // 900
+    # 1970-01-01 was a Thursday (Mon = 0)
+    return (ts // 86400 + 3) % 7 * 24 + ts % 86400 // 3600
+
+def metric_points(table, metric: str, bins: str, spans=None):
+    """
+    (bin key, package code, weight) for one dump; weight None means 1 per event.
+    spans: the dump's session_spans() when already built.
+    """
+    if metric == "seconds":
+        if spans is None:
+            spans = session_spans(build_sessions(table))
+        # foreground time cut at every bin edge, so each piece falls in exactly one bin
+        _, pkg, start, end = split_at(*spans, BINS[bins])
+        return bin_key(start, bins), pkg, end - start
+    sel = np.flatnonzero(np.asarray(table.type) == METRIC_EVENTS[metric])
+    return bin_key(np.asarray(table.ts)[sel], bins), np.asarray(table.pkg)[sel], None
+
+def bin_matrix(tables, metric: str, bins: str, spans=None):
+    """
+    (matrix [rows x packages], row keys, package labels) summed over all tables.
+    Rows: every day from the first to the last with data, 96 slots, or 168 hours of the week.
+    spans: each table's session_spans(), when already built (see metric_points).
+    """
+    codes = {}
+    keys, pkgs, weights = [], [], []
+    for i, table in enumerate(tables):
+        remap = np.array([codes.setdefault(p, len(codes)) for p in package_labels(table)], dtype=np.int64)
+        key, pkg, w = metric_points(table, metric, bins, None if spans is None else spans[i])
+        keys.append(key.astype(np.int64))
+        pkgs.append(remap[pkg])
+        weights.append(np.ones(len(key), dtype=np.int64) if w is None else w.astype(np.int64))
+    names = list(codes)
+    key, pkg, w = (np.concatenate(a) if a else np.array([], dtype=np.int64) for a in (keys, pkgs, weights))
+
+    if bins == "day":
+        first = int(key.min()) if len(key) else 0
+        rows = np.arange(first, int(key.max()) + 1 if len(key) else first)
+        key = key - first
+    else:
+        rows = np.arange(96 if bins == "slot15" else 168)
+    n_pkg = max(len(names), 1)
+    flat = np.bincount(key * n_pkg + pkg, weights=w, minlength=len(rows) * n_pkg)
+    return flat.round().astype(np.int64).reshape(len(rows), n_pkg)[:, :len(names)], rows, names
+
+def select_columns(matrix, names, top: int, packages=()):
+    """Column indices: the given packages, else the top-N by total (ties by name); returned in name order."""
+    if packages:
+        wanted = set(packages)
+        cols = [i for i, p in enumerate(names) if p in wanted]
+    else:
+        totals = matrix.sum(axis=0)
+        by_name = sorted(range(len(names)), key=names.__getitem__)
+        ranked = sorted(by_name, key=lambda i: -totals[i])
+        cols = [i for i in ranked if totals[i] > 0][:top]
+    return sorted(cols, key=names.__getitem__)
+
+def heatmap_frame(matrix, rows, names, bins: str, top: int, packages=()):
+    """The table that is saved and drawn."""
+    cols = select_columns(matrix, names, top, packages)
+    if bins == "hour-dow":
+        grid = matrix[:, cols].sum(axis=1).reshape(7, 24)
+        return pd.DataFrame(grid, index=pd.Index(DAY_NAMES, name="Day"),
+                            columns=pd.Index([f"{h:02d}" for h in range(24)], name="Hour"))
+
+    sub = matrix[:, cols]
+    if bins == "day":
+        # only days on which a shown app has data (as the per-day counts always were)
+        keep = sub.any(axis=1)
+        sub, rows = sub[keep], rows[keep]
+        index = pd.Index([ts_to_datetime(d * 86400).date().isoformat() for d in rows.tolist()], name="Date")
+    else:
+        index = pd.Index([f"{s // 4:02d}:{s % 4 * 15:02d}" for s in rows.tolist()], name="Slot")
+    return pd.DataFrame(sub, index=index, columns=pd.Index([names[i] for i in cols], name="Package"))
+
+# ----------------- PLOT -----------------
+
+def draw_heatmap(df: pd.DataFrame, metric: str, bins: str):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(max(8, len(df.columns)*0.7), min(max(5, len(df.index)*0.4), 16)))
+    im = ax.imshow(df.values, aspect="auto", interpolation="nearest")  # default colormap
+
+    ax.set_xticks(range(len(df.columns)))
+    if bins == "hour-dow":
+        ax.set_xticklabels(df.columns)
+    else:
+        ax.set_xticklabels(df.columns, rotation=45, ha="right")
+    step = max(1, -(-len(df.index) // 48))  # at most ~48 row labels
+    ax.set_yticks(range(0, len(df.index), step))
+    ax.set_yticklabels(df.index[::step])
+    what = METRICS[metric]
+    if bins == "day":
+        ax.set_title(f"{what} per day (Top {len(df.columns)} apps)")
+    elif bins == "slot15":
+        ax.set_title(f"{what} per 15-minute slot of the day (Top {len(df.columns)} apps)")
+    else:
+        ax.set_title(f"{what} by day of week and hour")
+    ax.set_xlabel("Hour of day" if bins == "hour-dow" else "App package")
+    ax.set_ylabel(df.index.name)
+
+    cbar = plt.colorbar(im, ax=ax)
+    cbar.set_label(what)
+    fig.tight_layout()
+    return fig
+
+# ----------------- MAIN -----------------
+
 def main():
     args = parse_args()
-
-    # Count RESUMED per (date, package)
-    day_pkg = Counter()
-
-    with open(args.dump, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            ts_m = TS_RE.search(line)
-            ev_m = EV_RE.search(line)
-            if not ts_m or not ev_m:
-                continue
-            ev = ev_m.group(1)
-            if ev != "ACTIVITY_RESUMED":
-                continue
-            pkg = ev_m.group(2)
-            dt = datetime.strptime(ts_m.group(1), "%Y-%m-%d %H:%M:%S")
-            day = dt.date().isoformat()
-            day_pkg[(day, pkg)] += 1
-
-    if not day_pkg:
-        print("No ACTIVITY_RESUMED events found. Open some apps, regenerate dump, and try again.")
+    # pyplot (~0.5 s) only once there is something to draw, not for --help / bad arguments
+    import matplotlib.pyplot as plt
+    if not args.show:
+        plt.switch_backend("Agg")
+    with profiling.activate(profiling.Profile("events_to_daily_heatmap", args.dump[0])) as prof:
+        heatmap(args)
+    if args.profile:
+        prof.write(args.profile)
+        print(f"✅ Saved profile report to {args.profile}")
+    if args.show:
+        plt.show()
+
+def heatmap(args):
+    default = args.metric == "launches" and args.bins == "day"
+    out = args.out or ("daily_launch_counts.csv" if default else f"heatmap_{args.metric}_{args.bins}.csv")
+    fig_name = args.fig or ("launch_heatmap.png" if default else f"heatmap_{args.metric}_{args.bins}.png")
+
+    tables = [load_events(path, not args.no_cache, args.workers) for path in args.dump]
+    if args.user is not None:
+        tables = [select_user(table, args.user) for table in tables]
+    with profiling.stage("bin"):
+        matrix, rows, names = bin_matrix(tables, args.metric, args.bins)
+        df = heatmap_frame(matrix, rows, names, args.bins, args.top, args.package)
+
+    if not df.values.any():
+        print(f"No data for --metric {args.metric}. Open some apps, regenerate dump, and try again.")
         sys.exit(1)
 
-    # Build DataFrame
-    rows = [{"Date": d, "Package": p, "Launches": c} for (d, p), c in day_pkg.items()]
-    df = pd.DataFrame(rows)
-    # Top-N apps overall
-    top_apps = (df.groupby("Package")["Launches"].sum()
-                  .sort_values(ascending=False).head(args.top).index.tolist())
-    df = df[df["Package"].isin(top_apps)]
-
-    # Pivot to Date × Package
-    pivot = df.pivot_table(index="Date", columns="Package", values="Launches", aggfunc="sum", fill_value=0)
-    pivot = pivot.sort_index()  # date ascending
-
-    # Save CSV
-    pivot.to_csv(args.out, index=True)
-    print(f"✅ Saved daily launch counts to {args.out}")
-
-    # Plot heatmap (matplotlib only; no seaborn)
-    fig, ax = plt.subplots(figsize=(max(8, len(top_apps)*0.7), max(5, len(pivot.index)*0.4)))
-    im = ax.imshow(pivot.values, aspect="auto", interpolation="nearest")  # default colormap
-
-    # Axis labels
-    ax.set_xticks(range(len(pivot.columns)))
-    ax.set_xticklabels(pivot.columns, rotation=45, ha="right")
-    ax.set_yticks(range(len(pivot.index)))
-    ax.set_yticklabels(pivot.index)
-    ax.set_title("App launches per day (Top {} apps)".format(len(top_apps)))
-    ax.set_xlabel("App package")
-    ax.set_ylabel("Date")
-
-    # Add a simple colorbar
-    cbar = plt.colorbar(im, ax=ax)
-    cbar.set_label("Launches")
+    with profiling.stage("write_csv"):
+        df.to_csv(out, index=True)
+    profiling.count("rows_written", len(df))
+    print(f"✅ Saved {METRICS[args.metric].lower()} per {args.bins} to {out}")
 
-    plt.tight_layout()
-    plt.savefig(args.fig, dpi=200)
-    print(f"✅ Saved heatmap to {args.fig}")
-    plt.show()
+    with profiling.stage("plot"):
+        fig = draw_heatmap(df, args.metric, args.bins)
+    with profiling.stage("savefig"):
+        fig.savefig(fig_name, dpi=200)
+    print(f"✅ Saved heatmap to {fig_name}")
 
 if __name__ == "__main__":
     main()
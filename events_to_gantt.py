@@ -1,143 +1,185 @@
 # events_to_gantt.py
-# Build a Gantt-style chart of usage sessions (RESUMED -> PAUSED/STOPPED) for a chosen day
+# Build a Gantt-style chart of usage sessions (RESUMED -> PAUSED/STOPPED) for a chosen day.
+# Sessions come from sessions.py; ones crossing midnight are split between the days.
+# On a multi-user device each user's use of an app is its own row ("pkg (user 10)");
+# --user keeps one user's sessions only.
 # Usage:
 #   python events_to_gantt.py usagestats_dump.txt --day 2025-08-30 --top 10
+#   python events_to_gantt.py usagestats_dump.txt --all-days --outdir charts
+#   python events_to_gantt.py usagestats_dump.txt --range 2025-08-01 2025-08-31 --outdir charts
 # Output:
-#   gantt_<day>.png + a sessions CSV
+#   gantt_<day>.png + a sessions CSV (one pair per day in --all-days/--range mode)
 
-import re, sys, argparse
+import os, sys, argparse
 from datetime import datetime, timedelta
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.dates import DateFormatter, MinuteLocator, HourLocator
+import numpy as np
 
-TS_RE = re.compile(r'time="(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})"')
-EV_RE = re.compile(r'type=([A-Z_]+)\s+package=([A-Za-z0-9._]+)')
+import profiling
+from events_tokenizer import ts_to_datetime, date_to_ts, parse_day, ACTIVITY_RESUMED, SESSION_END_TYPES
+from event_cache import load_events, package_users, package_labels, select_user
+from sessions import build_sessions, session_spans, split_by_day, sessions_frame
+
+SESSION_TYPES = (ACTIVITY_RESUMED,) + SESSION_END_TYPES
 
 def parse_args():
     ap = argparse.ArgumentParser(description="Gantt of app sessions for a day")
     ap.add_argument("dump", help="usagestats events dump (TXT)")
     ap.add_argument("--day", help="YYYY-MM-DD (default: latest day found in dump)")
+    ap.add_argument("--all-days", action="store_true", help="One chart + CSV for every day with sessions")
+    ap.add_argument("--range", nargs=2, metavar=("FIRST", "LAST"), help="One chart + CSV per day, FIRST..LAST inclusive")
+    ap.add_argument("--outdir", default=".", help="Folder for the per-day files in --all-days/--range mode")
     ap.add_argument("--top", type=int, default=10, help="Top-N apps by total session time")
+    ap.add_argument("--user", type=int, help="Only this Android user's sessions (default: every user)")
     ap.add_argument("--fig", help="Output PNG filename (optional)")
     ap.add_argument("--out", default=None, help="Sessions CSV filename (optional)")
+    ap.add_argument("--show", action="store_true", help="Also open the single-day chart in a window (needs a display)")
+    ap.add_argument("--no-cache", action="store_true", help="Re-parse the dump instead of using/writing the .evcache")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Processes for parsing large dumps and rendering days (default: all cores, 1 = serial)")
+    profiling.add_profile_argument(ap, "gantt_profile.json")
     return ap.parse_args()
 
+def top_sessions(packages, pkg, start, end, top):
+    """Keep the sessions of the top-N packages by total time; returns (names, codes, pkg, start, end)."""
+    totals = np.bincount(pkg, weights=end - start, minlength=len(packages))
+    ranked = np.argsort(-totals, kind="stable")
+    top_codes = ranked[totals[ranked] > 0][:top]
+    keep = np.isin(pkg, top_codes)
+    return [packages[c] for c in top_codes], top_codes, pkg[keep], start[keep], end[keep]
+
+def draw_gantt(day, top_pkgs, top_codes, pkg, start, end):
+    """One figure for one day; every bar goes into a single PolyCollection."""
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PolyCollection
+    from matplotlib.dates import DateFormatter, HourLocator, date2num
+    fig, ax = plt.subplots(figsize=(12, max(5, len(top_pkgs)*0.6)))
+
+    # row of each session: 10, 22, 34, ... in top order
+    row = np.empty(max(top_codes.max() + 1, 1) if len(top_codes) else 1, dtype=np.int64)
+    row[top_codes] = np.arange(len(top_codes))
+    y0 = 10 + 12 * row[pkg]
+    # naive epoch seconds -> matplotlib date numbers without a datetime per bar
+    x0 = date2num(datetime(1970, 1, 1)) + start / 86400.0
+    x1 = x0 + (end - start) / 86400.0
+    verts = np.stack([np.column_stack(p) for p in ((x0, y0), (x0, y0 + 8), (x1, y0 + 8), (x1, y0))], axis=1)
+    ax.add_collection(PolyCollection(verts))
+    ax.set_ylim(5, 10 + 12 * max(len(top_pkgs), 1))
+
+    ax.set_yticks([10 + 12 * i + 4 for i in range(len(top_pkgs))])
+    ax.set_yticklabels(top_pkgs)
+    ax.xaxis.set_major_locator(HourLocator(interval=1))
+    ax.xaxis.set_major_formatter(DateFormatter('%H:%M'))
+    start_day = datetime.combine(day, datetime.min.time())
+    ax.set_xlim(start_day, start_day + timedelta(days=1))
+    ax.set_title(f"App usage sessions on {day.isoformat()} (Top {len(top_pkgs)} by duration)")
+    ax.set_xlabel("Time of day")
+    ax.set_ylabel("Apps")
+    fig.tight_layout()
+    return fig
+
+def render_day(job):
+    """Write one day's sessions CSV and PNG (runs in a worker process with the Agg backend)."""
+    import matplotlib.pyplot as plt
+    day, packages, users, labels, pkg, start, end, top, csv_path, fig_path = job
+    plt.switch_backend("Agg")
+    top_pkgs, top_codes, pkg, start, end = top_sessions(labels, pkg, start, end, top)
+    sessions_frame(packages, pkg, start, end, users).to_csv(csv_path, index=False)
+    fig = draw_gantt(day, top_pkgs, top_codes, pkg, start, end)
+    fig.savefig(fig_path, dpi=200)
+    plt.close(fig)
+    return day
+
 def main():
     args = parse_args()
-
-    # Parse all events
-    events = []  # (dt, ev, pkg)
-    with open(args.dump, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            ts_m = TS_RE.search(line)
-            ev_m = EV_RE.search(line)
-            if not ts_m or not ev_m:
-                continue
-            dt = datetime.strptime(ts_m.group(1), "%Y-%m-%d %H:%M:%S")
-            ev = ev_m.group(1)
-            pkg = ev_m.group(2)
-            if ev not in ("ACTIVITY_RESUMED","ACTIVITY_PAUSED","ACTIVITY_STOPPED"):
-                continue
-            events.append((dt, ev, pkg))
-
-    if not events:
+    try:
+        args.day = parse_day(args.day) if args.day else None
+        args.range = [parse_day(d) for d in args.range] if args.range else None
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    # pyplot (~0.5 s) only once there is something to draw, not for --help / bad arguments
+    import matplotlib.pyplot as plt
+    if not args.show:
+        plt.switch_backend("Agg")
+    with profiling.activate(profiling.Profile("events_to_gantt", args.dump)) as prof:
+        show = gantt(args)
+    if args.profile:
+        prof.write(args.profile)
+        print(f"✅ Saved profile report to {args.profile}")
+    if show and args.show:
+        plt.show()
+
+def gantt(args):
+    """Write the chart(s) and CSV(s); returns True when a single-day figure is left open to show."""
+    table = load_events(args.dump, not args.no_cache, args.workers)
+    if args.user is not None:
+        table = select_user(table, args.user)
+    users, labels = package_users(table), package_labels(table)
+    session_ts = table.ts[np.isin(table.type, SESSION_TYPES)]
+
+    if not len(session_ts):
         print("No relevant events found.")
         sys.exit(1)
 
+    # One session pass for every day; sessions crossing midnight are split (sessions.py)
+    with profiling.stage("sessions"):
+        day_no, pkg, start, end = split_by_day(*session_spans(build_sessions(table)))
+
+    if args.all_days or args.range:
+        if args.range:
+            first, last = (date_to_ts(d) // 86400 for d in args.range)
+            days = range(first, last + 1)
+        else:
+            days = np.unique(day_no).tolist()
+        os.makedirs(args.outdir, exist_ok=True)
+
+        # day_no is sorted, so each day is one contiguous slice
+        cuts = np.searchsorted(day_no, np.arange(days[0], days[-1] + 2)) if len(days) else []
+        jobs = []
+        for d in days:
+            lo, hi = cuts[d - days[0]], cuts[d - days[0] + 1]
+            day = ts_to_datetime(d * 86400).date()
+            jobs.append((day, table.packages, users, labels, pkg[lo:hi], start[lo:hi], end[lo:hi], args.top,
+                         os.path.join(args.outdir, f"sessions_{day.isoformat()}.csv"),
+                         os.path.join(args.outdir, f"gantt_{day.isoformat()}.png")))
+
+        with profiling.stage("render_days"):
+            if args.workers > 1 and len(jobs) > 1:
+                with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                    done = list(pool.map(render_day, jobs))
+            else:
+                done = [render_day(job) for job in jobs]
+        profiling.count("days_rendered", len(done))
+        profiling.count("rows_written", sum(len(job[4]) for job in jobs))
+        print(f"✅ Saved {len(done)} Gantt charts + sessions CSVs to {args.outdir}")
+        return False
+
     # Determine target day
-    dates = sorted({e[0].date() for e in events})
-    target_day = datetime.strptime(args.day, "%Y-%m-%d").date() if args.day else dates[-1]
-    start_day = datetime.combine(target_day, datetime.min.time())
-    end_day = start_day + timedelta(days=1)
-
-    # Build sessions (start = RESUMED, end = next PAUSED/STOPPED)
-    sessions = defaultdict(list)  # pkg -> list of (start, end)
-    open_start = {}               # pkg -> start_dt
-
-    for dt, ev, pkg in sorted(events):
-        if dt.date() < target_day or dt >= end_day:
-            # still allow a session that started earlier but ends today
-            if ev in ("ACTIVITY_PAUSED","ACTIVITY_STOPPED") and pkg in open_start:
-                st = open_start.pop(pkg)
-                if st < end_day and dt >= start_day:
-                    s = max(st, start_day)
-                    e = min(dt, end_day)
-                    if e > s:
-                        sessions[pkg].append((s, e))
-            continue
-
-        if ev == "ACTIVITY_RESUMED":
-            open_start[pkg] = dt
-        elif ev in ("ACTIVITY_PAUSED","ACTIVITY_STOPPED"):
-            if pkg in open_start:
-                st = open_start.pop(pkg)
-                # clip to the day window
-                s = max(st, start_day)
-                e = min(dt, end_day)
-                if e > s:
-                    sessions[pkg].append((s, e))
-
-    # close any still-open sessions at end of day
-    for pkg, st in list(open_start.items()):
-        s = max(st, start_day)
-        e = end_day
-        if e > s:
-            sessions[pkg].append((s, e))
+    target_day = args.day or ts_to_datetime(session_ts.max()).date()
+    mask = day_no == date_to_ts(target_day) // 86400
 
     # Compute totals and select top apps
-    totals = {pkg: sum((e - s).total_seconds() for s, e in sess) for pkg, sess in sessions.items()}
-    top_pkgs = [p for p, _ in sorted(totals.items(), key=lambda x: x[1], reverse=True)[:args.top]]
+    top_pkgs, top_codes, pkg, start, end = top_sessions(labels, pkg[mask], start[mask], end[mask], args.top)
 
     # Build DataFrame of sessions for CSV
-    rows = []
-    for pkg in top_pkgs:
-        for s, e in sessions.get(pkg, []):
-            rows.append({"Package": pkg, "Start": s, "End": e, "Duration_s": (e - s).total_seconds()})
-    sess_df = pd.DataFrame(rows).sort_values(["Package","Start"])
+    sess_df = sessions_frame(table.packages, pkg, start, end, users)
     if args.out is None:
         args.out = f"sessions_{target_day.isoformat()}.csv"
-    sess_df.to_csv(args.out, index=False)
+    with profiling.stage("write_csv"):
+        sess_df.to_csv(args.out, index=False)
+    profiling.count("rows_written", len(sess_df))
     print(f"✅ Saved sessions CSV to {args.out}")
 
-    # Plot Gantt using broken_barh
-    fig, ax = plt.subplots(figsize=(12, max(5, len(top_pkgs)*0.6)))
-    y_ticks, y_labels = [], []
-    y = 10
-    for pkg in top_pkgs:
-        segs = []
-        for _, row in sess_df[sess_df["Package"] == pkg].iterrows():
-            start = pd.to_datetime(row["Start"]).to_pydatetime()
-            end = pd.to_datetime(row["End"]).to_pydatetime()
-            segs.append( (start, end - start) )
-        # convert to matplotlib's float dates
-        segs_conv = [(pd.to_datetime(s).to_pydatetime(), d) for s, d in segs]
-        # matplotlib broken_barh expects numbers, so convert using date2num
-        from matplotlib.dates import date2num
-        segs_num = [(date2num(s), d.total_seconds()/86400.0) for s, d in segs_conv]  # duration in days
-
-        ax.broken_barh(segs_num, (y, 8))
-        y_ticks.append(y + 4)
-        y_labels.append(pkg)
-        y += 12
-
-    ax.set_yticks(y_ticks)
-    ax.set_yticklabels(y_labels)
-    ax.xaxis.set_major_locator(HourLocator(interval=1))
-    ax.xaxis.set_major_formatter(DateFormatter('%H:%M'))
-    ax.set_xlim(pd.to_datetime(start_day), pd.to_datetime(end_day))
-    ax.set_title(f"App usage sessions on {target_day.isoformat()} (Top {len(top_pkgs)} by duration)")
-    ax.set_xlabel("Time of day")
-    ax.set_ylabel("Apps")
-
-    plt.tight_layout()
+    # Plot Gantt: one PolyCollection for all bars
+    with profiling.stage("plot"):
+        fig = draw_gantt(target_day, top_pkgs, top_codes, pkg, start, end)
     fig_name = args.fig or f"gantt_{target_day.isoformat()}.png"
-    plt.savefig(fig_name, dpi=200)
+    with profiling.stage("savefig"):
+        fig.savefig(fig_name, dpi=200)
     print(f"✅ Saved Gantt chart to {fig_name}")
-    plt.show()
+    return True
 
 if __name__ == "__main__":
     main()
-
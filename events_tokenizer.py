@@ -0,0 +1,211 @@
+# events_tokenizer.py
+# Shared single-pass tokenizer for 'dumpsys usagestats' EVENT dumps.
+# Every event line looks like:
+#   time="2025-08-30 20:24:32" type=ACTIVITY_RESUMED package=com.whatsapp class=... flags=0x0
+# and is turned into a typed tuple (epoch seconds, event-type code, interned package),
+# plus, when asked for, the rest of the line (the event's key=value payload) as one string.
+# Payloads depend on the event type, e.g.
+#   ACTIVITY_*                  class instanceId taskRootPackage taskRootClass
+#   STANDBY_BUCKET_CHANGED      standbyBucket reason
+#   NOTIFICATION_INTERRUPTION   channelId
+#   FOREGROUND_SERVICE_*        class
+#   SHORTCUT_INVOCATION         shortcutId
+# and parse_payload() splits one into a dict (event_cache.py packs them into columns).
+#
+# A device with a work profile or secondary users dumps one section per user, each
+# starting with a 'user=N' line (the dump always opens with user=0). The tokenizer
+# reports where each section starts (sections=); event_cache.py gives every user its
+# own package codes, so sessions are never paired across users.
+#
+# Timestamps are the device's wall-clock time as printed in the dump; they are
+# converted to "naive" epoch seconds (no timezone applied), so ts_to_datetime()
+# gives back exactly the string that was in the dump.
+
+import re, sys
+from itertools import islice
+from datetime import date, datetime, timedelta
+
+import profiling
+from evidence import open_evidence
+
+# One anchored scan per line: time, type and package in a single match
+EVENT_RE = re.compile(r'\s*time="(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})"\s+type=([A-Z_]+)\s+package=([A-Za-z0-9._]+)')
+# Section header: 'user=10' at the start of a line (events before any header are user 0)
+USER_RE = re.compile(r'user=(\d+)\s*$')
+
+# Event-type codes, same values as android.app.usage.UsageEvents.Event
+EVENT_TYPES = {
+    "NONE": 0,
+    "ACTIVITY_RESUMED": 1,
+    "ACTIVITY_PAUSED": 2,
+    "END_OF_DAY": 3,
+    "CONTINUE_PREVIOUS_DAY": 4,
+    "CONFIGURATION_CHANGE": 5,
+    "SYSTEM_INTERACTION": 6,
+    "USER_INTERACTION": 7,
+    "SHORTCUT_INVOCATION": 8,
+    "CHOOSER_ACTION": 9,
+    "NOTIFICATION_SEEN": 10,
+    "STANDBY_BUCKET_CHANGED": 11,
+    "NOTIFICATION_INTERRUPTION": 12,
+    "SLICE_PINNED_PRIV": 13,
+    "SLICE_PINNED": 14,
+    "SCREEN_INTERACTIVE": 15,
+    "SCREEN_NON_INTERACTIVE": 16,
+    "KEYGUARD_SHOWN": 17,
+    "KEYGUARD_HIDDEN": 18,
+    "FOREGROUND_SERVICE_START": 19,
+    "FOREGROUND_SERVICE_STOP": 20,
+    "CONTINUING_FOREGROUND_SERVICE": 21,
+    "ROLLOVER_FOREGROUND_SERVICE": 22,
+    "ACTIVITY_STOPPED": 23,
+    "ACTIVITY_DESTROYED": 24,
+    "FLUSH_TO_DISK": 25,
+    "DEVICE_SHUTDOWN": 26,
+    "DEVICE_STARTUP": 27,
+    "USER_UNLOCKED": 28,
+    "USER_STOPPED": 29,
+    "LOCUS_ID_SET": 30,
+    "APP_COMPONENT_USED": 31,
+}
+EVENT_NAMES = {code: name for name, code in EVENT_TYPES.items()}
+
+ACTIVITY_RESUMED = EVENT_TYPES["ACTIVITY_RESUMED"]
+ACTIVITY_PAUSED = EVENT_TYPES["ACTIVITY_PAUSED"]
+ACTIVITY_STOPPED = EVENT_TYPES["ACTIVITY_STOPPED"]
+SESSION_END_TYPES = (ACTIVITY_PAUSED, ACTIVITY_STOPPED)
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# payload keys holding numbers (numpy dtype, base); every other key is kept as a string
+PAYLOAD_INTS = {"standbyBucket": ("int16", 10), "instanceId": ("int64", 10), "flags": ("int64", 16)}
+
+# ----------------- TIMESTAMPS -----------------
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_TS_CACHE_MAX = 1 << 16
+_ts_cache = {}
+
+def parse_ts(s: str) -> int:
+    """
+    'YYYY-MM-DD HH:MM:SS' -> naive epoch seconds. Identical strings are parsed once.
+    Anything else (including 25:00:00 or :60 seconds) raises ValueError.
+    """
+    t = _ts_cache.get(s)
+    if t is None:
+        # fixed-width slicing instead of strptime; date() still validates the calendar
+        try:
+            day = date(int(s[0:4]), int(s[5:7]), int(s[8:10])).toordinal() - _EPOCH_ORDINAL
+            h, m, sec = int(s[11:13]), int(s[14:16]), int(s[17:19])
+        except ValueError:
+            h = -1
+        if len(s) != 19 or not (0 <= h < 24 and 0 <= m < 60 and 0 <= sec < 60):
+            raise ValueError(f"not a 'YYYY-MM-DD HH:MM:SS' time: {s!r}")
+        t = day * 86400 + h * 3600 + m * 60 + sec
+        if len(_ts_cache) >= _TS_CACHE_MAX:
+            _ts_cache.clear()
+        _ts_cache[s] = t
+    return t
+
+def ts_to_datetime(ts: int) -> datetime:
+    return _EPOCH + timedelta(seconds=int(ts))
+
+def format_ts(ts: int) -> str:
+    return ts_to_datetime(ts).strftime(TS_FORMAT)
+
+def parse_day(s: str) -> date:
+    """'YYYY-MM-DD' -> date; ValueError otherwise."""
+    try:
+        return datetime.strptime(s, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"not a 'YYYY-MM-DD' day: {s!r}") from None
+
+def date_to_ts(d: date) -> int:
+    """Naive epoch seconds of midnight at the start of a calendar day."""
+    return (d.toordinal() - _EPOCH_ORDINAL) * 86400
+
+# ----------------- TOKENIZER -----------------
+
+def parse_payload(rest: str) -> dict:
+    """'standbyBucket=40 reason=t flags=0x0' -> {'standbyBucket': '40', 'reason': 't', 'flags': '0x0'}."""
+    out, key = {}, None
+    for tok in rest.split():
+        k, eq, v = tok.partition("=")
+        if eq and k.isidentifier():
+            key = k
+            out[k] = v
+        elif key is not None:
+            out[key] += " " + tok  # a value with spaces in it
+    return out
+
+def tokenize_lines(lines, payload: bool = False, sections: list = None):
+    """
+    Yield (ts, type_code, package) for every event line in an iterable of text lines,
+    or (ts, type_code, package, payload text) with payload=True.
+    Lines without time/type/package (section headers, in-memory stats, ...) are skipped.
+    sections, if given a list, gets (number of events yielded before it, user id) appended
+    for every 'user=N' line.
+    """
+    match = EVENT_RE.match
+    types = EVENT_TYPES
+    intern = sys.intern
+    last_s, last_t = None, None
+    n = events = 0
+
+    for n, line in enumerate(lines, 1):
+        m = match(line)
+        if not m:
+            # only non-event lines pay for the header check
+            if sections is not None and line.startswith("user="):
+                u = USER_RE.match(line)
+                if u:
+                    sections.append((events, int(u.group(1))))
+            continue
+        s, ev, pkg = m.groups()
+        # bursts of events share the same second; skip even the cache lookup
+        if s != last_s:
+            try:
+                last_t = parse_ts(s)
+            except ValueError:
+                profiling.count("bad_timestamps")
+                continue
+            last_s = s
+        events += 1
+        if payload:
+            yield last_t, types.get(ev, 0), intern(pkg), line[m.end():].strip()
+        else:
+            yield last_t, types.get(ev, 0), intern(pkg)
+    profiling.count("lines_scanned", n)
+
+PROGRESS_LINES = 1 << 16  # lines between two progress reports
+
+def iter_events(path: str, progress=None, payload: bool = False, sections: list = None):
+    """
+    Yield (ts, type_code, package[, payload text]) for every event line of an EVENT dump, in file order.
+    path may be compressed or an archive member (see evidence.py); its SHA-256 is taken in the same read.
+    progress, if given, is called as progress("parse", bytes read, file size, events so far)
+    after every block of lines (bytes of the file on disk); it may raise to stop the parse early.
+    sections: see tokenize_lines.
+    """
+    with open_evidence(path) as ev:
+        yield from iter_evidence(ev, progress, payload, sections)
+
+def iter_evidence(ev, progress=None, payload: bool = False, sections: list = None):
+    """iter_events() over an already opened evidence.Evidence (its sha256 is set once it is closed)."""
+    f = ev.text()
+    if progress is None:
+        yield from tokenize_lines(f, payload, sections)
+        return
+    events = 0
+    while True:
+        block = list(islice(f, PROGRESS_LINES))
+        if not block:
+            break
+        found = [] if sections is not None else None
+        batch = list(tokenize_lines(block, payload, found))
+        if found:
+            sections.extend((i + events, user) for i, user in found)
+        events += len(batch)
+        yield from batch
+        progress("parse", min(ev.bytes_read, ev.size), ev.size, events)
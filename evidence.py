@@ -0,0 +1,344 @@
+# evidence.py
+# Evidence files opened as one sequential stream and hashed in the same read.
+# A path given to any reader may be
+#   usagestats_dump.txt                          a plain file
+#   usagestats_dump.txt.gz  (.bz2, .xz)          one compressed file (recognised by its magic bytes)
+#   case.zip!PIXEL7/usagestats_dump.txt          a member of a .zip, .tar, .tar.gz/.tgz, .tar.bz2 or .tar.xz
+# (the part before "!" is the file on disk). Members are decompressed while they are read, with
+# no temp file; .zip archives are walked front to back through their local headers.
+# The SHA-256 is that of the bytes on disk (the archive itself, not the member): when the
+# stream is closed whatever is left of the file is read through the hash too, so every run
+# reads each evidence item exactly once. digests() lists every hash taken in this process.
+# Usage:
+#   with open_evidence("case.zip!PIXEL7/usagestats_dump.txt") as ev:
+#       for line in ev.text(): ...
+#   ev.sha256   # set once the with block ends
+
+import io, os, bz2, gzip, lzma, zlib, struct, hashlib, tarfile, posixpath
+
+MEMBER_SEP = "!"
+BLOCK = 1 << 20
+
+_MAGIC = {b"\x1f\x8b": "gz", b"BZh": "bz2", b"\xfd7zXZ\x00": "xz", b"PK\x03\x04": "zip"}
+_COMPRESSED_SUFFIXES = (".gz", ".bz2", ".xz")
+_digests = {}
+
+def split_spec(spec: str):
+    """'case.zip!dir/dump.txt' -> ('case.zip', 'dir/dump.txt'); a plain path -> (path, None)."""
+    if os.path.exists(spec) or MEMBER_SEP not in spec:
+        return spec, None
+    i = spec.find(MEMBER_SEP)
+    while i >= 0:
+        if os.path.isfile(spec[:i]):
+            return spec[:i], spec[i + 1:]
+        i = spec.find(MEMBER_SEP, i + 1)
+    return spec, None
+
+def source_path(spec: str) -> str:
+    """The file on disk behind a path (the archive for a member)."""
+    return split_spec(spec)[0]
+
+def source_size(spec: str) -> int:
+    return os.path.getsize(source_path(spec))
+
+def inner_name(spec: str) -> str:
+    """What the content is called: the member name, or the path without a compression suffix."""
+    path, member = split_spec(spec)
+    if member is not None:
+        return member
+    root, ext = os.path.splitext(path)
+    return root if ext.lower() in _COMPRESSED_SUFFIXES else path
+
+def is_plain(spec: str) -> bool:
+    """True for an uncompressed file that can be memory-mapped (and split across processes)."""
+    path, member = split_spec(spec)
+    if member is not None:
+        return False
+    with open(path, "rb") as f:
+        head = f.read(6)
+    return not any(head.startswith(m) for m in _MAGIC)
+
+def cache_base(spec: str) -> str:
+    """A file-system path to hang per-evidence files (like the .evcache) on."""
+    path, member = split_spec(spec)
+    if member is None:
+        return path
+    return f"{path}.{posixpath.normpath(member).replace('/', '_').replace(os.sep, '_')}"
+
+def record(spec: str, digest: str):
+    _digests[spec] = digest
+
+def digests() -> dict:
+    """path -> SHA-256 of the evidence behind it, for everything hashed so far."""
+    return dict(_digests)
+
+def print_digests():
+    """The chain-of-custody lines a command prints at the end of its run."""
+    for spec, digest in _digests.items():
+        print(f"🔒 SHA-256 {digest}  {spec}")
+
+def file_sha256(spec: str, bufsize: int = BLOCK, progress=None) -> str:
+    """SHA-256 of the file on disk behind a path, without decompressing anything."""
+    h = hashlib.sha256()
+    path = source_path(spec)
+    total, done = os.path.getsize(path), 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(bufsize), b""):
+            h.update(block)
+            done += len(block)
+            if progress is not None and (done % (64 * bufsize) < bufsize or done >= total):
+                progress("hash", done, total, 0)
+    record(spec, h.hexdigest())
+    return h.hexdigest()
+
+# ----------------- RAW READERS -----------------
+
+class _HashingReader(io.RawIOBase):
+    """The file on disk, read front to back; every byte passes through SHA-256."""
+
+    def __init__(self, f):
+        self.f = f
+        self.hash = hashlib.sha256()
+        self.done = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self.f.readinto(b)
+        if n:
+            self.hash.update(memoryview(b)[:n])
+            self.done += n
+        return n
+
+    def drain(self):
+        buf = bytearray(BLOCK)
+        while self.readinto(buf):
+            pass
+
+class _Pushback(io.RawIOBase):
+    """A reader that can take back bytes it read too far (magic sniffing, zip member ends)."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.back = b""
+
+    def readable(self):
+        return True
+
+    def unread(self, data: bytes):
+        self.back = data + self.back
+
+    def readinto(self, b):
+        if self.back:
+            n = min(len(b), len(self.back))
+            b[:n] = self.back[:n]
+            self.back = self.back[n:]
+            return n
+        return self.raw.readinto(b)
+
+    def read_exact(self, n: int) -> bytes:
+        out = bytearray()
+        while len(out) < n:
+            chunk = self.read(n - len(out))
+            if not chunk:
+                break
+            out += chunk
+        return bytes(out)
+
+class _ReadOnly(io.RawIOBase):
+    """Any object with read(); hides the seek methods tarfile's stream-mode members lack."""
+
+    def __init__(self, f):
+        self.f = f
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self.f.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+# ----------------- ZIP (streamed) -----------------
+
+_LOCAL = struct.Struct("<4sHHHHHIIIHH")  # local file header, after which come name + extra
+
+class _ZipMember(io.RawIOBase):
+    """One stored or deflated member's content, read straight off the archive stream."""
+
+    def __init__(self, src: _Pushback, method: int, csize):
+        self.src, self.method, self.left = src, method, csize
+        self.inflate = zlib.decompressobj(-15) if method == 8 else None
+        self.out, self.pos = b"", 0
+        self.eof = False
+
+    def readable(self):
+        return True
+
+    def _compressed(self, n: int) -> bytes:
+        if self.left is not None:
+            n = min(n, self.left)
+        data = self.src.read(n) if n else b""
+        if self.left is not None:
+            self.left -= len(data)
+        return data
+
+    def readinto(self, b):
+        while self.pos >= len(self.out) and not self.eof:
+            data = self._compressed(BLOCK)
+            self.pos = 0
+            if self.inflate is None:
+                self.out, self.eof = data, not data
+                continue
+            self.out = self.inflate.decompress(data)
+            if self.inflate.eof:
+                self.src.unread(self.inflate.unused_data)  # the next header starts here
+                self.eof = True
+            elif not data:
+                raise ValueError("zip member is truncated")
+        n = min(len(b), len(self.out) - self.pos)
+        b[:n] = self.out[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+    def skip(self):
+        buf = bytearray(BLOCK)
+        while self.readinto(buf):
+            pass
+
+def _zip64_sizes(extra: bytes, usize: int, csize: int):
+    """Real sizes from the zip64 extra field (only the ones set to 0xFFFFFFFF are in it)."""
+    pos = 0
+    while pos + 4 <= len(extra):
+        tag, size = struct.unpack_from("<HH", extra, pos)
+        if tag == 1:
+            vals, at = [], pos + 4
+            for v in (usize, csize):
+                if v == 0xFFFFFFFF:
+                    v = struct.unpack_from("<Q", extra, at)[0]
+                    at += 8
+                vals.append(v)
+            return vals[0], vals[1], True
+        pos += 4 + size
+    return usize, csize, False
+
+def _open_zip_member(src: _Pushback, member: str, path: str):
+    member = posixpath.normpath(member)
+    while True:
+        head = src.read_exact(_LOCAL.size)
+        if len(head) < _LOCAL.size or head[:4] != b"PK\x03\x04":
+            src.unread(head)  # the central directory: no more members
+            raise FileNotFoundError(f"no member {member!r} in {path}")
+        _, _, flags, method, _, _, _, csize, usize, nlen, xlen = _LOCAL.unpack(head)
+        name = posixpath.normpath(src.read_exact(nlen).decode("utf-8" if flags & 0x800 else "cp437"))
+        usize, csize, zip64 = _zip64_sizes(src.read_exact(xlen), usize, csize)
+        if flags & 1:
+            raise ValueError(f"zip member {name!r} is encrypted")
+        descriptor = bool(flags & 8)
+        if method not in (0, 8) or (method == 0 and descriptor):
+            if name == member:
+                raise ValueError(f"zip member {name!r}: compression method {method} cannot be streamed")
+            raise ValueError(f"zip member {name!r} before {member!r} cannot be skipped while streaming")
+        body = _ZipMember(src, method, None if descriptor else csize)
+        if name == member:
+            return body
+        body.skip()
+        if descriptor:
+            # [signature] crc32, compressed size, uncompressed size (8-byte sizes in zip64)
+            sig = src.read_exact(4)
+            if sig != b"PK\x07\x08":
+                src.unread(sig)
+            src.read_exact(20 if zip64 else 12)
+
+# ----------------- EVIDENCE -----------------
+
+class Evidence:
+    """
+    One evidence item opened for a single sequential read (see open_evidence).
+    bytes_read / size follow the file on disk, for progress; sha256 is set by close().
+    """
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        path, member = split_spec(spec)
+        self.size = os.path.getsize(path)
+        self._file = open(path, "rb")
+        self._raw = _HashingReader(self._file)
+        self._text = None
+        self._tar = None
+        self.sha256 = None
+        try:
+            self._binary = self._open(path, member)
+        except BaseException:
+            self._file.close()
+            raise
+
+    def _open(self, path: str, member: str):
+        src = _Pushback(self._raw)
+        head = src.read_exact(6)
+        src.unread(head)
+        kind = next((k for m, k in _MAGIC.items() if head.startswith(m)), None)
+
+        if member is not None:
+            if kind == "zip":
+                stream = _open_zip_member(src, member, path)
+            else:
+                self._tar = tarfile.open(fileobj=src, mode="r|*")
+                stream = None
+                for info in self._tar:
+                    if posixpath.normpath(info.name) == posixpath.normpath(member):
+                        stream = _ReadOnly(self._tar.extractfile(info))
+                        break
+                if stream is None:
+                    raise FileNotFoundError(f"no member {member!r} in {path}")
+        elif kind == "gz":
+            stream = gzip.GzipFile(fileobj=src, mode="rb")
+        elif kind == "bz2":
+            stream = bz2.BZ2File(src, "rb")
+        elif kind == "xz":
+            stream = lzma.LZMAFile(src, "rb")
+        elif kind == "zip":
+            raise ValueError(f"{path} is a zip archive; name the member, e.g. {path}{MEMBER_SEP}usagestats_dump.txt")
+        else:
+            stream = src
+        return stream if isinstance(stream, io.BufferedIOBase) else io.BufferedReader(stream, BLOCK)
+
+    @property
+    def bytes_read(self) -> int:
+        return self._raw.done
+
+    def binary(self):
+        """The (decompressed) content as a buffered binary stream."""
+        return self._binary
+
+    def text(self):
+        """The content as text, decoded like the plain-file readers always did (UTF-8, bad bytes dropped)."""
+        if self._text is None:
+            self._text = io.TextIOWrapper(self._binary, encoding="utf-8", errors="ignore")
+        return self._text
+
+    def close(self, complete: bool = True):
+        """Finish the hash (reading the rest of the file) and close; complete=False just closes."""
+        if self._file.closed:
+            return
+        try:
+            if complete:
+                self._raw.drain()
+                self.sha256 = self._raw.hash.hexdigest()
+                record(self.spec, self.sha256)
+        finally:
+            if self._tar is not None:
+                self._tar.close()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # an aborted read (error, Cancel) is not worth reading the rest of the file for
+        self.close(complete=exc_type is None)
+
+def open_evidence(spec: str) -> Evidence:
+    """Open a plain, compressed or archived (archive!member) evidence file for one sequential read."""
+    return Evidence(spec)
@@ -0,0 +1,162 @@
+# incremental_ingest.py
+# Append-mode ingest of successive usagestats dumps pulled from the same device.
+# A per-device state file remembers where the last dump ended, per Android user
+# (each 'user=N' section of the dump has its own clock):
+#   watermarks  user -> latest event time seen
+#   edges       user -> (type, package, count) of the events at the watermark second, to
+#               drop the ones the next dump repeats
+#   open        [user, package, start] of sessions still open (RESUMED without PAUSED/STOPPED yet)
+#   totals      [user, package, last ts, total seconds, launch count]
+# Each new dump only tokenizes lines at/after their user's watermark; the delta is paired
+# on its own and stitched onto the carried sessions, like a chunk in parallel_events.py.
+# Version 1 state files (one user, no sections) are read as user 0's.
+# Usage:
+#   python incremental_ingest.py usagestats_dump.txt --device PIXEL7-01 --state-dir device_state
+# Output:
+#   device_state/<device>.json + usage_<device>.csv (running totals)
+
+import os, json, argparse
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from evidence import open_evidence
+from events_tokenizer import tokenize_lines, format_ts, USER_RE
+from event_cache import table_from_events, split_users, event_users, select_rows
+from parallel_events import accumulate, stitch_into
+from events_parser import stats_frame
+
+STATE_VERSION = 2
+
+# In memory, open and totals are dicts keyed by (user, package) as in parallel_events.py,
+# and watermarks / edges are keyed by the int user id; save_state() flattens them for JSON.
+
+def new_state():
+    return {"version": STATE_VERSION, "watermarks": {}, "edges": {}, "open": {}, "totals": {}, "ingests": []}
+
+def load_state(path: str) -> dict:
+    if not os.path.exists(path):
+        return new_state()
+    with open(path, "r", encoding="utf-8") as f:
+        saved = json.load(f)
+    if saved.get("version") == 1:
+        # one user: its watermark, edge and package-keyed dicts belong to user 0
+        state = new_state()
+        if saved["watermark"] is not None:
+            state["watermarks"][0] = saved["watermark"]
+            state["edges"][0] = saved["edge"]
+        state["open"] = {(0, pkg): t for pkg, t in saved["open"].items()}
+        state["totals"] = {(0, pkg): v for pkg, v in saved["totals"].items()}
+        state["ingests"] = saved["ingests"]
+        return state
+    if saved.get("version") != STATE_VERSION:
+        raise ValueError(f"{path}: unsupported state version {saved.get('version')}")
+    return {"version": STATE_VERSION,
+            "watermarks": {int(u): t for u, t in saved["watermarks"].items()},
+            "edges": {int(u): e for u, e in saved["edges"].items()},
+            "open": {(u, pkg): t for u, pkg, t in saved["open"]},
+            "totals": {(u, pkg): [last, secs, launches] for u, pkg, last, secs, launches in saved["totals"]},
+            "ingests": saved["ingests"]}
+
+def save_state(path: str, state: dict):
+    saved = dict(state, open=[[u, pkg, t] for (u, pkg), t in state["open"].items()],
+                 totals=[[u, pkg, *v] for (u, pkg), v in state["totals"].items()])
+    # write-then-rename so an interrupted run never leaves a truncated state behind
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(saved, f)
+    os.replace(tmp, path)
+
+def _lines_since(lines, marks: dict):
+    """
+    Skip lines older than their user section's watermark (marks: user -> 'YYYY-MM-DD HH:MM:SS')
+    with a plain string compare (no regex, no parsing); section headers are kept.
+    """
+    mark = marks.get(0)
+    for line in lines:
+        if line.startswith("user="):
+            m = USER_RE.match(line)
+            if m:
+                mark = marks.get(int(m.group(1)))
+                yield line
+                continue
+        if mark is None:
+            yield line
+            continue
+        i = line.find('time="')
+        if i >= 0 and line[i + 6:i + 25] >= mark:
+            yield line
+
+def new_events(lines, state: dict):
+    """EventTable of only the events of a dump (its lines) that the state has not seen yet, in file order."""
+    marks = {u: format_ts(t) for u, t in state["watermarks"].items()}
+    sections = []
+    table = split_users(table_from_events(tokenize_lines(_lines_since(lines, marks), sections=sections)), sections)
+    owner = event_users(table)
+    keep = np.ones(len(table.ts), dtype=bool)
+    for user, watermark in state["watermarks"].items():
+        mine = owner == user
+        keep[mine & (table.ts < watermark)] = False
+        seen = Counter({(ev, pkg): n for ev, pkg, n in state["edges"][user]})
+        for i in np.flatnonzero(mine & (table.ts == watermark)).tolist():
+            key = (int(table.type[i]), table.packages[table.pkg[i]])
+            if seen[key] > 0:
+                seen[key] -= 1
+                keep[i] = False
+    return select_rows(table, keep)
+
+def ingest(path: str, state: dict) -> int:
+    """Fold a dump's new events into state (in place); returns how many were new."""
+    with open_evidence(path) as dump:
+        delta = new_events(dump.text(), state)
+    n = len(delta.ts)
+    if n:
+        stitch_into(state["totals"], state["open"], accumulate(delta))
+
+        # new watermark of each user and the multiset of events sitting exactly on it
+        owner = event_users(delta)
+        for user in np.unique(owner).tolist():
+            mine = owner == user
+            top = int(delta.ts[mine].max())
+            at = mine & (delta.ts == top)
+            at_top = Counter((int(ev), delta.packages[p]) for ev, p in
+                             zip(delta.type[at].tolist(), delta.pkg[at].tolist()))
+            if top == state["watermarks"].get(user):
+                at_top.update({(ev, pkg): c for ev, pkg, c in state["edges"][user]})
+            state["watermarks"][user] = top
+            state["edges"][user] = [[ev, pkg, c] for (ev, pkg), c in at_top.items()]
+
+    state["ingests"].append({"dump": os.path.basename(path), "sha256": dump.sha256, "new_events": n,
+                             "at": datetime.now().isoformat(timespec="seconds")})
+    return n
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Incrementally add a new usagestats dump to a device's running totals")
+    ap.add_argument("dump", help="usagestats events dump (TXT)")
+    ap.add_argument("--device", required=True, help="Device/case label; one state file per device")
+    ap.add_argument("--state-dir", default="device_state", help="Folder holding <device>.json (default device_state)")
+    ap.add_argument("--out", help="Totals CSV (default usage_<device>.csv)")
+    return ap.parse_args()
+
+def main():
+    args = parse_args()
+    os.makedirs(args.state_dir, exist_ok=True)
+    state_path = os.path.join(args.state_dir, f"{args.device}.json")
+
+    state = load_state(state_path)
+    n = ingest(args.dump, state)
+    save_state(state_path, state)
+    marks = sorted(state["watermarks"].items())
+    if len(marks) > 1:
+        where = "watermarks now " + ", ".join(f"user {u}: {format_ts(t)}" for u, t in marks)
+    else:
+        where = f"watermark now {format_ts(marks[0][1]) if marks else '-'}"
+    print(f"✅ {n} new events from {args.dump} ({where})")
+
+    out = args.out or f"usage_{args.device}.csv"
+    stats_frame(state["totals"]).to_csv(out, index=False)
+    print(f"✅ Saved running totals for {len(state['totals'])} apps to {out}")
+
+if __name__ == "__main__":
+    main()
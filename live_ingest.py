@@ -0,0 +1,187 @@
+# live_ingest.py
+# Acquire and parse in one go, with no wait for a finished dump file: runs
+#   adb shell dumpsys usagestats --history
+# and tokenizes its stdout (asyncio + one parser thread) while it is still streaming,
+# pulls packages.xml at the same time (adb exec-out cat, needs a root adbd), and tees
+# the raw bytes of both to evidence files, hashing them on the way.
+# The parsed events are stored as the evidence dump's .evcache, so every other tool
+# run on usagestats_dump.txt afterwards starts from the cache.
+# --adb replaces the adb command, e.g. with the stand-in benchmarks/fake_adb.py.
+# Usage:
+#   python live_ingest.py --outdir case_0412/PIXEL7-01 --serial 1A2B3C4D
+#   python live_ingest.py --outdir live_test --adb "python benchmarks/fake_adb.py --dump usagestats_dump.txt --packages packages.xml"
+# Output:
+#   <outdir>/usagestats_dump.txt + packages.xml (raw bytes as received),
+#   acquisition.json (commands, exit codes, sizes, SHA-256), AppUsage_Timeline_Final.csv
+
+import os, sys, json, shlex, asyncio, hashlib, argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import profiling
+from events_tokenizer import tokenize_lines
+from event_cache import table_from_events, split_users, concat_tables, store_table, count_table
+
+DUMP_ARGS = ["shell", "dumpsys", "usagestats", "--history"]
+PACKAGES_ARGS = ["exec-out", "cat", "/data/system/packages.xml"]
+READ_BYTES = 1 << 16     # one pipe read
+BATCH_BYTES = 4 << 20    # text handed to the parser thread at a time
+MAX_PENDING = 2          # batches queued for the parser before reading waits for it
+
+class StreamParser:
+    """Cuts a byte stream into whole-line batches and tokenizes them, in order, on one thread."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.pending = bytearray()
+        self.jobs = []
+        self.user = 0  # user section the last parsed batch ended in (only the parser thread sets it)
+        self.profile = profiling.active()  # the parser thread records into the job's profile
+
+    async def feed(self, block: bytes):
+        self.pending += block
+        if len(self.pending) >= BATCH_BYTES:
+            cut = self.pending.rfind(b"\n") + 1
+            if cut:
+                await self._submit(bytes(self.pending[:cut]))
+                del self.pending[:cut]
+
+    async def _submit(self, data: bytes):
+        # back-pressure: a slow parser holds up reading instead of piling up text
+        while True:
+            busy = [job for job in self.jobs if not job.done()]
+            if len(busy) < MAX_PENDING:
+                break
+            await asyncio.wait(busy, return_when=asyncio.FIRST_COMPLETED)
+        self.jobs.append(asyncio.get_running_loop().run_in_executor(self.pool, self._parse, data))
+
+    def _parse(self, data: bytes):
+        # batches are parsed one at a time and in order, so each starts in the user section
+        # the one before it ended in
+        with profiling.activate(self.profile):
+            table, self.user = parse_block(data, self.user)
+        return table
+
+    async def finish(self):
+        """Parse what is left and return the whole stream as one EventTable."""
+        if self.pending:
+            await self._submit(bytes(self.pending))
+            self.pending.clear()
+        return concat_tables(await asyncio.gather(*self.jobs))
+
+def parse_block(data: bytes, user: int = 0):
+    """Whole lines of the dump, starting in user's section -> (EventTable, user section they end in)."""
+    lines = data.decode("utf-8", errors="ignore").split("\n")
+    if not lines[-1]:
+        lines.pop()
+    sections = []
+    table = table_from_events(tokenize_lines(lines, payload=True, sections=sections), payload=True)
+    return split_users(table, sections, user), sections[-1][1] if sections else user
+
+def _now() -> str:
+    return datetime.now().astimezone().isoformat(timespec="seconds")
+
+async def acquire(cmd, path: str, parser: StreamParser = None) -> dict:
+    """Run cmd and tee its stdout to path (and to parser); returns its acquisition record."""
+    started = _now()
+    proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE,
+                                                stderr=asyncio.subprocess.PIPE)
+    stderr = asyncio.ensure_future(proc.stderr.read())
+    h, size = hashlib.sha256(), 0
+    with open(path, "wb") as f:
+        while True:
+            block = await proc.stdout.read(READ_BYTES)
+            if not block:
+                break
+            f.write(block)
+            h.update(block)
+            size += len(block)
+            if parser is not None:
+                await parser.feed(block)
+    code = await proc.wait()
+    return {"command": shlex.join(cmd), "file": os.path.basename(path), "bytes": size,
+            "sha256": h.hexdigest(), "exit_code": code, "started": started, "finished": _now(),
+            "stderr": (await stderr).decode("utf-8", errors="replace").strip()[-2000:]}
+
+async def live_ingest(dump_cmd, dump_path: str, packages_cmd=None, packages_path: str = None):
+    """
+    Stream dump_cmd into dump_path, parsing as it arrives, and packages_cmd into
+    packages_path alongside. Returns (EventTable, acquisition records).
+    """
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        parser = StreamParser(pool)
+        jobs = [acquire(dump_cmd, dump_path, parser)]
+        if packages_cmd:
+            jobs.append(acquire(packages_cmd, packages_path))
+        with profiling.stage("acquire"):
+            records = await asyncio.gather(*jobs)
+        # whatever parsing did not overlap with the transfer
+        with profiling.stage("parse_tail"):
+            table = await parser.finish()
+    return table, records
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Stream a usagestats dump from adb, parsing while it arrives")
+    ap.add_argument("--outdir", default=".", help="Evidence + output folder (default: current folder)")
+    ap.add_argument("--adb", default="adb", help='adb command, e.g. "adb" or a stand-in script (default adb)')
+    ap.add_argument("--serial", "-s", help="Device serial (adb -s)")
+    ap.add_argument("--packages", help="Use this packages.xml / packages_output.csv instead of pulling one")
+    ap.add_argument("--out", help="Timeline CSV (default <outdir>/AppUsage_Timeline_Final.csv)")
+    ap.add_argument("--force", action="store_true", help="Overwrite evidence files already in --outdir")
+    profiling.add_profile_argument(ap, "live_ingest_profile.json")
+    return ap.parse_args()
+
+def main():
+    args = parse_args()
+    os.makedirs(args.outdir, exist_ok=True)
+    adb = shlex.split(args.adb) + (["-s", args.serial] if args.serial else [])
+    dump_path = os.path.join(args.outdir, "usagestats_dump.txt")
+    packages_path = args.packages or os.path.join(args.outdir, "packages.xml")
+    out = args.out or os.path.join(args.outdir, "AppUsage_Timeline_Final.csv")
+    evidence = [dump_path] + ([] if args.packages else [packages_path])
+    if not args.force and any(os.path.exists(p) for p in evidence):
+        print(f"⚠️ Evidence already in {args.outdir}; not overwriting it (use --force or another --outdir).")
+        sys.exit(1)
+
+    with profiling.activate(profiling.Profile("live_ingest", dump_path)) as prof:
+        try:
+            table, records = asyncio.run(live_ingest(adb + DUMP_ARGS, dump_path,
+                                                     None if args.packages else adb + PACKAGES_ARGS, packages_path))
+        except FileNotFoundError as e:
+            print(f"❌ Cannot run {adb[0]!r}: {e}")
+            sys.exit(1)
+        manifest = os.path.join(args.outdir, "acquisition.json")
+        with open(manifest, "w", encoding="utf-8") as f:
+            json.dump({"serial": args.serial, "acquisitions": records}, f, indent=2)
+        dump_rec = records[0]
+        print(f"✅ Streamed {dump_rec['bytes'] / 2**20:,.1f} MB ({len(table.ts):,} events) to {dump_path}, "
+              f"SHA-256 {dump_rec['sha256'][:16]}…; record in {manifest}")
+        if dump_rec["exit_code"] != 0:
+            print(f"❌ Dump command exited with {dump_rec['exit_code']}: {dump_rec['stderr']}")
+            sys.exit(1)
+        store_table(dump_path, dump_rec["sha256"], table)
+        count_table(table)
+
+        if not args.packages:
+            pk = records[1]
+            if pk["exit_code"] != 0 or not pk["bytes"]:
+                if not pk["bytes"]:
+                    os.remove(packages_path)
+                print(f"⚠️ packages.xml pull failed ({pk['stderr'] or 'no data'}). The events are cached; "
+                      f"for the timeline run: python timeline.py {dump_path} <packages.xml or packages_output.csv>")
+                sys.exit(1)
+            print(f"✅ Pulled packages.xml ({pk['bytes'] / 2**10:,.1f} KB) to {packages_path}")
+
+        # usage totals from the streamed table; no second pass over the dump
+        import timeline
+        from parallel_events import accumulate, stitch
+        with profiling.stage("sessions"):
+            usage_df = timeline.usage_frame(stitch([accumulate(table)]))
+        final_df, _, _ = timeline.write_timeline(usage_df, packages_path, out)
+    print(f"✅ Saved final timeline ({len(final_df)} rows) to {out}")
+    if args.profile:
+        prof.write(args.profile)
+        print(f"✅ Saved profile report to {args.profile}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# packages_reader.py
+# Streaming reader for /data/system/packages.xml (the GUI and both parse_packages_xml scripts use it).
+# iterparse walks the file once: each <package>/<updated-package> becomes a row and every finished
+# top-level subtree is cleared, so the <item>/<cert>/<domain> noise never piles up in memory.
+# The file may be gzip/bz2/xz-compressed or an archive member (case.zip!PIXEL7/packages.xml, see evidence.py).
+# Install/update times are converted a whole column at a time, and are always reported in UTC:
+#   ft / ut                                   hex milliseconds (Android's own attributes)
+#   firstInstallTime / lastUpdateTime / ...   decimal milliseconds, or seconds if < 10^10
+# Usage:
+#   from packages_reader import read_packages
+#   df = read_packages("packages.xml", tags=PACKAGE_TAGS, perms=True)
+
+from xml.etree import ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+from evidence import open_evidence
+
+PACKAGE_TAGS = ("package", "updated-package")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_FT_KEYS = ("firstInstallTime", "first-install-time")
+_UT_KEYS = ("lastUpdateTime", "last-update-time")
+_INSTALLER_KEYS = ("installer", "installerPackageName", "installer-package-name")
+_MAX_MS = 253402300800000  # 10000-01-01; anything later is garbage, not a date
+
+# ASCII code -> digit value (-1 = not a digit)
+_DIGITS = np.full(256, -1, dtype=np.int64)
+for _i, _c in enumerate("0123456789abcdef"):
+    _DIGITS[ord(_c)] = _DIGITS[ord(_c.upper())] = _i
+
+def iter_packages(path: str, tags=("package",), perms: bool = False):
+    """Yield (tag, attrib, permission names or None) for every matching element, in file order."""
+    root, depth = None, 0
+    with open_evidence(path) as ev:
+        for event, elem in ET.iterparse(ev.binary(), events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+            depth -= 1
+            if elem.tag in tags:
+                yield elem.tag, dict(elem.attrib), [i.get("name") for i in elem.iterfind("perms/item")] if perms else None
+            if depth == 1:
+                root.clear()  # drop the finished child of <packages> (and everything under it)
+
+def parse_ints(values, base: int = 16) -> np.ndarray:
+    """
+    Parse a column of hex (base 16) or decimal (base 10) strings in one pass.
+    Returns int64 values, -1 where the string is missing or not a number.
+    """
+    n = len(values)
+    text = np.array([v.strip() if isinstance(v, str) else "" for v in values], dtype="U16").reshape(n)
+    codes = text.view(np.uint32).reshape(n, 16) if n else np.zeros((0, 16), dtype=np.uint32)
+    present = codes != 0
+    digits = _DIGITS[np.minimum(codes, 255)]
+    ok = present.any(axis=1) & ~(present & ((digits < 0) | (digits >= base))).any(axis=1)
+    ok &= present.sum(axis=1) <= 15  # keeps the result inside int64
+
+    # Horner's rule across character positions; every row at once
+    out = np.zeros(n, dtype=np.int64)
+    for j in range(codes.shape[1]):
+        out = np.where(present[:, j], out * base + np.maximum(digits[:, j], 0), out)
+    return np.where(ok, out, -1)
+
+def ms_to_datetime(ms) -> pd.Series:
+    """Epoch milliseconds (UTC) -> datetime64 Series, NaT for -1 / out-of-range values."""
+    ms = np.asarray(ms, dtype=np.int64)
+    ok = (ms >= 0) & (ms < _MAX_MS)
+    return pd.Series(pd.to_datetime(np.where(ok, ms, 0), unit="ms")).where(ok)
+
+def hex_ms_to_datetime(values) -> pd.Series:
+    return ms_to_datetime(parse_ints(values, 16))
+
+def decimal_ms_to_datetime(values) -> pd.Series:
+    n = parse_ints(values, 10)
+    return ms_to_datetime(np.where((n >= 0) & (n < 10_000_000_000), n * 1000, n))  # seconds -> ms
+
+def format_times(times: pd.Series, missing=None) -> pd.Series:
+    """datetime64 Series -> 'YYYY-MM-DD HH:MM:SS' strings, `missing` for NaT."""
+    return times.dt.strftime(TIME_FORMAT).astype(object).where(times.notna(), missing)
+
+def _first(attrib, keys):
+    for k in keys:
+        if attrib.get(k):
+            return attrib[k]
+    return None
+
+def read_packages(path: str, tags=("package",), perms: bool = False) -> pd.DataFrame:
+    """
+    Package | First Installed | Last Updated | Installer | UID | Tag (+ Permissions if perms)
+    with the two times as datetime64 (UTC, NaT where missing/invalid).
+    """
+    cols = {k: [] for k in ("Package", "ft", "ut", "ft_dec", "ut_dec", "Installer", "UID", "Tag", "Permissions")}
+    for tag, a, names in iter_packages(path, tags, perms):
+        if not a.get("name"):
+            continue
+        cols["Package"].append(a["name"])
+        cols["ft"].append(a.get("ft"))
+        cols["ut"].append(a.get("ut"))
+        cols["ft_dec"].append(_first(a, _FT_KEYS))
+        cols["ut_dec"].append(_first(a, _UT_KEYS))
+        cols["Installer"].append(_first(a, _INSTALLER_KEYS))
+        cols["UID"].append(a.get("userId"))
+        cols["Tag"].append(tag)
+        cols["Permissions"].append(names)
+
+    df = pd.DataFrame({
+        "Package": cols["Package"],
+        # Android's hex attribute wins; the decimal spellings only fill in where it is absent
+        "First Installed": hex_ms_to_datetime(cols["ft"]).where(pd.notna(cols["ft"]), decimal_ms_to_datetime(cols["ft_dec"])),
+        "Last Updated": hex_ms_to_datetime(cols["ut"]).where(pd.notna(cols["ut"]), decimal_ms_to_datetime(cols["ut_dec"])),
+        "Installer": pd.Series(cols["Installer"], dtype=object),
+        "UID": pd.Series(parse_ints(cols["UID"], 10), dtype=np.int64),
+        "Tag": pd.Series(cols["Tag"], dtype=object),
+    })
+    if perms:
+        df["Permissions"] = cols["Permissions"]
+    return df
@@ -0,0 +1,213 @@
+# parallel_events.py
+# Parallel chunked parsing of very large usagestats EVENT dumps.
+# The dump is memory-mapped and cut into chunks on line boundaries. Each chunk is
+# tokenized in a worker process, which also pairs the sessions it can see on its own
+# (sessions.py), per user: a worker gives events before its chunk's first 'user=N'
+# header to PRECEDING_USER, which becomes the user the previous chunk ended in once the
+# chunks are back in file order.
+# Sessions still open at the end of a chunk are then stitched, in file order, to the
+# next chunk's leading PAUSED/STOPPED events of the same user, so totals match the
+# serial pass exactly. Totals are keyed by (user, package).
+
+import os, mmap
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import profiling
+from evidence import is_plain
+from events_tokenizer import tokenize_lines
+from event_cache import (table_from_events, split_users, tokenize_hashed, concat_tables, cached_table,
+                         store_table, count_table, event_users, package_users)
+from sessions import build_sessions, package_usage
+
+PARALLEL_MIN_BYTES = 32 << 20   # below this a process pool costs more than it saves
+CHUNK_MAX_BYTES = 64 << 20      # keeps each worker's decoded text bounded
+PRECEDING_USER = -1             # stands for the user section a chunk starts in
+
+def use_parallel(path: str, workers: int) -> bool:
+    # compressed / archived dumps are one stream: no byte offsets to split them at
+    return workers > 1 and is_plain(path) and os.path.getsize(path) >= PARALLEL_MIN_BYTES
+
+def chunk_bounds(path: str, n_chunks: int):
+    """Split the file into about n_chunks (start, end) byte ranges, each ending after a newline."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    bounds = [0]
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for i in range(1, n_chunks):
+            pos = mm.find(b"\n", max(size * i // n_chunks, bounds[-1]))
+            if pos < 0 or pos + 1 >= size:
+                break
+            bounds.append(pos + 1)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+# ----------------- SESSION PAIRING -----------------
+
+def accumulate(table):
+    """
+    Pair sessions within one run of events (a chunk, or a whole dump) with sessions.py.
+    Every result is keyed by (user, package). Returns (stats, lead_close, open_end):
+      stats       key -> [last ts, total seconds, launch count] for what this run sees alone
+      lead_close  key -> ts of a PAUSED/STOPPED seen before any RESUMED of that package
+                  (it closes a session left open by the previous run)
+      open_end    key -> start of the session still open when the run ends
+    """
+    sessions = build_sessions(table)
+    usage = package_usage(table, sessions)
+    names = list(zip(package_users(table).tolist(), table.packages))
+
+    stats = {key: [last, total, launches] for key, last, total, launches in
+             zip(names, usage.last.tolist(), usage.total.tolist(), usage.launches.tolist())}
+    lead_close = {names[p]: t for p, t in zip(sessions.lead_pkg.tolist(), sessions.lead_end.tolist())}
+    open_end = {names[p]: t for p, t in zip(sessions.open_pkg.tolist(), sessions.open_start.tolist())}
+    return stats, lead_close, open_end
+
+def stitch_into(totals, carried, partial):
+    """
+    Fold one run's (stats, lead_close, open_end) into running totals, in file order.
+    totals: (user, pkg) -> [last ts, total seconds, launch count]; carried: (user, pkg) ->
+    start of a session left open by earlier runs. Both are updated in place.
+    """
+    stats, lead_close, open_end = partial
+    for pkg, (last, secs, launches) in stats.items():
+        tot = totals.get(pkg)
+        if tot is None:
+            totals[pkg] = [last, secs, launches]
+        else:
+            if last > tot[0]:
+                tot[0] = last
+            tot[1] += secs
+            tot[2] += launches
+
+    for pkg, t in lead_close.items():
+        start = carried.pop(pkg, None)
+        if start is not None:
+            # counted as open by the run that started it
+            profiling.count("sessions_closed")
+            profiling.count("sessions_open", -1)
+            if t > start:
+                totals[pkg][1] += t - start
+
+    # a RESUMED in this run replaces whatever was carried in (same as the serial loop)
+    for pkg, row in stats.items():
+        if row[2] and carried.pop(pkg, None) is not None:
+            profiling.count("sessions_open", -1)
+    carried.update(open_end)
+
+def stitch(partials):
+    """Merge per-run results in file order into (user, pkg) -> [last ts, total seconds, launch count]."""
+    totals, carried = {}, {}
+    for partial in partials:
+        stitch_into(totals, carried, partial)
+    return totals
+
+# ----------------- WORKERS -----------------
+
+def _scan_chunk(job):
+    path, start, end = job
+    # profile counters go to this worker's own Profile and travel back with the result;
+    # session counts are kept apart as they only apply when the partials are stitched
+    with profiling.activate(profiling.Profile()):
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = mm[start:end].decode("utf-8", errors="ignore")
+        lines = text.split("\n")
+        if not lines[-1]:
+            lines.pop()  # chunks end on a newline
+        sections = []
+        table = table_from_events(tokenize_lines(lines, payload=True, sections=sections), payload=True)
+        table = split_users(table, sections, PRECEDING_USER)
+        scanned = profiling.counters()
+    with profiling.activate(profiling.Profile()):
+        partial = accumulate(table)
+        paired = profiling.counters()
+    return table, partial, scanned, paired, sections[-1][1] if sections else None
+
+def _resolve_user(table, partial, user: int) -> bool:
+    """
+    Hand a chunk's PRECEDING_USER events (table and partial, in place) to user.
+    False if the chunk also had a 'user=<same user>' header, so its partial cannot be stitched.
+    """
+    table.users[table.users == PRECEDING_USER] = user
+    ok = True
+    for part in partial:
+        if any(u == PRECEDING_USER for u, _ in part):
+            fixed = {(user if u == PRECEDING_USER else u, pkg): v for (u, pkg), v in part.items()}
+            ok = ok and len(fixed) == len(part)
+            part.clear()
+            part.update(fixed)
+    return ok
+
+def scan_parallel(path: str, workers: int, progress=None):
+    """
+    Tokenize the dump in a process pool.
+    Returns (EventTable, per-chunk partials in file order or None if they cannot be stitched,
+    their session profile counters).
+    progress("parse", bytes done, file size, events so far) follows the chunks in file order;
+    if it raises, chunks not yet started are cancelled.
+    """
+    total = os.path.getsize(path)
+    n_chunks = max(workers * 4, -(-total // CHUNK_MAX_BYTES))
+    jobs = [(path, start, end) for start, end in chunk_bounds(path, n_chunks)]
+    results = []
+    with profiling.stage("tokenize_parallel"), ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_scan_chunk, job) for job in jobs]
+        try:
+            for (_, _, end), fut in zip(jobs, futures):
+                results.append(fut.result())
+                if progress is not None:
+                    progress("parse", end, total, sum(len(r[0].ts) for r in results))
+        except BaseException:
+            for fut in futures:
+                fut.cancel()
+            raise
+    user, stitchable = 0, True  # events before the first header at all are user 0's
+    for r in results:
+        profiling.merge(r[2])
+        stitchable = _resolve_user(r[0], r[1], user) and stitchable
+        if r[4] is not None:
+            user = r[4]
+    return (concat_tables([r[0] for r in results]), [r[1] for r in results] if stitchable else None,
+            [r[3] for r in results])
+
+def time_ordered(table) -> bool:
+    """True if, within every user's partition, time never goes back in file order."""
+    users = event_users(table)
+    order = np.argsort(users, kind="stable")
+    ts, users = np.asarray(table.ts)[order], users[order]
+    return not np.any((ts[1:] < ts[:-1]) & (users[1:] == users[:-1]))
+
+def usage_stats(path: str, use_cache: bool = True, workers: int = 1, progress=None):
+    """
+    Per-package usage for a dump: (user, pkg) -> [last ts, total seconds, launch count],
+    in order of first appearance. A valid .evcache is used first; otherwise big
+    dumps are parsed in parallel (and the cache written from the workers' columns).
+    progress(stage, done, total, events) is passed down to hashing and parsing
+    (see events_tokenizer.iter_events) and may raise to abort.
+    """
+    digest, table = cached_table(path, progress) if use_cache else (None, None)
+    if table is None and use_parallel(path, workers):
+        table, partials, paired = scan_parallel(path, workers, progress)
+        if use_cache:
+            store_table(path, digest, table)
+        count_table(table)
+        # stitching in file order only equals the per-package time order if a user's time never goes back
+        if partials is not None and time_ordered(table):
+            with profiling.stage("sessions"):
+                for collected in paired:
+                    profiling.merge(collected)
+                return stitch(partials)
+    elif table is not None:
+        count_table(table)
+
+    if table is None:
+        fresh, table = tokenize_hashed(path, progress=progress)
+        if use_cache:
+            store_table(path, fresh or digest, table)
+        count_table(table)
+    if progress is not None:
+        progress("sessions", 0, 0, len(table.ts))
+    with profiling.stage("sessions"):
+        return stitch([accumulate(table)])
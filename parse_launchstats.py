@@ -1,35 +1,91 @@
-import re
+# parse_launchstats.py
+# Find Android package names stored as UTF-16LE strings in a binary LaunchStats.data.
+# The file is memory-mapped and scanned once by a single bytes regex (names may start
+# at odd or even offsets), so multi-hundred-MB files need neither a full read nor
+# per-offset decoding.
+# Usage:
+#   python parse_launchstats.py LaunchStats.data
+#   python parse_launchstats.py LaunchStats.data --offsets --out launchstats_hits.csv
+# Output:
+#   unique package names (first-seen order); with --offsets every hit and its byte offset
+
+import re, csv, mmap, hashlib, argparse
+
+import evidence
+from evidence import open_evidence, is_plain
+
+def _utf16(cls: bytes) -> bytes:
+    """A one-character ASCII regex class, as the two bytes of a UTF-16LE code unit."""
+    return b"(?:[" + cls + b"]\x00)"
+
+_HEAD, _TAIL = _utf16(b"A-Za-z"), _utf16(b"A-Za-z0-9_")
+# segment(.segment)+ with every segment starting with a letter, like a real package name
+PACKAGE_RE = re.compile(_HEAD + _TAIL + b"*(?:\\.\x00" + _HEAD + _TAIL + b"*)+")
+MAX_NAME_LEN = 255
+
+def scan_utf16_packages(buf):
+    """Yield (byte offset, package name) for every UTF-16LE package-name run in buf, in file order."""
+    for m in PACKAGE_RE.finditer(buf):
+        name = m.group().decode("utf-16le")
+        if len(name) <= MAX_NAME_LEN:
+            yield m.start(), name
 
 def extract_utf16_package_names(data):
-    # Look for UTF-16LE patterns that resemble Android package names
-    strings = []
-    for i in range(len(data) - 4):
+    """Unique package names in order of first appearance."""
+    return list(dict.fromkeys(name for _, name in scan_utf16_packages(data)))
+
+def scan_file(path: str):
+    """
+    Memory-map path and return [(offset, name)] for every hit. A compressed file or archive
+    member (see evidence.py) is decompressed into memory instead, in the same read as its hash.
+    Either way the SHA-256 of the file on disk is recorded (evidence.digests()).
+    """
+    if not is_plain(path):
+        with open_evidence(path) as ev:
+            data = ev.binary().read()
+        return list(scan_utf16_packages(data))
+    with open(path, "rb") as f:
         try:
-            chunk = data[i:i+100]  # Read ahead
-            decoded = chunk.decode('utf-16le', errors='ignore')
-            if 'com.' in decoded:
-                pkg = decoded.split('\x00')[0]  # stop at null
-                if '.' in pkg and len(pkg) < 100:
-                    strings.append(pkg)
-        except:
-            continue
-    return list(set(strings))  # deduplicate
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            evidence.record(path, hashlib.sha256(b"").hexdigest())
+            return []
+        with mm:
+            # hashed straight off the mapping: one more linear pass, no copy
+            evidence.record(path, hashlib.sha256(mm).hexdigest())
+            return list(scan_utf16_packages(mm))
 
-def main():
-    with open("LaunchStats.data", "rb") as f:
-        data = f.read()
+def parse_args():
+    ap = argparse.ArgumentParser(description="Package names (UTF-16LE) inside LaunchStats.data")
+    ap.add_argument("path", nargs="?", default="LaunchStats.data", help="Binary file (default LaunchStats.data)")
+    ap.add_argument("--offsets", action="store_true", help="List every hit with its byte offset")
+    ap.add_argument("--out", help="Write every hit as Offset,Package CSV")
+    return ap.parse_args()
 
-    packages = extract_utf16_package_names(data)
+def main():
+    args = parse_args()
+    hits = scan_file(args.path)
+    packages = list(dict.fromkeys(name for _, name in hits))
 
-    if packages:
+    if args.offsets:
+        for off, name in hits:
+            print(f"0x{off:08x}  {name}")
+    elif packages:
         print("🟢 Detected Package Names:")
         for i, pkg in enumerate(packages, 1):
             print(f"{i}. {pkg}")
     else:
         print("❌ No package names detected.")
 
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Offset", "Package"])
+            writer.writerows(hits)
+        print(f"✅ Saved {len(hits)} hits to {args.out}")
+
     print(f"\n✅ Total Detected: {len(packages)} apps")
+    evidence.print_digests()
 
 if __name__ == "__main__":
     main()
-
@@ -1,44 +1,93 @@
-import re
+# parse_usagestats_dump.py
+# Per-package aggregates from the "In-memory daily/weekly/monthly/yearly stats" sections of
+# `dumpsys usagestats`. The dump is read line by line; every row is tagged with the user,
+# interval and timeRange of the section it sits in, so the four intervals no longer collide.
+# Usage:
+#   python parse_usagestats_dump.py usagestats_dump.txt
+#   python parse_usagestats_dump.py usagestats_dump.txt --interval daily --out daily_stats.csv
+# Output:
+#   UsageTimeline_Full.csv: User | Interval | Time Range | Package | Last Time Used |
+#                           Last Time Visible | Total Time Used | App Launch Count
+
+import re, argparse
 import pandas as pd
-from datetime import datetime
 
-def parse_usagestats_dump(file_path):
-    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-        text = f.read()
+import evidence
+from evidence import open_evidence
 
-    # Regex pattern for new format lines
-    pattern = r'package=(\S+)\s+totalTimeUsed="([^"]+)"\s+lastTimeUsed="([^"]+)"\s+' \
-              r'totalTimeVisible="([^"]+)"\s+lastTimeVisible="([^"]+)"\s+' \
-              r'totalTimeFS="([^"]+)"\s+lastTimeFS="([^"]+)"\s+appLaunchCount=(\d+)'
+INTERVALS = ("daily", "weekly", "monthly", "yearly")
 
-    matches = re.findall(pattern, text)
+USER_RE = re.compile(r'^user=(\d+)')
+SECTION_RE = re.compile(r'^\s*In-memory (\w+) stats')
+RANGE_RE = re.compile(r'^\s*timeRange="([^"]*)"')
+STATS_RE = re.compile(r'package=(\S+)\s+totalTimeUsed="([^"]+)"\s+lastTimeUsed="([^"]+)"\s+'
+                      r'totalTimeVisible="([^"]+)"\s+lastTimeVisible="([^"]+)"\s+'
+                      r'totalTimeFS="([^"]+)"\s+lastTimeFS="([^"]+)"\s+appLaunchCount=(\d+)')
+# any other top-level block ends the current stats section
+OTHER_SECTION_RE = re.compile(r'^\s{0,2}(Last 24 hour events|UsageStatsDatabase:)')
 
-    records = []
+COLUMNS = ["User", "Interval", "Time Range", "Package", "Last Time Used",
+           "Last Time Visible", "Total Time Used", "App Launch Count"]
 
-    for pkg, ttu, ltu, ttv, ltv, tfs, lfs, launch_count in matches:
-        try:
-            ltu_dt = datetime.strptime(ltu, "%Y-%m-%d %H:%M:%S")
-            ltv_dt = datetime.strptime(ltv, "%Y-%m-%d %H:%M:%S")
-        except ValueError:
+def iter_stats_rows(lines, intervals=INTERVALS):
+    """Yield one tuple (COLUMNS order, times still as text) per package line of the wanted sections."""
+    user, interval, time_range = None, None, None
+    for line in lines:
+        if 'totalTimeUsed="' in line:
+            if interval in intervals:
+                m = STATS_RE.search(line)
+                if m:
+                    pkg, ttu, ltu, _ttv, ltv, _tfs, _lfs, launches = m.groups()
+                    yield user, interval, time_range, pkg, ltu, ltv, ttu, int(launches)
             continue
 
-        records.append({
-            "Package": pkg,
-            "Last Time Used": ltu_dt,
-            "Last Time Visible": ltv_dt,
-            "Total Time Used": ttu,
-            "App Launch Count": int(launch_count)
-        })
+        m = USER_RE.match(line)
+        if m:
+            user, interval, time_range = int(m.group(1)), None, None
+            continue
+        m = SECTION_RE.match(line)
+        if m:
+            interval, time_range = m.group(1), None
+            continue
+        if interval is not None and time_range is None:
+            m = RANGE_RE.match(line)
+            if m:
+                time_range = m.group(1).strip()
+                continue
+        if OTHER_SECTION_RE.match(line):
+            interval = None
 
-    df = pd.DataFrame(records)
-    df = df.sort_values("Last Time Used")
+def parse_usagestats_dump(file_path, intervals=INTERVALS) -> pd.DataFrame:
+    """All package rows of the chosen interval sections, tagged with user/interval/time range."""
+    with open_evidence(file_path) as ev:  # plain, .gz/.bz2/.xz or archive!member
+        df = pd.DataFrame(list(iter_stats_rows(ev.text(), intervals)), columns=COLUMNS)
 
-    # Save to CSV
-    df.to_csv("UsageTimeline_Full.csv", index=False)
-    print("✅ Timeline saved to 'UsageTimeline_Full.csv'")
-    print(df.tail(10))  # Preview
+    for col in ("Last Time Used", "Last Time Visible"):
+        df[col] = pd.to_datetime(df[col], format="%Y-%m-%d %H:%M:%S", errors="coerce")
+    df = df.dropna(subset=["Last Time Used", "Last Time Visible"])
 
-# Run the function
-parse_usagestats_dump("usagestats_dump.txt")
+    # sections in dump order per user, most recent use last within each
+    df["Interval"] = pd.Categorical(df["Interval"], categories=INTERVALS)
+    return df.sort_values(["User", "Interval", "Last Time Used"], kind="stable").reset_index(drop=True)
 
+def parse_args():
+    ap = argparse.ArgumentParser(description="Per-interval package stats from a usagestats dump")
+    ap.add_argument("dump", nargs="?", default="usagestats_dump.txt", help="dumpsys usagestats output (TXT)")
+    ap.add_argument("--interval", choices=INTERVALS, action="append",
+                    help="Only this interval (repeatable; default: all four)")
+    ap.add_argument("--out", default="UsageTimeline_Full.csv", help="CSV filename")
+    return ap.parse_args()
+
+def main():
+    args = parse_args()
+    df = parse_usagestats_dump(args.dump, tuple(args.interval or INTERVALS))
+
+    # Save to CSV
+    df.to_csv(args.out, index=False)
+    print(f"✅ Timeline saved to '{args.out}'")
+    print(df.groupby(["User", "Interval"], observed=True).size().to_string())
+    print(df.tail(10))  # Preview
+    evidence.print_digests()
 
+if __name__ == "__main__":
+    main()
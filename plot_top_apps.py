@@ -1,16 +1,78 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-
-df = pd.read_csv("AppUsage_Timeline_Final.csv")
-launch_df = df[df['Event Type'] == 'Last Used']
-
-# Sum launch counts per app
-launch_df['Count'] = launch_df['Details'].str.extract(r'(\d+)').astype(int)
-top_apps = launch_df.groupby('Package')['Count'].sum().sort_values(ascending=False).head(10)
-
-# Plot
-top_apps.plot(kind='barh', title='Top 10 Apps by Launch Count', figsize=(10,6))
-plt.xlabel("Launch Count")
-plt.ylabel("App Package")
-plt.tight_layout()
-plt.show()
+# plot_top_apps.py
+# Bar chart of the top-K apps by launches, foreground time, notifications or last use,
+# from the events dump itself (top_apps.py); renders to a PNG without a display.
+# Apps of users other than 0 (work profile, secondary users) are labelled "pkg (user N)".
+# Usage:
+#   python plot_top_apps.py usagestats_dump.txt --metric launches --k 10
+#   python plot_top_apps.py usagestats_dump.txt --metric seconds --k 15 --out top_time.csv --show
+# Output:
+#   top_apps_<metric>.png (+ the ranked table as CSV with --out)
+
+import os, sys, argparse
+
+from top_apps import METRICS, top_apps_from_dump
+from event_cache import user_label
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Top-K apps by a usage metric")
+    ap.add_argument("dump", nargs="?", default="usagestats_dump.txt", help="usagestats events dump (TXT)")
+    ap.add_argument("--metric", choices=list(METRICS), default="launches", help="Ranking metric (default launches)")
+    ap.add_argument("--k", type=int, default=10, help="Number of apps (default 10)")
+    ap.add_argument("--user", type=int, help="Only this Android user's events (default: every user)")
+    ap.add_argument("--fig", help="PNG output (default top_apps_<metric>.png)")
+    ap.add_argument("--out", help="Also save the ranked table as CSV")
+    ap.add_argument("--show", action="store_true", help="Open a window as well (needs a display)")
+    ap.add_argument("--no-cache", action="store_true", help="Re-parse the dump instead of using/writing the .evcache")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Processes for parsing large dumps (default: all cores, 1 = serial)")
+    return ap.parse_args()
+
+def draw_top_apps(df, metric: str):
+    import matplotlib.pyplot as plt
+    from matplotlib.dates import DateFormatter
+    col = METRICS[metric]
+    df = df.iloc[::-1]  # best at the top of a barh
+    fig, ax = plt.subplots(figsize=(10, max(4, len(df) * 0.5)))
+    if metric == "last_used":
+        ax.plot(df[col], range(len(df)), "o")
+        ax.xaxis.set_major_formatter(DateFormatter("%Y-%m-%d %H:%M"))
+        fig.autofmt_xdate()
+    elif metric == "seconds":
+        hours = df[col].max() >= 7200
+        ax.barh(range(len(df)), df[col] / (3600.0 if hours else 60.0))
+        col = f"Foreground time ({'hours' if hours else 'minutes'})"
+    else:
+        ax.barh(range(len(df)), df[col])
+    ax.set_yticks(range(len(df)))
+    ax.set_yticklabels([user_label(p, u) for p, u in zip(df["Package"], df["User"].tolist())])
+    ax.set_title(f"Top {len(df)} Apps by {METRICS[metric]}")
+    ax.set_xlabel(col)
+    ax.set_ylabel("App Package")
+    fig.tight_layout()
+    return fig
+
+def main():
+    args = parse_args()
+    # pyplot (~0.5 s) only once there is something to draw, not for --help / bad arguments
+    import matplotlib.pyplot as plt
+    if not args.show:
+        plt.switch_backend("Agg")
+
+    df = top_apps_from_dump(args.dump, args.metric, args.k, not args.no_cache, args.workers, args.user)
+    if df.empty:
+        print(f"No apps with any {METRICS[args.metric].lower()} in {args.dump}.")
+        sys.exit(1)
+    print(df.to_string(index=False))
+    if args.out:
+        df.to_csv(args.out, index=False)
+        print(f"✅ Saved ranking to {args.out}")
+
+    fig = draw_top_apps(df, args.metric)
+    fig_name = args.fig or f"top_apps_{args.metric}.png"
+    fig.savefig(fig_name, dpi=200)
+    print(f"✅ Saved chart to {fig_name}")
+    if args.show:
+        plt.show()
+
+if __name__ == "__main__":
+    main()
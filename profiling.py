@@ -0,0 +1,135 @@
+# profiling.py
+# Per-stage wall/CPU time and pipeline counters behind the --profile reports.
+# The pipeline modules call stage()/count() unconditionally; both are a no-op unless a
+# Profile is active, and even then they only touch a dict, never a single event or line.
+#   with profiling.activate(profiling.Profile("events_to_gantt", dump)) as prof:
+#       ... run the job ...
+#   prof.write("gantt_profile.json")
+# Report (JSON):
+#   stages         name -> calls, wall_s, cpu_s   (in order first entered; nested stages overlap)
+#   counters       lines_scanned, events, sessions_closed, sessions_open, rows_written, ...
+#   events_by_type ACTIVITY_RESUMED -> n, ...
+# Pool workers collect into their own Profile and send the counters back (see merge()).
+# The active Profile is per thread: a GUI worker or a server request thread profiling a job
+# does not record into (or clobber) another thread's. A helper thread that works for an
+# active job joins it explicitly: with profiling.activate(profile_of_the_job): ...
+
+import os, sys, json, time, platform, threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+import evidence
+
+_local = threading.local()
+_NOOP = nullcontext()
+
+class Profile:
+    def __init__(self, tool: str = "", input_path: str = None):
+        self.tool = tool
+        self.input_path = input_path
+        self.stages = {}  # name -> [calls, wall s, cpu s]
+        self.counters = Counter()
+        self.event_types = Counter()
+        self._t0, self._cpu0, self._children0 = time.perf_counter(), time.process_time(), _children_cpu()
+
+    @contextmanager
+    def stage(self, name: str):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            st = self.stages.setdefault(name, [0, 0.0, 0.0])
+            st[0] += 1
+            st[1] += time.perf_counter() - wall
+            st[2] += time.process_time() - cpu
+
+    def report(self) -> dict:
+        size = None
+        if self.input_path:
+            path = evidence.source_path(self.input_path)  # archive!member: the archive
+            if os.path.isfile(path):
+                size = os.path.getsize(path)
+        return {
+            "tool": self.tool,
+            "input": self.input_path,
+            "input_bytes": size,
+            "python": platform.python_version(),
+            "wall_s": round(time.perf_counter() - self._t0, 4),
+            "cpu_s": round(time.process_time() - self._cpu0, 4),
+            # finished pool workers (os.times() reports zero for these on Windows)
+            "children_cpu_s": round(_children_cpu() - self._children0, 4),
+            "peak_rss_mb": _peak_rss_mb(),
+            "stages": {name: {"calls": n, "wall_s": round(w, 4), "cpu_s": round(c, 4)}
+                       for name, (n, w, c) in self.stages.items()},
+            "counters": dict(self.counters),
+            "events_by_type": dict(self.event_types.most_common()),
+            "evidence_sha256": evidence.digests(),
+        }
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+def _children_cpu() -> float:
+    t = os.times()
+    return t.children_user + t.children_system
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / 2**20 if sys.platform == "darwin" else rss / 2**10, 1)
+
+# ----------------- ACTIVE PROFILE -----------------
+
+def active():
+    """This thread's active Profile, or None."""
+    return getattr(_local, "profile", None)
+
+@contextmanager
+def activate(profile: Profile):
+    """Make profile the one stage()/count() record into in this thread (for the duration of the block)."""
+    previous, _local.profile = active(), profile
+    try:
+        yield profile
+    finally:
+        _local.profile = previous
+
+def stage(name: str):
+    """Context manager timing one pipeline stage; free when not profiling."""
+    prof = active()
+    return prof.stage(name) if prof is not None else _NOOP
+
+def count(name: str, n: int = 1):
+    prof = active()
+    if prof is not None:
+        prof.counters[name] += int(n)
+
+def count_events(types):
+    """Tally an EventTable's type column (one bincount) into events_by_type."""
+    prof = active()
+    if prof is not None and len(types):
+        import numpy as np  # not at the top: events_tokenizer imports this module and stays light
+        from events_tokenizer import EVENT_NAMES
+        for code, n in enumerate(np.bincount(types).tolist()):
+            if n:
+                prof.event_types[EVENT_NAMES.get(code, str(code))] += n
+
+def counters() -> dict:
+    """What a pool worker sends back to be merge()d by the parent."""
+    prof = active()
+    if prof is None:
+        return {}
+    return {"counters": dict(prof.counters), "event_types": dict(prof.event_types)}
+
+def merge(collected: dict):
+    prof = active()
+    if prof is not None and collected:
+        prof.counters.update(collected["counters"])
+        prof.event_types.update(collected["event_types"])
+
+def add_profile_argument(ap, default: str):
+    ap.add_argument("--profile", nargs="?", const=default, metavar="JSON",
+                    help=f"Write per-stage timings and counters to a JSON report (default {default})")
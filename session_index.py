@@ -0,0 +1,176 @@
+# session_index.py
+# Interval index over reconstructed usage sessions (the same sessions events_to_gantt draws),
+# for "what was in the foreground at T?" and "which apps were used between T1 and T2?".
+# Usage:
+#   python session_index.py usagestats_dump.txt --at "2025-08-30 21:20:00"
+#   python session_index.py usagestats_dump.txt --between "2025-08-30 21:00:00" "2025-08-30 21:30:00"
+#   python session_index.py usagestats_dump.txt --queries queries.txt --out answers.csv
+# queries.txt holds one query per line: a timestamp, or two timestamps separated by a comma.
+# Output:
+#   matching sessions printed, or written as CSV with a Query column
+
+import os, sys, argparse
+
+import numpy as np
+import pandas as pd
+
+from events_tokenizer import parse_ts, format_ts
+from event_cache import load_events, package_users
+from sessions import build_sessions, session_spans, sessions_frame
+
+_LEFT, _RIGHT = 5, 6  # child slots in a node list
+LEAF_SIZE = 64        # subsets this small are kept flat and filtered with a mask
+
+class SessionIndex:
+    """
+    Static centered interval tree over half-open sessions [start, end).
+    Each node keeps the sessions that contain its center, sorted by start and by end,
+    so a stabbing query is a binary search per level: O(log n + k).
+    Small subsets become flat leaves, scanned in one vectorized step.
+    Window queries add the sessions starting inside the window from one sorted array.
+    """
+
+    def __init__(self, packages, pkg, start, end, users=None):
+        keep = end > start
+        self.packages, self.users = packages, users
+        self.pkg, self.start, self.end = pkg[keep], start[keep], end[keep]
+
+        self._by_start = np.argsort(self.start, kind="stable")
+        self._starts = self.start[self._by_start]
+        self._nodes = []  # (center, idx by start, starts asc, idx by end, -ends asc, left, right) or a leaf
+        if len(self.start):
+            self._root = self._build(np.arange(len(self.start)))
+
+    @classmethod
+    def from_dump(cls, path: str, use_cache: bool = True, workers: int = 1):
+        table = load_events(path, use_cache, workers)
+        return cls(table.packages, *session_spans(build_sessions(table)), package_users(table))
+
+    def _build(self, root_idx):
+        # iterative, so deep trees cannot hit the recursion limit; children are patched in afterwards
+        stack = [(root_idx, None, 0)]
+        root = None
+        while stack:
+            idx, parent, side = stack.pop()
+            node = len(self._nodes)
+            if parent is None:
+                root = node
+            else:
+                self._nodes[parent][side] = node
+
+            s, e = self.start[idx], self.end[idx]
+            if len(idx) <= LEAF_SIZE:
+                self._nodes.append((idx, s, e))
+                continue
+
+            center = np.median(np.concatenate((s, e)))
+            mine = idx[(s <= center) & (e > center)]
+            o_s = np.argsort(self.start[mine], kind="stable")
+            o_e = np.argsort(-self.end[mine], kind="stable")
+            self._nodes.append([center, mine[o_s], self.start[mine][o_s], mine[o_e], -self.end[mine][o_e], None, None])
+
+            left, right = idx[e <= center], idx[s > center]
+            if len(left):
+                stack.append((left, node, _LEFT))
+            if len(right):
+                stack.append((right, node, _RIGHT))
+        return root
+
+    def stab(self, t: int) -> np.ndarray:
+        """Indices of sessions with start <= t < end."""
+        if not self._nodes:
+            return np.array([], dtype=np.int64)
+        hits = []
+        node = self._root
+        while node is not None:
+            if len(self._nodes[node]) == 3:
+                idx, s, e = self._nodes[node]
+                hits.append(idx[(s <= t) & (e > t)])
+                break
+            center, idx_s, starts, idx_e, neg_ends, left, right = self._nodes[node]
+            if t < center:
+                # all of these end after center > t; keep those already started
+                hits.append(idx_s[:np.searchsorted(starts, t, side="right")])
+                node = left
+            else:
+                # all of these started at or before center <= t; keep those not yet ended
+                hits.append(idx_e[:np.searchsorted(neg_ends, -t, side="left")])
+                node = right
+        return np.concatenate(hits)
+
+    def window(self, t1: int, t2: int) -> np.ndarray:
+        """Indices of sessions overlapping [t1, t2)."""
+        if t2 <= t1:
+            return np.array([], dtype=np.int64)
+        lo = np.searchsorted(self._starts, t1, side="right")
+        hi = np.searchsorted(self._starts, t2, side="left")
+        return np.concatenate((self.stab(t1), self._by_start[lo:hi]))
+
+    def frame(self, idx) -> pd.DataFrame:
+        return sessions_frame(self.packages, self.pkg[idx], self.start[idx], self.end[idx], self.users)
+
+def read_queries(path: str):
+    """One query per line: 'YYYY-MM-DD HH:MM:SS' or 'T1,T2'. Blank lines and # comments are skipped."""
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                queries.append(tuple(parse_ts(part.strip()) for part in line.split(",")))
+    return queries
+
+def run_queries(index: SessionIndex, queries):
+    """Answer (t,) and (t1, t2) queries in order; returns [(label, sessions DataFrame)]."""
+    answers = []
+    for q in queries:
+        if len(q) == 1:
+            label, idx = f"at {format_ts(q[0])}", index.stab(q[0])
+        else:
+            label, idx = f"{format_ts(q[0])} - {format_ts(q[1])}", index.window(q[0], q[1])
+        answers.append((label, index.frame(idx)))
+    return answers
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Point-in-time and window queries over app usage sessions")
+    ap.add_argument("dump", help="usagestats events dump (TXT)")
+    ap.add_argument("--at", action="append", default=[], metavar="TIME",
+                    help='"YYYY-MM-DD HH:MM:SS": apps in the foreground at that instant (repeatable)')
+    ap.add_argument("--between", action="append", nargs=2, default=[], metavar=("T1", "T2"),
+                    help="apps used at any point in [T1, T2) (repeatable)")
+    ap.add_argument("--queries", help="File with one query per line (TIME or T1,T2)")
+    ap.add_argument("--out", help="Write all answers to this CSV instead of printing them")
+    ap.add_argument("--no-cache", action="store_true", help="Re-parse the dump instead of using/writing the .evcache")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Processes for parsing large dumps (default: all cores, 1 = serial)")
+    return ap.parse_args()
+
+def main():
+    args = parse_args()
+    try:
+        queries = [(parse_ts(t),) for t in args.at] + [(parse_ts(a), parse_ts(b)) for a, b in args.between]
+        if args.queries:
+            queries += read_queries(args.queries)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if not queries:
+        print("Nothing to ask: give --at, --between or --queries.")
+        sys.exit(1)
+
+    index = SessionIndex.from_dump(args.dump, not args.no_cache, args.workers)
+    answers = run_queries(index, queries)
+
+    if args.out:
+        out = pd.concat([df.assign(Query=label) for label, df in answers], ignore_index=True)
+        out = out[["Query", "Package", "User", "Start", "End", "Duration_s"]]
+        out.to_csv(args.out, index=False)
+        print(f"✅ Saved {len(out)} matching sessions for {len(queries)} queries to {args.out}")
+    else:
+        with pd.option_context("display.max_rows", None, "display.width", 200):
+            for label, df in answers:
+                print(f"\n{label}: {df['Package'].nunique()} app(s)")
+                if len(df):
+                    print(df.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
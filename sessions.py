@@ -0,0 +1,111 @@
+# sessions.py
+# Vectorized session reconstruction over an EventTable (see event_cache.py).
+# One set of rules for every caller (GUI totals, events_parser, Gantt):
+#   - events are ordered by package, then time (file order for same-second events); a
+#     package code stands for one package of one Android user (event_cache.py), so
+#     sessions never pair across users
+#   - a session is an ACTIVITY_RESUMED immediately followed, for that package,
+#     by ACTIVITY_PAUSED/STOPPED; a second RESUMED replaces an unclosed first one
+#   - extra PAUSED/STOPPED with nothing open are ignored
+#   - App Launch Count = number of RESUMED, Last Time Used = latest event of any type
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import profiling
+from events_tokenizer import ACTIVITY_RESUMED, ACTIVITY_PAUSED, ACTIVITY_STOPPED
+
+# Closed sessions (sorted by package, then start) plus what is left at the edges:
+#   open_pkg/open_start  RESUMED with no close after it (still running when the events end)
+#   lead_pkg/lead_end    PAUSED/STOPPED before any RESUMED of the package (closes an earlier session)
+Sessions = namedtuple("Sessions", ["pkg", "start", "end", "duration",
+                                   "open_pkg", "open_start", "lead_pkg", "lead_end", "packages"])
+
+# Per-package aggregates, indexed by package code (i.e. in order of first appearance)
+PackageUsage = namedtuple("PackageUsage", ["packages", "last", "total", "launches"])
+
+def build_sessions(table) -> Sessions:
+    is_res = table.type == ACTIVITY_RESUMED
+    is_end = (table.type == ACTIVITY_PAUSED) | (table.type == ACTIVITY_STOPPED)
+    sel = np.flatnonzero(is_res | is_end)
+
+    pkg, ts, res = table.pkg[sel], table.ts[sel], is_res[sel]
+    order = np.lexsort((ts, pkg))  # stable, so same-second events keep file order
+    pkg, ts, res = pkg[order], ts[order], res[order]
+
+    same_next = pkg[:-1] == pkg[1:]
+    first = np.concatenate(([True], ~same_next))
+    last = np.concatenate((~same_next, [True]))
+
+    # RESUMED directly followed by a close of the same package
+    i = np.flatnonzero(res[:-1] & ~res[1:] & same_next)
+    start, end = ts[i], ts[i + 1]
+    o = np.flatnonzero(res & last)
+    l = np.flatnonzero(~res & first)
+    profiling.count("sessions_closed", len(i))
+    profiling.count("sessions_open", len(o))
+
+    return Sessions(pkg[i], start, end, end - start,
+                    pkg[o], ts[o], pkg[l], ts[l], table.packages)
+
+def package_usage(table, sessions: Sessions) -> PackageUsage:
+    n = len(table.packages)
+    last = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(last, table.pkg, table.ts)
+    total = np.bincount(sessions.pkg, weights=np.maximum(sessions.duration, 0), minlength=n).astype(np.int64)
+    launches = np.bincount(table.pkg[table.type == ACTIVITY_RESUMED], minlength=n)
+    return PackageUsage(table.packages, last, total, launches)
+
+def session_spans(sessions: Sessions):
+    """
+    Every session as (pkg, start, end) arrays, closed and open alike.
+    Sessions still open are taken to end at the midnight after they started.
+    """
+    pkg = np.concatenate((sessions.pkg, sessions.open_pkg))
+    start = np.concatenate((sessions.start, sessions.open_start))
+    end = np.concatenate((sessions.end, (sessions.open_start // 86400 + 1) * 86400))
+    return pkg, start, end
+
+def clip_sessions(sessions: Sessions, lo: int, hi: int):
+    """Sessions overlapping [lo, hi), clipped to it, as (pkg, start, end) arrays."""
+    pkg, start, end = session_spans(sessions)
+    s, e = np.maximum(start, lo), np.minimum(end, hi)
+    keep = e > s
+    return pkg[keep], s[keep], e[keep]
+
+def split_at(pkg, start, end, width: int):
+    """
+    Cut (pkg, start, end) sessions at every multiple of width seconds they cross.
+    Returns (bin, pkg, start, end) pieces sorted by bin number (ts // width).
+    """
+    keep = end > start
+    pkg, start, end = pkg[keep], start[keep], end[keep]
+    first = start // width
+    n = (end - 1) // width - first + 1
+    src = np.repeat(np.arange(len(start)), n)
+    bins = first[src] + (np.arange(len(src)) - np.repeat(np.cumsum(n) - n, n))
+    s = np.maximum(start[src], bins * width)
+    e = np.minimum(end[src], (bins + 1) * width)
+    order = np.argsort(bins, kind="stable")
+    return bins[order], pkg[src][order], s[order], e[order]
+
+def split_by_day(pkg, start, end):
+    """split_at() midnight: (day, pkg, start, end) pieces sorted by day number (ts // 86400)."""
+    return split_at(pkg, start, end, 86400)
+
+def sessions_frame(packages, pkg, start, end, users=None) -> pd.DataFrame:
+    """
+    Package | User | Start | End | Duration_s, sorted by package, user, then start.
+    users: the user of every package code (EventTable.users; None for all user 0).
+    """
+    users = np.zeros(len(packages), dtype=np.int32) if users is None else np.asarray(users)
+    df = pd.DataFrame({
+        "Package": np.asarray(packages, dtype=object)[pkg] if len(pkg) else np.array([], dtype=object),
+        "User": users[pkg] if len(pkg) else np.array([], dtype=np.int32),
+        "Start": pd.to_datetime(start, unit="s"),
+        "End": pd.to_datetime(end, unit="s"),
+        "Duration_s": (end - start).astype(float),
+    })
+    return df.sort_values(["Package", "User", "Start"], kind="stable").reset_index(drop=True)
@@ -0,0 +1,161 @@
+# timeline.py
+# Typed parse -> merge -> sort pipeline behind the GUI's final timeline.
+# Frames stay in datetime64 / timedelta64 / categorical form from parsing to sorting;
+# format_timeline() turns them into the CSV strings once, at export.
+#   read_usage / usage_frame   Package | User | Last Time Used | Last Time Visible | Total Time Used | App Launch Count
+#   read_packages_input        Package | First Installed | Last Updated | Installer
+#   build_final_timeline       outer join of the two on Package, most recently used first
+# A package used by several Android users (work profile, secondary users) has one usage
+# row per user, each joined to the same install details; installed but unused packages
+# have no User.
+#   generate_timeline          the whole job (parse, merge, write the CSV), as the GUI's Generate button
+# Usage (without the GUI):
+#   python timeline.py usagestats_dump.txt packages.xml --out AppUsage_Timeline_Final.csv
+# Output:
+#   AppUsage_Timeline_Final.csv
+
+import os, argparse
+
+import numpy as np
+import pandas as pd
+
+import profiling
+import evidence
+from evidence import open_evidence, inner_name
+from parallel_events import usage_stats
+from packages_reader import read_packages, TIME_FORMAT
+
+DATE_COLUMNS = ["First Installed", "Last Updated", "Last Time Used", "Last Time Visible"]
+TIMELINE_COLUMNS = ["Package", "User", "First Installed", "Last Updated", "Installer",
+                    "Last Time Used", "Last Time Visible", "Total Time Used", "App Launch Count"]
+
+_CSV_RENAME = {
+    "package": "Package", "package name": "Package",
+    "first installed": "First Installed", "firstinstalled": "First Installed",
+    "first_install_time": "First Installed", "first_install": "First Installed",
+    "last updated": "Last Updated", "lastupdated": "Last Updated",
+    "last_update_time": "Last Updated", "last_update": "Last Updated",
+    "installer": "Installer", "installer package": "Installer", "installerpackage": "Installer",
+}
+
+def usage_frame(stats: dict) -> pd.DataFrame:
+    """usage_stats() dict ((user, package) -> [last ts, total seconds, launches]) as a typed frame, latest use first."""
+    vals = np.array(list(stats.values()), dtype=np.int64).reshape(-1, 3)
+    df = pd.DataFrame({
+        "Package": pd.Series([pkg for _, pkg in stats], dtype=object),
+        "User": pd.array([user for user, _ in stats], dtype="Int32"),
+        "Last Time Used": pd.to_datetime(vals[:, 0], unit="s"),
+        "Last Time Visible": pd.Series(pd.NaT, index=range(len(vals)), dtype="datetime64[ns]"),
+        "Total Time Used": pd.to_timedelta(vals[:, 1], unit="s"),
+        "App Launch Count": vals[:, 2],
+    })
+    return df.sort_values("Last Time Used", ascending=False)
+
+def read_usage(path: str, use_cache: bool = True, workers: int = None, progress=None) -> pd.DataFrame:
+    return usage_frame(usage_stats(path, use_cache, workers or os.cpu_count() or 1, progress))
+
+def read_packages_input(path: str) -> pd.DataFrame:
+    """packages.xml (streamed) or a packages_output.csv-like file, dates parsed once; either may be compressed."""
+    if os.path.splitext(inner_name(path))[1].lower() != ".csv":
+        return read_packages(path)[["Package", "First Installed", "Last Updated", "Installer"]]
+
+    with open_evidence(path) as ev:
+        df = pd.read_csv(ev.binary())
+    df = df.rename(columns={c: _CSV_RENAME[c.lower().strip()] for c in df.columns if c.lower().strip() in _CSV_RENAME})
+    keep = [x for x in ["Package", "First Installed", "Last Updated", "Installer"] if x in df.columns]
+    if "Package" not in keep:
+        raise ValueError("Packages CSV must contain a 'Package' (or 'Package Name') column.")
+    df = df[keep].copy()
+    for col in ("First Installed", "Last Updated"):
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    return df
+
+def build_final_timeline(usage_df: pd.DataFrame, packages_df: pd.DataFrame) -> pd.DataFrame:
+    """Outer join on Package (as one shared categorical; one row per user of it), sorted by Last Time Used desc, NaT last."""
+    cats = pd.Index(packages_df["Package"].astype(object)).union(pd.Index(usage_df["Package"].astype(object)).unique())
+    left = packages_df.assign(Package=pd.Categorical(packages_df["Package"].astype(object), categories=cats))
+    right = usage_df.assign(Package=pd.Categorical(usage_df["Package"].astype(object), categories=cats))
+    merged = pd.merge(left, right, on="Package", how="outer")
+
+    merged = merged[[c for c in TIMELINE_COLUMNS if c in merged.columns]]
+    if "Last Time Used" in merged.columns:
+        order = merged["Last Time Used"].sort_values(ascending=False, na_position="last").index
+        merged = merged.loc[order]
+    return merged
+
+def format_duration(td: pd.Series) -> pd.Series:
+    """timedelta64 -> 'HH:MM:SS' (hours may exceed 99), None where zero or missing."""
+    secs = td.to_numpy(dtype="m8[s]").astype(np.int64)
+    ok = td.notna().to_numpy() & (secs > 0)
+    out = np.full(len(td), None, dtype=object)
+    out[ok] = [f"{v // 3600:02d}:{v % 3600 // 60:02d}:{v % 60:02d}" for v in secs[ok].tolist()]
+    return pd.Series(out, index=td.index)
+
+def format_timeline(df: pd.DataFrame) -> pd.DataFrame:
+    """The one place typed columns become export strings (CSV, GUI preview)."""
+    out = df.copy()
+    for col in DATE_COLUMNS:
+        if col in out.columns:
+            out[col] = out[col].dt.strftime(TIME_FORMAT)
+    if "Total Time Used" in out.columns:
+        out["Total Time Used"] = format_duration(out["Total Time Used"])
+    if "Package" in out.columns:
+        out["Package"] = out["Package"].astype(object)
+    return out
+
+def generate_timeline(usage_path: str, packages_path: str, out: str, progress=None, use_cache: bool = True, workers: int = None):
+    """
+    The whole Generate job: parse, merge, write the CSV.
+    progress(stage, done, total, events) is called along the way and may raise to stop.
+    Returns (typed final timeline, the same formatted as in the CSV, True if the dump had no events).
+    """
+    usage_df = read_usage(usage_path, use_cache, workers, progress)
+    return write_timeline(usage_df, packages_path, out, progress)
+
+def write_timeline(usage_df: pd.DataFrame, packages_path: str, out: str, progress=None):
+    """generate_timeline() from an already parsed usage frame (see usage_frame); same return value."""
+    report = progress or (lambda *args: None)
+    report("packages", 0, 0, 0)
+    with profiling.stage("packages"):
+        packages_df = read_packages_input(packages_path)
+    profiling.count("packages_listed", len(packages_df))
+    report("merge", 0, 0, 0)
+    # typed all the way; strings only from here on
+    with profiling.stage("merge"):
+        final_df = build_final_timeline(usage_df, packages_df)
+    with profiling.stage("format"):
+        final_text = format_timeline(final_df)
+    report("write", 0, 0, 0)
+    with profiling.stage("write_csv"):
+        final_text.to_csv(out, index=False, encoding="utf-8")
+    profiling.count("rows_written", len(final_text))
+    return final_df, final_text, usage_df.empty
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Final app usage timeline from an events dump + packages file")
+    ap.add_argument("dump", help="usagestats events dump (TXT)")
+    ap.add_argument("packages", help="packages.xml or packages_output.csv")
+    ap.add_argument("--out", default="AppUsage_Timeline_Final.csv", help="Output CSV")
+    ap.add_argument("--no-cache", action="store_true", help="Re-parse the dump instead of using/writing the .evcache")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Processes for parsing large dumps (default: all cores, 1 = serial)")
+    profiling.add_profile_argument(ap, "timeline_profile.json")
+    return ap.parse_args()
+
+def main():
+    args = parse_args()
+    with profiling.activate(profiling.Profile("timeline", args.dump)) as prof:
+        final_df, _, no_events = generate_timeline(args.dump, args.packages, args.out,
+                                                   use_cache=not args.no_cache, workers=args.workers)
+    if no_events:
+        print("⚠️ No events parsed: the dump needs lines like "
+              'time="YYYY-MM-DD HH:MM:SS" type=ACTIVITY_RESUMED package=com.example')
+    print(f"✅ Saved final timeline ({len(final_df)} rows) to {args.out}")
+    evidence.print_digests()
+    if args.profile:
+        prof.write(args.profile)
+        print(f"✅ Saved profile report to {args.profile}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+# timeline_server.py
+# Local HTTP/JSON query service over one device's dump, for analysts who would otherwise
+# re-run the chart scripts for every small variation. The dump is parsed once (through
+# its .evcache) and its sessions built and indexed once; every request is answered from
+# memory. Rendered PNGs go into an LRU cache keyed by (dump SHA-256, chart, parameters),
+# so a chart asked for again, by anyone, is sent without drawing it. Standard library
+# HTTP (one thread per request); only the drawing itself is done one chart at a time.
+# Endpoints (GET, or HEAD for the headers only; times as "YYYY-MM-DD HH:MM:SS"; user=N limits any of them to one Android user):
+#   /case                                          dump, SHA-256, events, users, first/last event
+#   /sessions?at=T  |  /sessions?t1=T1&t2=T2       sessions in the foreground at T / overlapping [T1, T2)
+#   /top?metric=seconds&k=10                       top-K apps (metrics as plot_top_apps.py)
+#   /heatmap?bins=day&metric=launches&top=10       heatmap matrix (bins/metrics as events_to_daily_heatmap.py)
+#   /gantt.png?day=2025-08-30&top=10   /heatmap.png?...   /top.png?...   (dpi=50..300, default 100)
+#   /stats                                         PNG cache hits, misses, entries, bytes
+# Usage:
+#   python timeline_server.py usagestats_dump.txt --port 8765
+#   curl "http://127.0.0.1:8765/sessions?t1=2025-08-30%2021:00:00&t2=2025-08-30%2021:30:00"
+# Output:
+#   nothing on disk; serves until Ctrl+C
+
+import os, io, json, hashlib, argparse, threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+import evidence
+from events_tokenizer import parse_ts, parse_day, format_ts, ts_to_datetime, date_to_ts
+from event_cache import load_events, package_users, package_labels, select_user, user_ids
+from sessions import build_sessions, session_spans, split_by_day
+from session_index import SessionIndex
+from top_apps import METRICS as TOP_METRICS, app_aggregates, top_apps
+from events_to_daily_heatmap import BINS, METRICS as HEATMAP_METRICS, bin_matrix, heatmap_frame, draw_heatmap
+from events_to_gantt import SESSION_TYPES, top_sessions, draw_gantt
+from plot_top_apps import draw_top_apps
+
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_MB = 64
+DEFAULT_DPI = 100
+MAX_SESSIONS = 1000  # sessions listed per answer unless limit= says otherwise
+
+class BadRequest(ValueError):
+    pass
+
+class PngCache:
+    """Least-recently-used rendered charts, bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.items = OrderedDict()
+        self.bytes = 0
+        self.hits = self.misses = self.drawn = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, count: bool = True):
+        with self.lock:
+            png = self.items.get(key)
+            if png is not None:
+                self.items.move_to_end(key)
+            if count:
+                if png is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            return png
+
+    def put(self, key, png: bytes):
+        with self.lock:
+            self.drawn += 1
+            if key in self.items:
+                self.bytes -= len(self.items.pop(key))
+            if len(png) > self.max_bytes:
+                return
+            self.items[key] = png
+            self.bytes += len(png)
+            while self.bytes > self.max_bytes:
+                _, old = self.items.popitem(last=False)
+                self.bytes -= len(old)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "drawn": self.drawn, "entries": len(self.items),
+                    "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+class Case:
+    """
+    One dump held in memory. Everything derived from it (one user's events, sessions,
+    session index, per-app aggregates, heatmap matrices) is built on first use and kept.
+    """
+
+    def __init__(self, path: str, use_cache: bool = True, workers: int = 1, cache_mb: float = DEFAULT_CACHE_MB):
+        self.path = path
+        self.table = load_events(path, use_cache, workers)
+        self.sha256 = evidence.digests().get(path) or evidence.file_sha256(path)
+        self.users = user_ids(self.table)
+        self.pngs = PngCache(int(cache_mb * 2**20))
+        self._built = {}
+        self._build_lock = threading.RLock()
+        self._draw_lock = threading.Lock()  # pyplot is not thread-safe
+        self.view(None)
+
+    def _memo(self, key, build):
+        value = self._built.get(key)
+        if value is None:
+            with self._build_lock:
+                value = self._built.get(key)
+                if value is None:
+                    value = self._built[key] = build()
+        return value
+
+    def view(self, user):
+        """(events, sessions, session spans, SessionIndex) of one user, or of everyone for None."""
+        def build():
+            table = self.table if user is None else select_user(self.table, user)
+            sessions = build_sessions(table)
+            spans = session_spans(sessions)
+            return table, sessions, spans, SessionIndex(table.packages, *spans, package_users(table))
+        return self._memo(("view", user), build)
+
+    def aggregates(self, user):
+        table, sessions, _, _ = self.view(user)
+        return self._memo(("aggregates", user), lambda: app_aggregates(table, sessions))
+
+    def matrix(self, user, metric: str, bins: str):
+        table, _, spans, _ = self.view(user)
+        return self._memo(("matrix", user, metric, bins), lambda: bin_matrix([table], metric, bins, [spans]))
+
+    def days(self, user):
+        """Sessions split at midnight: (day, pkg, start, end) sorted by day."""
+        _, _, spans, _ = self.view(user)
+        return self._memo(("days", user), lambda: split_by_day(*spans))
+
+    def png(self, key, draw, dpi: int = DEFAULT_DPI):
+        """The chart for key from the LRU, or drawn by draw() -> Figure and kept there."""
+        key = (self.sha256,) + key + (dpi,)
+        png = self.pngs.get(key)
+        if png is None:
+            with self._draw_lock:
+                # another request may have drawn the same chart while this one waited
+                png = self.pngs.get(key, count=False)
+                if png is None:
+                    png = render_png(draw, dpi)
+                    self.pngs.put(key, png)
+        return png
+
+def render_png(draw, dpi: int) -> bytes:
+    import matplotlib.pyplot as plt
+    fig = draw()
+    try:
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi)
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+# ----------------- PARAMETERS -----------------
+
+def _param(query: dict, name: str, default=None, cast=str):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        return cast(values[-1])
+    except (ValueError, IndexError):
+        raise BadRequest(f"bad value for {name}: {values[-1]!r}")
+
+def _at_least(query: dict, name: str, default: int, minimum: int) -> int:
+    value = _param(query, name, default, int)
+    if value < minimum:
+        raise BadRequest(f"{name} must be at least {minimum} (got {value})")
+    return value
+
+def _choice(query: dict, name: str, choices, default: str) -> str:
+    value = _param(query, name, default)
+    if value not in choices:
+        raise BadRequest(f"{name} must be one of {', '.join(choices)} (got {value!r})")
+    return value
+
+def _user(query: dict, case: Case):
+    user = _param(query, "user", None, int)
+    if user is not None and user not in case.users:
+        raise BadRequest(f"no user {user} in this dump (users: {', '.join(map(str, case.users))})")
+    return user
+
+def _dpi(query: dict) -> int:
+    return min(max(_param(query, "dpi", DEFAULT_DPI, int), 50), 300)
+
+# ----------------- ENDPOINTS -----------------
+# Each takes (case, query) and returns a dict (sent as JSON) or PNG bytes.
+
+def case_info(case: Case, query: dict) -> dict:
+    table = case.table
+    return {"dump": case.path, "sha256": case.sha256, "events": len(table.ts), "packages": len(table.packages),
+            "users": case.users, "sessions": len(case.view(None)[3].start),
+            "first": format_ts(table.ts.min()) if len(table.ts) else None,
+            "last": format_ts(table.ts.max()) if len(table.ts) else None}
+
+def sessions_answer(case: Case, query: dict) -> dict:
+    user = _user(query, case)
+    index = case.view(user)[3]
+    at = _param(query, "at", None, parse_ts)
+    if at is not None:
+        idx, asked = index.stab(at), {"at": format_ts(at)}
+    else:
+        t1, t2 = _param(query, "t1", None, parse_ts), _param(query, "t2", None, parse_ts)
+        if t1 is None or t2 is None:
+            raise BadRequest("give at=TIME or t1=TIME&t2=TIME")
+        idx, asked = index.window(t1, t2), {"t1": format_ts(t1), "t2": format_ts(t2)}
+    df = index.frame(idx)
+    packages = query.get("package")
+    if packages:
+        df = df[df["Package"].isin(packages)]
+    limit = _at_least(query, "limit", MAX_SESSIONS, 0)
+    rows = [{"package": p, "user": int(u), "start": s.strftime("%Y-%m-%d %H:%M:%S"),
+             "end": e.strftime("%Y-%m-%d %H:%M:%S"), "duration_s": d}
+            for p, u, s, e, d in df.head(limit).itertuples(index=False)]
+    return dict(asked, count=len(df), sessions=rows)
+
+def _top_frame(case: Case, query: dict):
+    metric = _choice(query, "metric", TOP_METRICS, "launches")
+    k = _at_least(query, "k", 10, 1)
+    user = _user(query, case)
+    return metric, k, user, top_apps(case.aggregates(user), metric, k)
+
+def top_answer(case: Case, query: dict) -> dict:
+    metric, k, user, df = _top_frame(case, query)
+    col = TOP_METRICS[metric]
+    values = df[col].dt.strftime("%Y-%m-%d %H:%M:%S").tolist() if metric == "last_used" else df[col].tolist()
+    return {"metric": metric, "k": k, "user": user,
+            "apps": [{"package": p, "user": int(u), metric: v}
+                     for p, u, v in zip(df["Package"], df["User"].tolist(), values)]}
+
+def top_png(case: Case, query: dict) -> bytes:
+    metric, k, user, df = _top_frame(case, query)
+    if df.empty:
+        raise LookupError(f"no apps with any {TOP_METRICS[metric].lower()}")
+    return case.png(("top", metric, k, user), lambda: draw_top_apps(df, metric), _dpi(query))
+
+def _heatmap_frame(case: Case, query: dict):
+    bins = _choice(query, "bins", BINS, "day")
+    metric = _choice(query, "metric", HEATMAP_METRICS, "launches")
+    top = _at_least(query, "top", 10, 1)
+    user = _user(query, case)
+    packages = tuple(sorted(set(query.get("package", []))))
+    matrix, rows, names = case.matrix(user, metric, bins)
+    return (bins, metric, top, user, packages), heatmap_frame(matrix, rows, names, bins, top, packages)
+
+def heatmap_answer(case: Case, query: dict) -> dict:
+    (bins, metric, top, user, _), df = _heatmap_frame(case, query)
+    return {"bins": bins, "metric": metric, "user": user, "index_name": df.index.name,
+            "index": df.index.tolist(), "columns": df.columns.tolist(), "values": df.values.tolist()}
+
+def heatmap_png(case: Case, query: dict) -> bytes:
+    params, df = _heatmap_frame(case, query)
+    bins, metric = params[0], params[1]
+    if not df.values.any():
+        raise LookupError(f"no data for metric {metric}")
+    return case.png(("heatmap",) + params, lambda: draw_heatmap(df, metric, bins), _dpi(query))
+
+def gantt_png(case: Case, query: dict) -> bytes:
+    user = _user(query, case)
+    top = _at_least(query, "top", 10, 1)
+    table = case.view(user)[0]
+    day = _param(query, "day", None, parse_day)
+    if day is None:
+        # as events_to_gantt.py: the day of the latest session event
+        session_ts = table.ts[np.isin(table.type, SESSION_TYPES)]
+        if not len(session_ts):
+            raise LookupError("no session events")
+        day = ts_to_datetime(session_ts.max()).date()
+
+    def draw():
+        day_no, pkg, start, end = case.days(user)
+        lo, hi = np.searchsorted(day_no, [date_to_ts(day) // 86400, date_to_ts(day) // 86400 + 1])
+        picked = top_sessions(package_labels(table), pkg[lo:hi], start[lo:hi], end[lo:hi], top)
+        return draw_gantt(day, *picked)
+    return case.png(("gantt", day.isoformat(), top, user), draw, _dpi(query))
+
+def stats_answer(case: Case, query: dict) -> dict:
+    return case.pngs.stats()
+
+ROUTES = {
+    "/case": case_info,
+    "/sessions": sessions_answer,
+    "/top": top_answer,
+    "/heatmap": heatmap_answer,
+    "/stats": stats_answer,
+    "/top.png": top_png,
+    "/heatmap.png": heatmap_png,
+    "/gantt.png": gantt_png,
+}
+
+# ----------------- HTTP -----------------
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "timeline_server/1"
+    head_only = False
+
+    def do_HEAD(self):
+        # the same answer as GET (status, type, length, ETag), without the body
+        self.head_only = True
+        try:
+            self.do_GET()
+        finally:
+            self.head_only = False
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        endpoint = ROUTES.get(url.path.rstrip("/") or "/case")
+        if endpoint is None:
+            return self.send_json(404, {"error": f"no such endpoint {url.path}", "endpoints": list(ROUTES)})
+        query = parse_qs(url.query)
+        try:
+            answer = endpoint(self.server.case, query)
+        except BadRequest as e:
+            return self.send_json(400, {"error": str(e)})
+        except LookupError as e:
+            return self.send_json(404, {"error": str(e)})
+        except Exception as e:
+            self.log_error("%s failed: %r", url.path, e)
+            return self.send_json(500, {"error": repr(e)})
+
+        if isinstance(answer, bytes):
+            # a chart depends only on the dump and its parameters, so its hash is a stable ETag
+            etag = '"' + hashlib.sha256(answer).hexdigest()[:32] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_body(200, answer, "image/png", {"ETag": etag})
+        else:
+            self.send_json(200, answer)
+
+    def send_json(self, status: int, obj):
+        self.send_body(status, json.dumps(obj, default=_json_default).encode("utf-8"), "application/json")
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not self.head_only:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+def make_server(case: Case, host: str = "127.0.0.1", port: int = DEFAULT_PORT, quiet: bool = False):
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.case, server.quiet = case, quiet
+    return server
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Local HTTP/JSON query service over one usagestats dump")
+    ap.add_argument("dump", help="usagestats events dump (TXT)")
+    ap.add_argument("--host", default="127.0.0.1", help="Address to listen on (default 127.0.0.1, this machine only)")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default {DEFAULT_PORT})")
+    ap.add_argument("--cache-mb", type=float, default=DEFAULT_CACHE_MB,
+                    help=f"Memory for rendered PNGs, least recently used dropped first (default {DEFAULT_CACHE_MB})")
+    ap.add_argument("--quiet", action="store_true", help="Do not log every request")
+    ap.add_argument("--no-cache", action="store_true", help="Re-parse the dump instead of using/writing the .evcache")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Processes for parsing large dumps (default: all cores, 1 = serial)")
+    return ap.parse_args()
+
+def main():
+    args = parse_args()
+    # charts are only ever written to memory
+    import matplotlib.pyplot as plt
+    plt.switch_backend("Agg")
+
+    case = Case(args.dump, not args.no_cache, args.workers, args.cache_mb)
+    server = make_server(case, args.host, args.port, args.quiet)
+    host, port = server.server_address[:2]
+    print(f"✅ Serving {args.dump} ({len(case.table.ts):,} events, SHA-256 {case.sha256[:16]}…) "
+          f"on http://{host}:{port}/  (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    st = case.pngs.stats()
+    print(f"\n✅ Stopped; {st['hits']} chart(s) served from cache, {st['drawn']} drawn")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# top_apps.py
+# Top-K apps by a typed per-package aggregate, straight from the parsed events
+# (no CSV round trip). Aggregates are NumPy arrays indexed by package code (one per
+# package and Android user, see event_cache.py):
+#   launches       ACTIVITY_RESUMED count
+#   seconds        foreground time of closed sessions (same rules as sessions.py / the GUI totals)
+#   notifications  NOTIFICATION_INTERRUPTION count
+#   last_used      latest event of any type (naive epoch seconds)
+# Selection is np.argpartition over the metric, then a sort of the K picked only.
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from events_tokenizer import EVENT_TYPES
+from event_cache import load_events, package_users, package_labels, select_user
+from sessions import build_sessions, package_usage
+
+AppAggregates = namedtuple("AppAggregates", ["packages", "launches", "seconds", "notifications", "last_used",
+                                             "users", "labels"])
+
+METRICS = {"launches": "Launches", "seconds": "Foreground seconds",
+           "notifications": "Notifications", "last_used": "Last Used"}
+
+NOTIFICATION_INTERRUPTION = EVENT_TYPES["NOTIFICATION_INTERRUPTION"]
+
+def app_aggregates(table, sessions=None) -> AppAggregates:
+    """
+    Per-package aggregates of an EventTable (one session pass, one bincount per count);
+    sessions: the table's build_sessions() when the caller already has them.
+    """
+    usage = package_usage(table, build_sessions(table) if sessions is None else sessions)
+    pkg = np.asarray(table.pkg)
+    notes = np.bincount(pkg[np.asarray(table.type) == NOTIFICATION_INTERRUPTION], minlength=len(table.packages))
+    return AppAggregates(list(table.packages), usage.launches, usage.total, notes, usage.last,
+                         package_users(table), package_labels(table))
+
+def top_k(values: np.ndarray, names, k: int) -> np.ndarray:
+    """
+    Indices of the k largest values, largest first; equal values by name.
+    Only positive values qualify (an app never launched is not a top launcher).
+    """
+    values = np.asarray(values)
+    cand = np.flatnonzero(values > 0)
+    if k <= 0 or not len(cand):
+        return np.array([], dtype=np.int64)
+    if len(cand) > k:
+        part = cand[np.argpartition(-values[cand], k - 1)[:k]]
+        # argpartition picks arbitrarily among ties at the cut; take every tie so names decide
+        cand = cand[values[cand] >= values[part].min()]
+    ranked = sorted(cand.tolist(), key=lambda i: (-values[i], names[i]))
+    return np.array(ranked[:k], dtype=np.int64)
+
+def top_apps(agg: AppAggregates, metric: str = "launches", k: int = 10) -> pd.DataFrame:
+    """Package | User | <metric> (typed: int, or datetime64 for last_used) for the top k, best first."""
+    if metric not in METRICS:
+        raise ValueError(f"unknown metric {metric!r} (choose from {', '.join(METRICS)})")
+    values = getattr(agg, metric)
+    idx = top_k(values, agg.labels, k)
+    picked = values[idx]
+    return pd.DataFrame({
+        "Package": np.asarray(agg.packages, dtype=object)[idx] if len(idx) else np.array([], dtype=object),
+        "User": np.asarray(agg.users)[idx],
+        METRICS[metric]: pd.to_datetime(picked, unit="s") if metric == "last_used" else picked,
+    })
+
+def top_apps_from_dump(path: str, metric: str = "launches", k: int = 10,
+                       use_cache: bool = True, workers: int = 1, user: int = None) -> pd.DataFrame:
+    """top_apps() of a dump; user limits it to one Android user's events."""
+    table = load_events(path, use_cache, workers)
+    if user is not None:
+        table = select_user(table, user)
+    return top_apps(app_aggregates(table), metric, k)
@@ -0,0 +1,61 @@
+# usage_timeline.py
+# One entry point for the command-line tools. Only the chosen subcommand's module is
+# imported, so pandas / matplotlib are loaded by the commands that use them and
+# `usage_timeline.py --help` or `launchstats` start in a few tens of ms.
+# Charts render headless (Agg) unless --show is passed.
+# Usage:
+#   python usage_timeline.py parse usagestats_dump.txt --out events_summary.csv
+#   python usage_timeline.py merge usagestats_dump.txt packages.xml
+#   python usage_timeline.py live --outdir case_0412/PIXEL7-01
+#   python usage_timeline.py heatmap usagestats_dump.txt --top 12
+#   python usage_timeline.py gantt usagestats_dump.txt --all-days --outdir charts
+#   python usage_timeline.py top usagestats_dump.txt --metric seconds
+#   python usage_timeline.py launchstats LaunchStats.data
+#   python usage_timeline.py serve usagestats_dump.txt --port 8765
+#   python usage_timeline.py <command> --help
+# Output:
+#   whatever the subcommand writes (see the module named below)
+
+import os, sys
+
+# command -> (module with a main(), one-line description)
+COMMANDS = {
+    "parse":       ("events_parser", "Per-app launches, last use and foreground time from an events dump"),
+    "merge":       ("timeline", "Final timeline CSV: events dump + packages.xml / packages_output.csv"),
+    "live":        ("live_ingest", "Stream the dump from adb, parsing while it arrives (+ evidence copies)"),
+    "heatmap":     ("events_to_daily_heatmap", "Heatmap of launches / foreground time / notifications per time bin"),
+    "gantt":       ("events_to_gantt", "Gantt chart(s) of usage sessions per day"),
+    "top":         ("plot_top_apps", "Bar chart of the top-K apps by a usage metric"),
+    "launchstats": ("parse_launchstats", "Package names found in a binary LaunchStats.data"),
+    "db":          ("case_db", "Indexed SQLite case database (export and queries)"),
+    "serve":       ("timeline_server", "Local HTTP/JSON query service with cached chart PNGs"),
+    "gui":         ("app_usage_gui", "The Tk GUI"),
+}
+
+def usage() -> str:
+    width = max(map(len, COMMANDS))
+    lines = [f"usage: {os.path.basename(sys.argv[0])} <command> [args ...]", "", "commands:"]
+    lines += [f"  {name:<{width}}  {desc}" for name, (_, desc) in COMMANDS.items()]
+    lines += ["", "Run '<command> --help' for the options of one command."]
+    return "\n".join(lines)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        sys.exit(0 if argv else 2)
+    cmd, rest = argv[0], argv[1:]
+    if cmd not in COMMANDS:
+        print(f"unknown command {cmd!r}\n\n{usage()}", file=sys.stderr)
+        sys.exit(2)
+
+    if cmd != "gui" and "--show" not in rest:
+        # never probe for a GUI toolkit when only files are written
+        os.environ.setdefault("MPLBACKEND", "Agg")
+    import importlib
+    module = importlib.import_module(COMMANDS[cmd][0])
+    sys.argv = [f"{os.path.basename(sys.argv[0])} {cmd}"] + rest
+    module.main()
+
+if __name__ == "__main__":
+    main()
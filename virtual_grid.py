@@ -0,0 +1,156 @@
+# virtual_grid.py
+# Scrollable, sortable, filterable table for the GUI that copes with 100k+ rows.
+# The Treeview only ever holds one screenful of items; scrolling just rewrites their
+# values from the current slice of the model. Sorting and filtering work on in-memory
+# columns (an index permutation + a mask), never on the widget.
+#   GridModel    display strings + sort keys for a DataFrame, no Tk needed
+#   VirtualGrid  ttk.Frame with the Treeview, scrollbars and header-click sorting
+
+import numpy as np
+import pandas as pd
+from tkinter import ttk
+
+class GridModel:
+    """
+    Rows of `display` (strings shown as-is) in the current sort/filter order.
+    `keys` holds the typed columns to sort by (e.g. datetime64 instead of formatted text);
+    columns missing from it are sorted by their display text.
+    """
+
+    def __init__(self, display: pd.DataFrame, keys: pd.DataFrame = None):
+        display = display.reset_index(drop=True)
+        self.columns = [str(c) for c in display.columns]
+        self.keys = keys.reset_index(drop=True) if keys is not None else display
+        self.text = [display[c].astype(object).where(display[c].notna(), "").astype(str).to_numpy() for c in display.columns]
+        self.total = len(display)
+        self.order = np.arange(self.total)
+        self.mask = None
+        self.view = self.order
+        self.sort_col, self.ascending = None, True
+        self._haystack = None
+
+    def sort(self, col: str, ascending: bool = None):
+        """Sort by one column (toggles direction when it is already the sort column); blanks last."""
+        if ascending is None:
+            ascending = not self.ascending if col == self.sort_col else True
+        key = self.keys[col] if col in self.keys.columns else pd.Series(self.text[self.columns.index(col)])
+        if isinstance(key.dtype, pd.CategoricalDtype):
+            key = key.astype(object)
+        self.order = key.reset_index(drop=True).sort_values(ascending=ascending, na_position="last",
+                                                            kind="stable").index.to_numpy()
+        self.sort_col, self.ascending = col, ascending
+        self._apply()
+
+    def filter(self, text: str):
+        """Keep rows where any column contains text (case-insensitive); empty text shows all."""
+        text = text.strip().lower()
+        if not text:
+            self.mask = None
+        else:
+            if self._haystack is None:
+                # one lower-cased string per row, built on the first filter only
+                joined = self.text[0].astype(object) if self.text else np.full(self.total, "", dtype=object)
+                for col in self.text[1:]:
+                    joined = joined + "\x1f" + col
+                self._haystack = pd.Series(joined, dtype=object).str.lower()
+            self.mask = self._haystack.str.contains(text, regex=False).to_numpy()
+        self._apply()
+
+    def _apply(self):
+        self.view = self.order if self.mask is None else self.order[self.mask[self.order]]
+
+    def __len__(self):
+        return len(self.view)
+
+    def rows(self, start: int, stop: int):
+        """Display tuples for view positions [start, stop)."""
+        idx = self.view[start:stop]
+        return list(zip(*(col[idx] for col in self.text))) if len(idx) else []
+
+class VirtualGrid(ttk.Frame):
+    def __init__(self, master, col_width: int = 160, **kw):
+        super().__init__(master, **kw)
+        self.col_width = col_width
+        self.model = GridModel(pd.DataFrame())
+        self.offset = 0
+        self.page = 20
+
+        self.tree = ttk.Treeview(self, show="headings", selectmode="browse")
+        self.vbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.hbar = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.hbar.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.vbar.grid(row=0, column=1, sticky="ns")
+        self.hbar.grid(row=1, column=0, sticky="ew")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units", 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-1, "units", 3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(1, "units", 3))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-1, "pages"))
+        self.tree.bind("<Next>", lambda e: self.scroll(1, "pages"))
+        self.tree.bind("<Home>", lambda e: self.scroll_to(0))
+        self.tree.bind("<End>", lambda e: self.scroll_to(len(self.model)))
+
+    def set_frame(self, display: pd.DataFrame, keys: pd.DataFrame = None):
+        """Show a new result; the Treeview columns are only rebuilt when they change."""
+        self.model = GridModel(display, keys)
+        cols = self.model.columns
+        if list(self.tree["columns"]) != cols:
+            if self.tree.get_children():
+                self.tree.delete(*self.tree.get_children())
+            self.tree["columns"] = cols
+            for col in cols:
+                self.tree.column(col, width=self.col_width, anchor="w", stretch=False)
+        self._update_headings()
+        self.scroll_to(0)
+
+    def sort_by(self, col: str):
+        self.model.sort(col)
+        self._update_headings()
+        self.scroll_to(0)
+
+    def set_filter(self, text: str):
+        self.model.filter(text)
+        self.scroll_to(0)
+
+    def scroll(self, n: int, what: str = "units", step: int = 1):
+        self.scroll_to(self.offset + n * (self.page if what == "pages" else step))
+
+    def scroll_to(self, offset: int):
+        self.offset = max(0, min(int(offset), len(self.model) - self.page))
+        self._refresh()
+
+    def _update_headings(self):
+        for col in self.model.columns:
+            arrow = (" ▲" if self.model.ascending else " ▼") if col == self.model.sort_col else ""
+            self.tree.heading(col, text=col + arrow, command=lambda c=col: self.sort_by(c))
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(round(float(args[0]) * len(self.model)))
+        else:
+            self.scroll(int(args[0]), args[1])
+
+    def _on_resize(self, event):
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        page = max(1, (event.height - rowheight - 4) // rowheight)  # minus the heading row
+        if page != self.page:
+            self.page = page
+            self.scroll_to(self.offset)
+
+    def _refresh(self):
+        # reuse the same few item ids; only their values change while scrolling
+        rows = self.model.rows(self.offset, self.offset + self.page)
+        items = self.tree.get_children()
+        for iid in items[len(rows):]:
+            self.tree.delete(iid)
+        for i, values in enumerate(rows):
+            if i < len(items):
+                self.tree.item(items[i], values=values)
+            else:
+                self.tree.insert("", "end", iid=f"row{i}", values=values)
+        n = len(self.model)
+        self.vbar.set(self.offset / n, (self.offset + len(rows)) / n) if n else self.vbar.set(0, 1)